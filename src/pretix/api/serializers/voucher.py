@@ -19,6 +19,7 @@
 # You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
 # <https://www.gnu.org/licenses/>.
 #
+from django.db import connection
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -54,7 +55,23 @@ class VoucherListSerializer(serializers.ListSerializer):
                 errs.append({})
         if err:
             raise ValidationError(errs)
-        return super().create(validated_data)
+
+        # Vouchers have no many-to-many relations and no logic in save() apart from upper-casing the code, so we can
+        # skip the per-instance create() of the child serializer to insert large batches efficiently.
+        vouchers = []
+        for voucher_data in validated_data:
+            v = Voucher(**voucher_data)
+            v.code = v.code.upper()
+            vouchers.append(v)
+        Voucher.objects.bulk_create(vouchers, batch_size=500)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            event = self.context['event']
+            pks = dict(event.vouchers.filter(code__in=[v.code for v in vouchers]).values_list('code', 'pk'))
+            for v in vouchers:
+                v.pk = pks[v.code]
+        if vouchers:
+            self.context['event'].cache.set('vouchers_exist', True)
+        return vouchers
 
 
 class SeatGuidField(serializers.CharField):
@@ -33,7 +33,7 @@ from rest_framework.response import Response
 
 from pretix.api.pagination import TotalOrderingFilter
 from pretix.api.serializers.voucher import VoucherSerializer
-from pretix.base.models import Voucher
+from pretix.base.models import LogEntry, Voucher
 
 with scopes_disabled():
     class VoucherFilter(FilterSet):
@@ -119,12 +119,15 @@ class VoucherViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         with transaction.atomic():
             serializer.save(event=self.request.event)
-            for i, v in enumerate(serializer.instance):
+            LogEntry.bulk_create_and_postprocess([
                 v.log_action(
                     'pretix.voucher.added',
                     user=self.request.user,
                     auth=self.request.auth,
-                    data=self.request.data[i]
+                    data=self.request.data[i],
+                    save=False,
                 )
+                for i, v in enumerate(serializer.instance)
+            ])
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -219,4 +219,4 @@ def base_renderers(sender, **kwargs):
 
 
 def get_email_context(**kwargs):
-    return PlaceholderContext(**kwargs).render_all()
+    return PlaceholderContext(**kwargs).render_lazy()
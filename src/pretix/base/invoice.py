@@ -144,6 +144,24 @@ class NumberedCanvas(Canvas):
         self.restoreState()
 
 
+_registered_fonts = {}
+
+
+def _register_font(name, path):
+    # Parsing a TrueType file takes a while, and reportlab keeps registered fonts for the lifetime of the process
+    # anyways, so we only register a font again if it has been replaced in the meantime.
+    font = _registered_fonts.get((name, path))
+    if font is not None:
+        try:
+            if pdfmetrics.getFont(name) is font:
+                return
+        except Exception:
+            pass
+    font = TTFont(name, path)
+    pdfmetrics.registerFont(font)
+    _registered_fonts[name, path] = font
+
+
 class BaseInvoiceRenderer:
     """
     This is the base class for all invoice renderers.
@@ -227,24 +245,24 @@ class BaseReportlabInvoiceRenderer(BaseInvoiceRenderer):
         """
         Register fonts with reportlab. By default, this registers the OpenSans font family
         """
-        pdfmetrics.registerFont(TTFont('OpenSans', finders.find('fonts/OpenSans-Regular.ttf')))
-        pdfmetrics.registerFont(TTFont('OpenSansIt', finders.find('fonts/OpenSans-Italic.ttf')))
-        pdfmetrics.registerFont(TTFont('OpenSansBd', finders.find('fonts/OpenSans-Bold.ttf')))
-        pdfmetrics.registerFont(TTFont('OpenSansBI', finders.find('fonts/OpenSans-BoldItalic.ttf')))
+        _register_font('OpenSans', finders.find('fonts/OpenSans-Regular.ttf'))
+        _register_font('OpenSansIt', finders.find('fonts/OpenSans-Italic.ttf'))
+        _register_font('OpenSansBd', finders.find('fonts/OpenSans-Bold.ttf'))
+        _register_font('OpenSansBI', finders.find('fonts/OpenSans-BoldItalic.ttf'))
         pdfmetrics.registerFontFamily('OpenSans', normal='OpenSans', bold='OpenSansBd',
                                       italic='OpenSansIt', boldItalic='OpenSansBI')
 
         for family, styles in get_fonts(event=self.event, pdf_support_required=True).items():
             if family == self.event.settings.invoice_renderer_font:
-                pdfmetrics.registerFont(TTFont(family, finders.find(styles['regular']['truetype'])))
+                _register_font(family, finders.find(styles['regular']['truetype']))
                 self.font_regular = family
                 if 'italic' in styles:
-                    pdfmetrics.registerFont(TTFont(family + ' I', finders.find(styles['italic']['truetype'])))
+                    _register_font(family + ' I', finders.find(styles['italic']['truetype']))
                 if 'bold' in styles:
-                    pdfmetrics.registerFont(TTFont(family + ' B', finders.find(styles['bold']['truetype'])))
+                    _register_font(family + ' B', finders.find(styles['bold']['truetype']))
                     self.font_bold = family + ' B'
                 if 'bolditalic' in styles:
-                    pdfmetrics.registerFont(TTFont(family + ' B I', finders.find(styles['bolditalic']['truetype'])))
+                    _register_font(family + ' B I', finders.find(styles['bolditalic']['truetype']))
 
     def _normalize(self, text):
         # reportlab does not support unicode combination characters
@@ -431,24 +449,35 @@ class ClassicInvoiceRenderer(BaseReportlabInvoiceRenderer):
     logo_top = 13 * mm
     logo_anchor = 'n'
 
+    def _get_logo(self):
+        # When rendering many invoices with the same renderer, we only load and scale the logo once
+        logo_name = str(self.invoice.event.settings.get('invoice_logo_image', as_type=str))
+        cached = getattr(self, '_logo_cache', None)
+        if cached and cached[0] == logo_name:
+            return cached[1]
+
+        logo_file = self.invoice.event.settings.get('invoice_logo_image', binary_file=True)
+        ir = ThumbnailingImageReader(logo_file)
+        try:
+            ir.resize(self.logo_width, self.logo_height, 300)
+        except:
+            logger.exception("Can not resize image")
+            pass
+        try:
+            # Valid ZUGFeRD invoices must be compliant with PDF/A-3. pretix-zugferd ensures this by passing them
+            # through ghost script. Unfortunately, if the logo contains transparency, this will still fail.
+            # I was unable to figure out a way to fix this in GhostScript, so the easy fix is to remove the
+            # transparency, as our invoices always have a white background anyways.
+            ir.remove_transparency()
+        except:
+            logger.exception("Can not remove transparency from logo")
+            pass
+        self._logo_cache = (logo_name, ir)
+        return ir
+
     def _draw_logo(self, canvas):
         if self.invoice.event.settings.invoice_logo_image:
-            logo_file = self.invoice.event.settings.get('invoice_logo_image', binary_file=True)
-            ir = ThumbnailingImageReader(logo_file)
-            try:
-                ir.resize(self.logo_width, self.logo_height, 300)
-            except:
-                logger.exception("Can not resize image")
-                pass
-            try:
-                # Valid ZUGFeRD invoices must be compliant with PDF/A-3. pretix-zugferd ensures this by passing them
-                # through ghost script. Unfortunately, if the logo contains transparency, this will still fail.
-                # I was unable to figure out a way to fix this in GhostScript, so the easy fix is to remove the
-                # transparency, as our invoices always have a white background anyways.
-                ir.remove_transparency()
-            except:
-                logger.exception("Can not remove transparency from logo")
-                pass
+            ir = self._get_logo()
             canvas.drawImage(ir,
                              self.logo_left,
                              self.pagesize[1] - self.logo_height - self.logo_top,
@@ -24,7 +24,7 @@ from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.db import models
 from django.db.models import (
-    Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When,
+    Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When,
 )
 from django.db.models.functions import Coalesce
 from django_scopes import scopes_disabled
@@ -36,6 +36,27 @@ from pretix.base.models.orders import Transaction
 class Command(BaseCommand):
     help = "Check order for consistency with their transactions"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-pk",
+            type=int,
+            default=0,
+            help="Only check orders with an ID greater than this. Together with --max-pk, this can be used to "
+                 "run multiple instances of this command in parallel on distinct ranges of orders.",
+        )
+        parser.add_argument(
+            "--max-pk",
+            type=int,
+            default=None,
+            help="Only check orders with an ID less than or equal to this.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Range of order IDs to check with one query.",
+        )
+
     @scopes_disabled()
     def handle(self, *args, **options):
         qs = Order.objects.annotate(
@@ -96,12 +117,15 @@ class Command(BaseCommand):
             tx_total=F('correct_total'),
             tx_cnt=F('position_cnt')
         ).select_related('event')
-        for o in qs:
-            if abs(o.tx_total - o.correct_total) < Decimal('0.00001') and abs(o.position_total + o.fee_total - o.total) < Decimal('0.00001') \
-                    and o.tx_cnt == o.position_cnt:
-                # Ignore SQLite which treats Decimals like floats…
-                continue
-            print(f"Error in order {o.full_code}: status={o.status}, sum(positions)+sum(fees)={o.position_total + o.fee_total}, "
-                  f"order.total={o.total}, sum(transactions)={o.tx_total}, expected={o.correct_total}, pos_cnt={o.position_cnt}, tx_pos_cnt={o.tx_cnt}")
+        max_pk = options['max_pk'] or Order.objects.aggregate(m=Max('pk'))['m'] or 0
+        # Checking ranges of orders keeps every single query small enough to not block the database
+        for start in range(options['min_pk'], max_pk, options['batch_size']):
+            for o in qs.filter(pk__gt=start, pk__lte=min(start + options['batch_size'], max_pk)):
+                if abs(o.tx_total - o.correct_total) < Decimal('0.00001') and abs(o.position_total + o.fee_total - o.total) < Decimal('0.00001') \
+                        and o.tx_cnt == o.position_cnt:
+                    # Ignore SQLite which treats Decimals like floats…
+                    continue
+                print(f"Error in order {o.full_code}: status={o.status}, sum(positions)+sum(fees)={o.position_total + o.fee_total}, "
+                      f"order.total={o.total}, sum(transactions)={o.tx_total}, expected={o.correct_total}, pos_cnt={o.position_cnt}, tx_pos_cnt={o.tx_cnt}")
 
         self.stderr.write(self.style.SUCCESS('Check completed.'))
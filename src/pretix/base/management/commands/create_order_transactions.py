@@ -22,12 +22,14 @@
 import time
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.db.models import F, Max, Q
 from django.utils.timezone import now
 from django_scopes import scopes_disabled
 from tqdm import tqdm
 
-from pretix.base.models import Order
+from pretix.base.models import Event, Order, Transaction
+from pretix.base.services.stats import reset_transaction_rollups
 
 
 class Command(BaseCommand):
@@ -42,9 +44,30 @@ class Command(BaseCommand):
             help="Interval for staggered execution. If set to a value different then zero, we will "
                  "wait this many milliseconds between every order we process.",
         )
+        parser.add_argument(
+            "--min-pk",
+            type=int,
+            default=0,
+            help="Only process orders with an ID greater than this. Together with --max-pk, this can be used to "
+                 "run multiple instances of this command in parallel on distinct ranges of orders.",
+        )
+        parser.add_argument(
+            "--max-pk",
+            type=int,
+            default=None,
+            help="Only process orders with an ID less than or equal to this.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of orders to process within one database transaction.",
+        )
 
     @scopes_disabled()
     def handle(self, *args, **options):
+        # Every batch is committed on its own and orders with up-to-date transactions are not selected again, so an
+        # interrupted run can just be started again.
         t = 0
         qs = Order.objects.annotate(
             last_transaction=Max('transactions__created')
@@ -56,40 +79,53 @@ class Command(BaseCommand):
         ).order_by(
             'pk'
         )
-        last_pk = 0
-        with tqdm(total=qs.count()) as pbar:
+        if options['max_pk']:
+            qs = qs.filter(pk__lte=options['max_pk'])
+        last_pk = options['min_pk']
+        backfilled_events = set()
+        with tqdm(total=qs.filter(pk__gt=last_pk).count()) as pbar:
             while True:
-                batch = list(qs.filter(pk__gt=last_pk)[:5000])
+                batch = list(qs.filter(pk__gt=last_pk)[:options['batch_size']])
                 if not batch:
                     break
 
-                for o in batch:
-                    if o.last_transaction is None:
-                        tn = o.create_transactions(
-                            positions=o.all_positions.all(),
-                            fees=o.all_fees.all(),
-                            dt_now=o.datetime,
-                            migrated=True,
-                            is_new=True,
-                            _backfill_before_cancellation=True,
-                        )
-                        o.create_transactions(
-                            positions=o.all_positions.all(),
-                            fees=o.all_fees.all(),
-                            dt_now=o.cancellation_date or (o.expires if o.status == Order.STATUS_EXPIRED else o.datetime),
-                            migrated=True,
-                        )
-                    else:
-                        tn = o.create_transactions(
-                            positions=o.all_positions.all(),
-                            fees=o.all_fees.all(),
-                            dt_now=now(),
-                            migrated=True,
-                        )
-                    if tn:
-                        t += 1
-                    time.sleep(0)
-                    pbar.update(1)
+                with transaction.atomic():
+                    create = []
+                    for o in batch:
+                        if o.last_transaction is None:
+                            backfill = o.create_transactions(
+                                positions=o.all_positions.all(),
+                                fees=o.all_fees.all(),
+                                dt_now=o.datetime,
+                                migrated=True,
+                                is_new=True,
+                                _backfill_before_cancellation=True,
+                                save=False,
+                            )
+                            create += backfill
+                            create += o.create_transactions(
+                                positions=o.all_positions.all(),
+                                fees=o.all_fees.all(),
+                                dt_now=o.cancellation_date or (o.expires if o.status == Order.STATUS_EXPIRED else o.datetime),
+                                migrated=True,
+                                current_transactions=backfill,
+                                save=False,
+                            )
+                            backfilled_events.add(o.event_id)
+                    Transaction.objects.bulk_create(create, batch_size=1000)
+
+                    create += Order.bulk_create_transactions(
+                        [o for o in batch if o.last_transaction is not None],
+                        dt_now=now(),
+                        migrated=True,
+                    )
+                t += len({tx.order_id for tx in create})
+                pbar.update(len(batch))
                 last_pk = batch[-1].pk
+                time.sleep(options['interval'] * len(batch) / 1000)
+
+        # Transactions were created in the past, so the daily rollups of these events are no longer complete
+        for e in Event.objects.filter(pk__in=backfilled_events):
+            reset_transaction_rollups(e)
 
         self.stderr.write(self.style.SUCCESS(f'Created transactions for {t} orders.'))
@@ -0,0 +1,51 @@
+#
+# This file is part of pretix (Community Edition).
+#
+# Copyright (C) 2014-2020 Raphael Michel and contributors
+# Copyright (C) 2020-2021 rami.io GmbH and contributors
+#
+# This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation in version 3 of the License.
+#
+# ADDITIONAL TERMS APPLY: Pursuant to Section 7 of the GNU Affero General Public License, additional terms are
+# applicable granting you additional permissions and placing additional restrictions on your usage of this software.
+# Please refer to the pretix LICENSE file to obtain the full terms applicable to this work. If you did not receive
+# this file, see <https://pretix.eu/about/en/license>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
+# <https://www.gnu.org/licenses/>.
+#
+from django.core.management.base import BaseCommand
+from django_scopes import scopes_disabled
+from tqdm import tqdm
+
+from pretix.base.models import Event
+from pretix.base.services.stats import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-aggregated sales statistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--event",
+            dest="event",
+            type=str,
+            help="Only rebuild the statistics of the given event, specified as organizer-slug/event-slug.",
+        )
+
+    @scopes_disabled()
+    def handle(self, *args, **options):
+        qs = Event.objects.select_related('organizer').order_by('pk')
+        if options.get('event'):
+            organizer, event = options['event'].split('/', 1)
+            qs = qs.filter(organizer__slug=organizer, slug=event)
+
+        for event in tqdm(qs.iterator(), total=qs.count()):
+            rebuild_sales_rollups(event)
+
+        self.stderr.write(self.style.SUCCESS('Rebuilt sales statistics.'))
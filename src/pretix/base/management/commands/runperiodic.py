@@ -38,12 +38,13 @@ import traceback
 from django.conf import settings
 from django.core.cache import cache
 from django.core.management.base import BaseCommand
-from django.dispatch.dispatcher import NO_RECEIVERS
 
+from pretix.base.services.periodic import (
+    dispatch_periodic_receiver, get_periodic_receivers, receiver_name,
+    run_periodic_receiver,
+)
 from pretix.helpers.periodic import SKIPPED
 
-from ...signals import periodic_task
-
 
 class Command(BaseCommand):
     help = "Run periodic tasks"
@@ -54,17 +55,17 @@ class Command(BaseCommand):
         parser.add_argument('--list-tasks', action='store_true', help='Only list all tasks')
         parser.add_argument('--exclude', action='store', type=str, help='Exclude the tasks with this name '
                                                                         '(dotted path, comma separation)')
+        parser.add_argument('--dispatch', action='store_true', help='Queue every task to the celery workers '
+                                                                    'instead of running them one after another '
+                                                                    'in this process')
 
     def handle(self, *args, **options):
         verbosity = int(options['verbosity'])
 
         cache.set("pretix_runperiodic_executed", True, 3600 * 12)
 
-        if not periodic_task.receivers or periodic_task.sender_receivers_cache.get(self) is NO_RECEIVERS:
-            return
-
-        for receiver in periodic_task._live_receivers(self):
-            name = f'{receiver.__module__}.{receiver.__name__}'
+        for receiver in get_periodic_receivers(self):
+            name = receiver_name(receiver)
             if options['list_tasks']:
                 print(name)
                 continue
@@ -75,11 +76,19 @@ class Command(BaseCommand):
                 if name in options.get('exclude').split(','):
                     continue
 
+            if options['dispatch']:
+                if dispatch_periodic_receiver(receiver):
+                    if verbosity > 1:
+                        self.stdout.write(f'INFO Queued {name}')
+                elif verbosity > 1:
+                    self.stdout.write(self.style.SUCCESS(f'INFO Skipped {name}, previous run not finished'))
+                continue
+
             if verbosity > 1:
                 self.stdout.write(f'INFO Running {name}…')
             t0 = time.time()
             try:
-                r = receiver(signal=periodic_task, sender=self)
+                r = run_periodic_receiver(receiver, sender=self)
             except Exception as err:
                 if isinstance(err, KeyboardInterrupt):
                     raise err
@@ -32,22 +32,32 @@
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations under the License.
 
+import atexit
 import json
+import logging
 import math
+import os
+import threading
 import time
 from collections import defaultdict
 
+from celery.signals import worker_process_shutdown
 from django.apps import apps
 from django.conf import settings
 from django.db import connection
+from django.dispatch import receiver
+from django_scopes import scopes_disabled
 
 from pretix.base.models import Event, Invoice, Order, OrderPosition, Organizer
+from pretix.base.signals import periodic_task
 from pretix.celery_app import app
+from pretix.helpers.periodic import minimum_interval
 
 if settings.HAS_REDIS:
     import django_redis
     redis = django_redis.get_redis_connection("redis")
 
+logger = logging.getLogger(__name__)
 REDIS_KEY = "pretix_metrics"
 _INF = float("inf")
 _MINUS_INF = float("-inf")
@@ -65,6 +75,93 @@ def _float_to_go_string(d):
         return repr(float(d))
 
 
+class MetricsBuffer:
+    """
+    Collects metric updates in memory and writes them to Redis in a single pipeline at most every
+    ``METRICS_FLUSH_INTERVAL`` seconds. This way, recording a metric on every request or task is a dictionary
+    update instead of a network round trip.
+
+    A daemon thread flushes the buffer in the same interval, so updates of an idle process are published as
+    well. Celery worker processes additionally flush when they shut down, since they do not run ``atexit``
+    handlers.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        # Also called in forked child processes, which must neither inherit a lock that might be held by another
+        # thread of the parent nor flush updates that belong to the parent.
+        self._lock = threading.Lock()
+        self._increments = defaultdict(float)
+        self._values = {}
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def _ensure_timer(self):
+        if self._timer is not None or settings.METRICS_FLUSH_INTERVAL <= 0:
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, name='pretix-metrics-flush', daemon=True)
+                self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self._flush_if_due()
+            except Exception:
+                logger.exception('Could not flush metrics')
+
+    def inc(self, key, amount):
+        with self._lock:
+            if key in self._values:
+                self._values[key] += amount
+            else:
+                self._increments[key] += amount
+        self._ensure_timer()
+        self._flush_if_due()
+
+    def set(self, key, value):
+        with self._lock:
+            self._increments.pop(key, None)
+            self._values[key] = value
+        self._ensure_timer()
+        self._flush_if_due()
+
+    def _flush_if_due(self):
+        if time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            increments, values = self._increments, self._values
+            self._increments = defaultdict(float)
+            self._values = {}
+            self._last_flush = time.monotonic()
+
+        if not settings.HAS_REDIS or not (increments or values):
+            return
+        pipeline = redis.pipeline()
+        for key, value in values.items():
+            pipeline.hset(REDIS_KEY, key, value)
+        for key, amount in increments.items():
+            pipeline.hincrbyfloat(REDIS_KEY, key, amount)
+        pipeline.execute()
+
+
+_buffer = MetricsBuffer()
+os.register_at_fork(after_in_child=_buffer._reset)
+atexit.register(_buffer.flush)
+
+
+@worker_process_shutdown.connect
+def flush_on_worker_process_shutdown(**kwargs):
+    # Pool processes leave through os._exit(), which skips atexit handlers
+    _buffer.flush()
+
+
 class Metric(object):
     """
     Base Metrics Object
@@ -105,31 +202,19 @@ class Metric(object):
 
             return metricname + "{" + ",".join(named_labels) + "}"
 
-    def _inc_in_redis(self, key, amount, pipeline=None):
+    def _inc_in_redis(self, key, amount):
         """
-        Increments given key in Redis.
+        Increments given key in Redis, with the next flush of the metrics buffer.
         """
         if settings.HAS_REDIS:
-            if not pipeline:
-                pipeline = redis
-            pipeline.hincrbyfloat(REDIS_KEY, key, amount)
+            _buffer.inc(key, amount)
 
-    def _set_in_redis(self, key, value, pipeline=None):
+    def _set_in_redis(self, key, value):
         """
-        Sets given key in Redis.
+        Sets given key in Redis, with the next flush of the metrics buffer.
         """
         if settings.HAS_REDIS:
-            if not pipeline:
-                pipeline = redis
-            pipeline.hset(REDIS_KEY, key, value)
-
-    def _get_redis_pipeline(self):
-        if settings.HAS_REDIS:
-            return redis.pipeline()
-
-    def _execute_redis_pipeline(self, pipeline):
-        if settings.HAS_REDIS:
-            return pipeline.execute()
+            _buffer.set(key, value)
 
 
 class Counter(Metric):
@@ -222,13 +307,11 @@ class Histogram(Metric):
 
         self._check_label_consistency(kwargs)
 
-        pipe = self._get_redis_pipeline()
-
         countmetric = self._construct_metric_identifier(self.name + '_count', kwargs)
-        self._inc_in_redis(countmetric, 1, pipeline=pipe)
+        self._inc_in_redis(countmetric, 1)
 
         summetric = self._construct_metric_identifier(self.name + '_sum', kwargs)
-        self._inc_in_redis(summetric, amount, pipeline=pipe)
+        self._inc_in_redis(summetric, amount)
 
         kwargs_le = dict(kwargs.items())
         for i, bound in enumerate(self.buckets):
@@ -236,9 +319,7 @@ class Histogram(Metric):
                 kwargs_le['le'] = _float_to_go_string(bound)
                 bmetric = self._construct_metric_identifier(self.name + '_bucket', kwargs_le,
                                                             labelnames=self.labelnames + ["le"])
-                self._inc_in_redis(bmetric, 1, pipeline=pipe)
-
-        self._execute_redis_pipeline(pipe)
+                self._inc_in_redis(bmetric, 1)
 
 
 def estimate_count_fast(type):
@@ -256,6 +337,35 @@ def estimate_count_fast(type):
         return type.objects.count()
 
 
+def model_counts():
+    exact_tables = [
+        Order, OrderPosition, Invoice, Event, Organizer
+    ]
+    counts = {}
+    for m in apps.get_models():  # Count all models
+        if any(issubclass(m, p) for p in exact_tables):
+            counts['{model="%s"}' % m._meta] = m.objects.count()
+        else:
+            counts['{model="%s"}' % m._meta] = estimate_count_fast(m)
+    return counts
+
+
+@receiver(signal=periodic_task, dispatch_uid="pretix_metrics_update_model_counts")
+@scopes_disabled()
+@minimum_interval(minutes_after_success=settings.METRICS_MODEL_COUNT_INTERVAL)
+def update_model_counts(sender, **kwargs):
+    """
+    Stores the number of instances of every model in redis, so scraping the metrics does not need to run slow
+    ``COUNT(*)`` queries on large tables.
+    """
+    if not settings.METRICS_ENABLED or not settings.HAS_REDIS:
+        return
+    pipeline = redis.pipeline()
+    for key, value in model_counts().items():
+        pipeline.hset(REDIS_KEY, 'pretix_model_instances' + key, value)
+    pipeline.execute()
+
+
 def metric_values():
     """
     Produces the the values to be presented to the monitoring system
@@ -264,6 +374,7 @@ def metric_values():
 
     # Metrics from redis
     if settings.HAS_REDIS:
+        _buffer.flush()
         for key, value in redis.hscan_iter(REDIS_KEY, count=1000):
             dkey = key.decode("utf-8")
             splitted = dkey.split("{", 2)
@@ -280,15 +391,11 @@ def metric_values():
     for a, atarget in aliases.items():
         metrics[a] = metrics[atarget]
 
-    # Throwaway metrics
-    exact_tables = [
-        Order, OrderPosition, Invoice, Event, Organizer
-    ]
-    for m in apps.get_models():  # Count all models
-        if any(issubclass(m, p) for p in exact_tables):
-            metrics['pretix_model_instances']['{model="%s"}' % m._meta] = m.objects.count()
-        else:
-            metrics['pretix_model_instances']['{model="%s"}' % m._meta] = estimate_count_fast(m)
+    # Model counts are expensive to compute, so with redis they are precomputed by update_model_counts() and
+    # already part of the redis metrics above
+    if not settings.HAS_REDIS:
+        for key, value in model_counts().items():
+            metrics['pretix_model_instances'][key] = value
 
     if settings.HAS_CELERY:
         channel = app.broker_connection().channel()
@@ -317,5 +424,9 @@ pretix_task_runs_total = Counter("pretix_task_runs_total", "Total calls to a cel
                                  ["task_name", "status"])
 pretix_task_duration_seconds = Histogram("pretix_task_duration_seconds", "Call time of a celery task",
                                          ["task_name"])
+pretix_periodic_task_runs_total = Counter("pretix_periodic_task_runs_total", "Total runs of a periodic task, by outcome",
+                                          ["task_name", "status"])
+pretix_periodic_task_duration_seconds = Histogram("pretix_periodic_task_duration_seconds", "Run time of a periodic task",
+                                                  ["task_name"])
 pretix_successful_logins = Counter("pretix_logins_successful", "Successful logins", [])
 pretix_failed_logins = Counter("pretix_logins_failed", "Failed logins", ["reason"])
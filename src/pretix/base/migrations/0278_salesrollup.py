@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pretixbase', '0277_customerssoclient_require_pkce_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('order_status', models.CharField(max_length=3)),
+                ('order_require_approval', models.BooleanField()),
+                ('canceled', models.BooleanField()),
+                ('order_date', models.DateField()),
+                ('payment_date', models.DateField(null=True)),
+                ('count', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=13)),
+                ('tax_value', models.DecimalField(decimal_places=2, max_digits=13)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='pretixbase.event')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pretixbase.item')),
+                ('subevent', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='pretixbase.subevent')),
+                ('variation', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='pretixbase.itemvariation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'order_date'], name='pretixbase__event_i_326a73_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pretixbase', '0278_salesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('closed_until', models.DateField()),
+                ('timezone', models.CharField(max_length=100)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollup_state', to='pretixbase.event')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=13)),
+                ('tax_rate', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('fee_type', models.CharField(max_length=100, null=True)),
+                ('internal_type', models.CharField(max_length=255, null=True)),
+                ('count', models.IntegerField()),
+                ('gross_total', models.DecimalField(decimal_places=2, max_digits=13)),
+                ('tax_total', models.DecimalField(decimal_places=2, max_digits=13)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollups', to='pretixbase.event')),
+                ('item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='pretixbase.item')),
+                ('subevent', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='pretixbase.subevent')),
+                ('variation', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='pretixbase.itemvariation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'day'], name='pretixbase__event_i_92faf5_idx')],
+            },
+        ),
+    ]
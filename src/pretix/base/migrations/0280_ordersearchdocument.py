@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:54
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.utils import DatabaseError
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            # pg_trgm is a trusted extension since PostgreSQL 13, older versions require superuser privileges.
+            # The search still works without the indexes, just slower.
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            return
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS pretixbase_ordersearchdocument_text_trgm "
+            "ON pretixbase_ordersearchdocument USING gin (text gin_trgm_ops)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS pretixbase_customer_email_trgm "
+            "ON pretixbase_customer USING gin ((UPPER(email::text)) gin_trgm_ops)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS pretixbase_customer_name_cached_trgm "
+            "ON pretixbase_customer USING gin ((UPPER(name_cached::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX IF EXISTS pretixbase_customer_email_trgm")
+        cursor.execute("DROP INDEX IF EXISTS pretixbase_customer_name_cached_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pretixbase', '0279_transactionrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchDocument',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='pretixbase.order')),
+                ('text', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(
+            create_trigram_indexes,
+            drop_trigram_indexes,
+        ),
+    ]
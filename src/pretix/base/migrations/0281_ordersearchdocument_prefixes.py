@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if not cursor.fetchone():
+            # The search still works without the index, just slower.
+            return
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS pretixbase_ordersearchdocument_prefixes_trgm "
+            "ON pretixbase_ordersearchdocument USING gin (prefixes gin_trgm_ops)"
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX IF EXISTS pretixbase_ordersearchdocument_prefixes_trgm")
+
+
+def delete_documents(apps, schema_editor):
+    # Existing documents contain ticket secrets as searchable text, they are recreated by the periodic backfill
+    OrderSearchDocument = apps.get_model('pretixbase', 'OrderSearchDocument')
+    OrderSearchDocument.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pretixbase', '0280_ordersearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordersearchdocument',
+            name='prefixes',
+            field=models.TextField(default=''),
+        ),
+        migrations.RunPython(
+            delete_documents,
+            migrations.RunPython.noop,
+        ),
+        migrations.RunPython(
+            create_trigram_index,
+            drop_trigram_index,
+        ),
+    ]
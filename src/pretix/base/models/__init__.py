@@ -54,7 +54,9 @@ from .organizer import (
     Organizer, Organizer_SettingsStore, SalesChannel, Team, TeamAPIToken,
     TeamInvite,
 )
+from .search import OrderSearchDocument
 from .seating import Seat, SeatCategoryMapping, SeatingPlan
+from .stats import SalesRollup, TransactionRollup, TransactionRollupState
 from .tax import TaxRule
 from .vouchers import Voucher
 from .waitinglist import WaitingListEntry
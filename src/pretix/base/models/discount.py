@@ -29,9 +29,11 @@ from typing import Dict
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _, pgettext_lazy
-from django_scopes import ScopedManager
+from django_scopes import ScopedManager, scopes_disabled
 
 from pretix.base.decimal import round_decimal
 from pretix.base.models.base import LoggedModel
@@ -229,6 +231,14 @@ class Discount(LoggedModel):
     def allow_delete(self):
         return not self.orderposition_set.exists()
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.event.cache.delete('compiled_discounts')
+
+    def delete(self, *args, **kwargs):
+        super().delete(*args, **kwargs)
+        self.event.cache.delete('compiled_discounts')
+
     def clean(self):
         super().clean()
         Discount.validate_config({
@@ -350,7 +360,10 @@ class Discount(LoggedModel):
 
         limit_products = set()
         if not self.condition_all_products:
-            limit_products = {p.pk for p in self.condition_limit_products.all()}
+            if hasattr(self, '_condition_product_ids'):  # precompiled by pretix.base.services.pricing
+                limit_products = self._condition_product_ids
+            else:
+                limit_products = {p.pk for p in self.condition_limit_products.all()}
 
         # First, filter out everything not even covered by our product scope
         condition_candidates = [
@@ -366,7 +379,10 @@ class Discount(LoggedModel):
         if self.benefit_same_products:
             benefit_candidates = list(condition_candidates)
         else:
-            benefit_products = {p.pk for p in self.benefit_limit_products.all()}
+            if hasattr(self, '_benefit_product_ids'):  # precompiled by pretix.base.services.pricing
+                benefit_products = self._benefit_product_ids
+            else:
+                benefit_products = {p.pk for p in self.benefit_limit_products.all()}
             benefit_candidates = [
                 idx
                 for idx, (item_id, subevent_id, line_price_gross, is_addon_to, voucher_discount) in positions.items()
@@ -474,3 +490,29 @@ class Discount(LoggedModel):
                     None
                 )
         return result
+
+
+@receiver(m2m_changed, sender=Discount.condition_limit_products.through)
+@receiver(m2m_changed, sender=Discount.benefit_limit_products.through)
+@receiver(m2m_changed, sender=Discount.limit_sales_channels.through)
+def discount_products_changed(sender, instance, action, pk_set=None, **kwargs):
+    if isinstance(instance, Discount):
+        if action.startswith('post_'):
+            instance.event.cache.delete('compiled_discounts')
+    elif hasattr(instance, 'event'):  # reverse relation, e.g. item.discount_set.add(…)
+        if action.startswith('post_'):
+            instance.event.cache.delete('compiled_discounts')
+    else:  # reverse relation of an organizer-level object, e.g. sales_channel.discount_set.add(…)
+        if action == 'pre_clear':
+            # pk_set is not given when clearing, so we need to remember the affected discounts beforehand
+            with scopes_disabled():
+                instance._cleared_discount_ids = set(instance.discount_set.values_list('pk', flat=True))
+            return
+        if not action.startswith('post_'):
+            return
+        if action == 'post_clear':
+            pk_set = instance.__dict__.pop('_cleared_discount_ids', set())
+        with scopes_disabled():
+            events = {d.event for d in Discount.objects.filter(pk__in=pk_set or []).select_related('event')}
+        for event in events:
+            event.cache.delete('compiled_discounts')
@@ -1484,6 +1484,16 @@ class ItemAddOn(models.Model):
         unique_together = (('base_item', 'addon_category'),)
         ordering = ('position', 'pk')
 
+    def delete(self, *args, **kwargs):
+        super().delete(*args, **kwargs)
+        if self.base_item:
+            self.base_item.event.cache.clear()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.base_item:
+            self.base_item.event.cache.clear()
+
     def clean(self):
         self.clean_min_count(self.min_count)
         self.clean_max_count(self.max_count)
@@ -1562,6 +1572,16 @@ class ItemBundle(models.Model):
                     'value will NOT be added to the base item\'s price.')
     )
 
+    def delete(self, *args, **kwargs):
+        super().delete(*args, **kwargs)
+        if self.base_item:
+            self.base_item.event.cache.clear()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.base_item:
+            self.base_item.event.cache.clear()
+
     def clean(self):
         self.clean_count(self.count)
 
@@ -41,7 +41,7 @@ import logging
 import operator
 import string
 import warnings
-from collections import Counter
+from collections import Counter, defaultdict
 from datetime import datetime, time, timedelta
 from decimal import Decimal
 from functools import reduce
@@ -56,6 +56,7 @@ from django.core.exceptions import ValidationError
 from django.db import models, transaction
 from django.db.models import (
     Case, Exists, F, Max, OuterRef, Q, Subquery, Sum, Value, When,
+    prefetch_related_objects,
 )
 from django.db.models.functions import Coalesce, Greatest
 from django.db.models.signals import post_delete
@@ -346,10 +347,29 @@ class Order(LockModel, LoggedModel):
         super().__init__(*args, **kwargs)
         if 'require_approval' not in self.get_deferred_fields() and 'status' not in self.get_deferred_fields():
             self._transaction_key_reset()
+            self._rollup_state_reset()
+        else:
+            self.__initial_rollup_state = None
 
     def _transaction_key_reset(self):
         self.__initial_status_paid_or_pending = self.status in (Order.STATUS_PENDING, Order.STATUS_PAID) and not self.require_approval
 
+    def _rollup_state_reset(self):
+        if 'require_approval' in self.get_deferred_fields() or 'status' in self.get_deferred_fields():
+            self.__initial_rollup_state = None
+        else:
+            self.__initial_rollup_state = (self.status, self.require_approval)
+
+    def _rollup_state_changed(self, update_fields=None):
+        """
+        Returns whether status or approval state differ from when the order was loaded or last saved, which
+        means the sales rollups of the order need to be refreshed. If the fields were deferred, we assume a
+        change whenever they are saved.
+        """
+        if self.__initial_rollup_state is None or 'require_approval' in self.get_deferred_fields() or 'status' in self.get_deferred_fields():
+            return update_fields is None or bool({'status', 'require_approval'} & set(update_fields))
+        return self.__initial_rollup_state != (self.status, self.require_approval)
+
     def gracefully_delete(self, user=None, auth=None):
         from . import GiftCard, GiftCardTransaction, Membership, Voucher
 
@@ -1228,13 +1248,16 @@ class Order(LockModel, LoggedModel):
             return set.intersection(set(self.positions_with_tickets_ignoring_plugins), *[set(r) for rr, r in signal_response if isinstance(r, Iterable)])
 
     def create_transactions(self, is_new=False, positions=None, fees=None, dt_now=None, migrated=False,
-                            _backfill_before_cancellation=False, save=True):
+                            _backfill_before_cancellation=False, save=True, current_transactions=None):
         dt_now = dt_now or now()
 
         # Count the transactions we already have
         current_transaction_count = Counter()
         if not is_new:
-            for t in Transaction.objects.filter(order=self):  # do not use related manager, we want to avoid cached data
+            if current_transactions is None:
+                # do not use related manager, we want to avoid cached data
+                current_transactions = Transaction.objects.filter(order=self)
+            for t in current_transactions:
                 current_transaction_count[Transaction.key(t)] += t.count
 
         # Count the transactions we'd actually need
@@ -1284,6 +1307,33 @@ class Order(LockModel, LoggedModel):
         _transactions_mark_order_clean(self.pk)
         return create
 
+    @staticmethod
+    def bulk_create_transactions(orders, dt_now=None, migrated=False, batch_size=1000):
+        """
+        Works like ``create_transactions`` for many orders at once. The positions, fees and existing transactions
+        of all orders are fetched with a constant number of queries and all new transactions are inserted in
+        bulk. Returns the list of created transactions.
+        """
+        orders = list(orders)
+        prefetch_related_objects(orders, 'all_positions', 'all_fees')
+
+        current_transactions = defaultdict(list)
+        for t in Transaction.objects.filter(order__in=[o.pk for o in orders]):
+            current_transactions[t.order_id].append(t)
+
+        create = []
+        for o in orders:
+            create += o.create_transactions(
+                positions=o.all_positions.all(),
+                fees=o.all_fees.all(),
+                dt_now=dt_now,
+                migrated=migrated,
+                current_transactions=current_transactions[o.pk],
+                save=False,
+            )
+        Transaction.objects.bulk_create(create, batch_size=batch_size)
+        return create
+
     def tagged_secret(self, tag, secret_length=64):
         return salted_hmac(value=tag, key_salt=b"", algorithm="sha256",
                            secret=self.internal_secret or self.secret).hexdigest()[:secret_length]
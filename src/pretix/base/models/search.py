@@ -0,0 +1,46 @@
+#
+# This file is part of pretix (Community Edition).
+#
+# Copyright (C) 2014-2020 Raphael Michel and contributors
+# Copyright (C) 2020-2021 rami.io GmbH and contributors
+#
+# This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation in version 3 of the License.
+#
+# ADDITIONAL TERMS APPLY: Pursuant to Section 7 of the GNU Affero General Public License, additional terms are
+# applicable granting you additional permissions and placing additional restrictions on your usage of this software.
+# Please refer to the pretix LICENSE file to obtain the full terms applicable to this work. If you did not receive
+# this file, see <https://pretix.eu/about/en/license>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
+# <https://www.gnu.org/licenses/>.
+#
+from django.db import models
+from django_scopes import ScopedManager
+
+
+class OrderSearchDocument(models.Model):
+    """
+    A denormalized, lower-cased text representation of everything the order search in the backend looks at, i.e.
+    the order code, email address, comment, invoice address and the names and email addresses of all active
+    positions. Searching this single column is a lot cheaper than joining all of these tables, and on PostgreSQL
+    it is backed by a trigram index. Ticket secrets and pseudonymization IDs are only matched from their start,
+    so they are kept separately in ``prefixes``.
+
+    Documents are kept up to date by ``pretix.base.services.ordersearch``. Orders without a document are found
+    by the search through a slower fallback.
+    """
+    order = models.OneToOneField(
+        'Order',
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='search_document',
+    )
+    text = models.TextField()
+    prefixes = models.TextField(default='')
+
+    objects = ScopedManager(organizer='order__event__organizer')
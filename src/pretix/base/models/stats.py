@@ -0,0 +1,131 @@
+#
+# This file is part of pretix (Community Edition).
+#
+# Copyright (C) 2014-2020 Raphael Michel and contributors
+# Copyright (C) 2020-2021 rami.io GmbH and contributors
+#
+# This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation in version 3 of the License.
+#
+# ADDITIONAL TERMS APPLY: Pursuant to Section 7 of the GNU Affero General Public License, additional terms are
+# applicable granting you additional permissions and placing additional restrictions on your usage of this software.
+# Please refer to the pretix LICENSE file to obtain the full terms applicable to this work. If you did not receive
+# this file, see <https://pretix.eu/about/en/license>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
+# <https://www.gnu.org/licenses/>.
+#
+from django.db import models
+from django_scopes import ScopedManager
+
+
+class SalesRollup(models.Model):
+    """
+    Pre-aggregated sales numbers of an event, used by the order overview, the dashboard and the statistics
+    plugin instead of scanning all order positions on every request.
+
+    Each row aggregates all order positions that share the same subevent, product, variation, order status,
+    cancellation state, day of order placement and day of the last payment. Both days are computed in the
+    timezone of the event. The rows of an event are maintained by ``pretix.base.services.stats`` whenever an
+    order changes state and can be rebuilt with the ``rebuild_sales_rollups`` management command.
+    """
+    event = models.ForeignKey(
+        'Event',
+        on_delete=models.CASCADE,
+        related_name='sales_rollups',
+    )
+    subevent = models.ForeignKey(
+        'SubEvent',
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    item = models.ForeignKey(
+        'Item',
+        on_delete=models.CASCADE,
+    )
+    variation = models.ForeignKey(
+        'ItemVariation',
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    order_status = models.CharField(max_length=3)
+    order_require_approval = models.BooleanField()
+    canceled = models.BooleanField()
+    order_date = models.DateField()
+    payment_date = models.DateField(null=True)
+    count = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=13, decimal_places=2)
+    tax_value = models.DecimalField(max_digits=13, decimal_places=2)
+
+    objects = ScopedManager(organizer='event__organizer')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['event', 'order_date']),
+        ]
+
+
+class TransactionRollup(models.Model):
+    """
+    Daily totals of the ``Transaction`` rows of an event, used by the accounting report to avoid aggregating
+    the full transaction history of an organizer on every export.
+
+    Rows are only written for days that are over (in the timezone stored in the ``TransactionRollupState`` of
+    the event), since transactions are immutable and no new ones are created for past days. Transactions of
+    test mode orders are never included, as those orders can be deleted.
+    """
+    event = models.ForeignKey(
+        'Event',
+        on_delete=models.CASCADE,
+        related_name='transaction_rollups',
+    )
+    day = models.DateField()
+    subevent = models.ForeignKey(
+        'SubEvent',
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    item = models.ForeignKey(
+        'Item',
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    variation = models.ForeignKey(
+        'ItemVariation',
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    price = models.DecimalField(max_digits=13, decimal_places=2)
+    tax_rate = models.DecimalField(max_digits=7, decimal_places=2)
+    fee_type = models.CharField(max_length=100, null=True)
+    internal_type = models.CharField(max_length=255, null=True)
+    count = models.IntegerField()
+    gross_total = models.DecimalField(max_digits=13, decimal_places=2)
+    tax_total = models.DecimalField(max_digits=13, decimal_places=2)
+
+    objects = ScopedManager(organizer='event__organizer')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['event', 'day']),
+        ]
+
+
+class TransactionRollupState(models.Model):
+    """
+    Records up to which day (exclusive) the ``TransactionRollup`` rows of an event are complete and which
+    timezone was used to compute the day boundaries.
+    """
+    event = models.OneToOneField(
+        'Event',
+        on_delete=models.CASCADE,
+        related_name='transaction_rollup_state',
+    )
+    closed_until = models.DateField()
+    timezone = models.CharField(max_length=100)
+
+    objects = ScopedManager(organizer='event__organizer')
@@ -191,37 +191,53 @@ class WaitingListEntry(LoggedModel):
             raise WaitingListException(_('This entry is anonymized and can no longer be used.'))
 
         with transaction.atomic():
-            e = self.email
-            if self.name:
-                e += ' / ' + self.name
-            v = Voucher.objects.create(
-                event=self.event,
-                max_usages=1,
-                valid_until=now() + timedelta(hours=self.event.settings.waiting_list_hours),
-                item=self.item,
-                variation=self.variation,
-                tag='waiting-list',
-                comment=_('Automatically created from waiting list entry for {email}').format(
-                    email=e
-                ),
-                block_quota=True,
-                subevent=self.subevent,
-            )
-            v.log_action('pretix.voucher.added.waitinglist', {
-                'item': self.item.pk,
-                'variation': self.variation.pk if self.variation else None,
-                'tag': 'waiting-list',
-                'block_quota': True,
-                'valid_until': v.valid_until.isoformat(),
-                'max_usages': 1,
-                'email': self.email,
-                'waitinglistentry': self.pk,
-                'subevent': self.subevent.pk if self.subevent else None,
-            }, user=user, auth=auth)
+            v = self.build_voucher()
+            v.save()
+            v.log_action('pretix.voucher.added.waitinglist', self.voucher_log_data(v), user=user, auth=auth)
             self.log_action('pretix.event.orders.waitinglist.voucher_assigned', user=user, auth=auth)
             self.voucher = v
             self.save()
 
+        self.send_voucher_mail(user=user, auth=auth)
+
+    def build_voucher(self, code=None) -> Voucher:
+        """
+        Returns an unsaved voucher object suitable to be sent to this entry. Used by :py:meth:`send_voucher` and
+        by the automatic assignment, which creates vouchers in bulk.
+        """
+        e = self.email
+        if self.name:
+            e += ' / ' + self.name
+        kwargs = {'code': code} if code else {}
+        return Voucher(
+            event=self.event,
+            max_usages=1,
+            valid_until=now() + timedelta(hours=self.event.settings.waiting_list_hours),
+            item=self.item,
+            variation=self.variation,
+            tag='waiting-list',
+            comment=_('Automatically created from waiting list entry for {email}').format(
+                email=e
+            ),
+            block_quota=True,
+            subevent=self.subevent,
+            **kwargs
+        )
+
+    def voucher_log_data(self, voucher) -> dict:
+        return {
+            'item': self.item.pk,
+            'variation': self.variation.pk if self.variation else None,
+            'tag': 'waiting-list',
+            'block_quota': True,
+            'valid_until': voucher.valid_until.isoformat(),
+            'max_usages': 1,
+            'email': self.email,
+            'waitinglistentry': self.pk,
+            'subevent': self.subevent.pk if self.subevent else None,
+        }
+
+    def send_voucher_mail(self, user=None, auth=None):
         with language(self.locale, self.event.settings.region):
             self.send_mail(
                 self.event.settings.mail_subject_waiting_list,
@@ -229,7 +245,7 @@ class WaitingListEntry(LoggedModel):
                 get_email_context(
                     event=self.event,
                     waiting_list_entry=self,
-                    waiting_list_voucher=v,
+                    waiting_list_voucher=self.voucher,
                     event_or_subevent=self.subevent or self.event,
                 ),
                 user=user,
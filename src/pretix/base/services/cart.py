@@ -238,17 +238,22 @@ def _get_quota_availability(quota_diff, now_dt):
 def _get_voucher_availability(event, voucher_use_diff, now_dt, exclude_position_ids):
     vouchers_ok = {}
     _voucher_depend_on_cart = set()
+
+    # Count the cart usages of all vouchers in one query instead of one query per voucher
+    cart_counts = dict(
+        CartPosition.objects.filter(
+            Q(voucher__in=[v.pk for v in voucher_use_diff]) & Q(event=event) &
+            Q(expires__gte=now_dt)
+        ).exclude(pk__in=exclude_position_ids).order_by().values('voucher').annotate(c=Count('*')).values_list('voucher', 'c')
+    )
+
     for voucher, count in voucher_use_diff.items():
         voucher.refresh_from_db()
 
         if voucher.valid_until is not None and voucher.valid_until < now_dt:
             raise CartError(error_messages['voucher_expired'])
 
-        redeemed_in_carts = CartPosition.objects.filter(
-            Q(voucher=voucher) & Q(event=event) &
-            Q(expires__gte=now_dt)
-        ).exclude(pk__in=exclude_position_ids)
-        cart_count = redeemed_in_carts.count()
+        cart_count = cart_counts.get(voucher.pk, 0)
         v_avail = voucher.max_usages - voucher.redeemed - cart_count
         if cart_count > 0:
             _voucher_depend_on_cart.add(voucher)
@@ -26,6 +26,7 @@ from itertools import groupby
 from math import inf
 from typing import List
 
+from django.db.models import prefetch_related_objects
 from django.utils.functional import cached_property
 
 from pretix.base.models import CartPosition, ItemCategory, SalesChannel
@@ -132,6 +133,12 @@ class CrossSellingService:
         potential_discount_set = dict.fromkeys(
             info for lst in potential_discounts_by_cartpos.values() for info in lst)
 
+        # discounts might have been restored from cache without their product relations
+        prefetch_related_objects(
+            list({discount_rule for (discount_rule, max_count, i, subevent_id) in potential_discount_set.keys()}),
+            'benefit_limit_products'
+        )
+
         # sum up the max_counts and pass them on (also pass on the discount_rules so we can calculate actual discounted prices later):
         # group by benefit product
         # - max_count for product: sum up max_counts
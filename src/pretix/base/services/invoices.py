@@ -36,6 +36,7 @@ import inspect
 import logging
 from datetime import timedelta
 from decimal import ROUND_HALF_UP, Decimal
+from typing import List
 
 from django.conf import settings
 from django.core.files.base import ContentFile
@@ -52,10 +53,12 @@ from i18nfield.strings import LazyI18nString
 
 from pretix.base.i18n import language
 from pretix.base.models import (
-    ExchangeRate, Invoice, InvoiceAddress, InvoiceLine, Order, OrderFee,
+    Event, ExchangeRate, Invoice, InvoiceAddress, InvoiceLine, Order, OrderFee,
 )
 from pretix.base.models.tax import EU_CURRENCIES
-from pretix.base.services.tasks import TransactionAwareTask
+from pretix.base.services.tasks import (
+    TransactionAwareProfiledEventTask, TransactionAwareTask,
+)
 from pretix.base.signals import invoice_line_text, periodic_task
 from pretix.celery_app import app
 from pretix.helpers.database import OF_SELF, rolledback_transaction
@@ -63,6 +66,8 @@ from pretix.helpers.models import modelcopy
 
 logger = logging.getLogger(__name__)
 
+INVOICE_PDF_BATCH_SIZE = 100
+
 
 def _location_oneliner(loc):
     return ', '.join([l.strip() for l in loc.splitlines() if l and l.strip()])
@@ -405,6 +410,18 @@ def generate_invoice(order: Order, trigger_pdf=True):
     return invoice
 
 
+def _render_invoice_pdf(invoice: Invoice, renderer):
+    if invoice.shredded:
+        return None
+    if invoice.file:
+        invoice.file.delete()
+    with language(invoice.locale, invoice.event.settings.region):
+        fname, ftype, fcontent = renderer.generate(invoice)
+        invoice.file.save(fname, ContentFile(fcontent), save=False)
+        invoice.save(update_fields=['file'])
+        return invoice.file.name
+
+
 @app.task(base=TransactionAwareTask)
 def invoice_pdf_task(invoice: int):
     with scopes_disabled():
@@ -412,13 +429,20 @@ def invoice_pdf_task(invoice: int):
     with scope(organizer=i.order.event.organizer):
         if i.shredded:
             return None
-        if i.file:
-            i.file.delete()
-        with language(i.locale, i.event.settings.region):
-            fname, ftype, fcontent = i.event.invoice_renderer.generate(i)
-            i.file.save(fname, ContentFile(fcontent), save=False)
-            i.save(update_fields=['file'])
-            return i.file.name
+        return _render_invoice_pdf(i, i.event.invoice_renderer)
+
+
+@app.task(base=TransactionAwareProfiledEventTask)
+def invoice_pdf_batch_task(event: Event, invoices: List[int]):
+    # All invoices share one renderer, which only needs to load fonts and logos once
+    renderer = event.invoice_renderer
+    for i in event.invoices.filter(pk__in=invoices).select_related('order'):
+        i.event = event
+        try:
+            _render_invoice_pdf(i, renderer)
+        except Exception:
+            # The PDF will be generated on first download instead
+            logger.exception(f'Could not generate PDF for invoice {i.pk}')
 
 
 def invoice_qualified(order: Order):
@@ -436,6 +460,15 @@ def invoice_pdf(*args, **kwargs):
     invoice_pdf_task.apply_async(args=args, kwargs=kwargs)
 
 
+def invoice_pdf_batch(event: Event, invoices: List[int]):
+    """
+    Generates the PDF files for many invoices of the same event, e.g. after an import. Unlike ``invoice_pdf``, this
+    does not queue a task for every single invoice but renders them in chunks of ``INVOICE_PDF_BATCH_SIZE``.
+    """
+    for i in range(0, len(invoices), INVOICE_PDF_BATCH_SIZE):
+        invoice_pdf_batch_task.apply_async(args=(event.pk, invoices[i:i + INVOICE_PDF_BATCH_SIZE]))
+
+
 class DummyRollbackException(Exception):
     pass
 
@@ -32,6 +32,7 @@
 # Unless required by applicable law or agreed to in writing, software distributed under the Apache License 2.0 is
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations under the License.
+import atexit
 import hashlib
 import inspect
 import logging
@@ -39,11 +40,13 @@ import mimetypes
 import os
 import re
 import smtplib
+import threading
+import time
 import warnings
 from email.mime.image import MIMEImage
 from email.utils import formataddr
 from typing import Any, Dict, List, Sequence, Union
-from urllib.parse import urljoin, urlparse
+from urllib.parse import unquote, urljoin, urlparse
 from zoneinfo import ZoneInfo
 
 import requests
@@ -51,10 +54,12 @@ from bs4 import BeautifulSoup
 from celery import chain
 from celery.exceptions import MaxRetriesExceededError
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage
 from django.core.mail import (
     EmailMultiAlternatives, SafeMIMEMultipart, get_connection,
 )
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
 from django.core.mail.message import SafeMIMEText
 from django.db import transaction
 from django.template.loader import get_template
@@ -84,11 +89,27 @@ from pretix.presale.ical import get_private_icals
 logger = logging.getLogger('pretix.base.mail')
 INVALID_ADDRESS = 'invalid-pretix-mail-address'
 
+# Images embedded into HTML emails are usually the same few logos for thousands of emails, so we keep their content
+# in the cache instead of downloading them again for every email.
+CID_IMAGE_CACHE_TIMEOUT = 3600
+CID_IMAGE_CACHE_MAX_SIZE = 1024 * 1024
+
 
 class TolerantDict(dict):
+    """
+    Looks up values in ``context`` without copying it, such that lazily rendered placeholders are only
+    rendered if they are used. Unknown keys are replaced by their name.
+    """
+
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
 
     def __missing__(self, key):
-        return key
+        try:
+            return self.context[key]
+        except KeyError:
+            return key
 
 
 class SendMailException(Exception):
@@ -384,6 +405,95 @@ class CustomEmail(EmailMultiAlternatives):
         return super()._create_mime_attachment(content, mimetype)
 
 
+class SMTPConnectionPool:
+    """
+    Keeps SMTP connections open within a worker process for a short time, such that a series of emails sent
+    through the same server does not require a new connection and login for every single email. Connections are
+    handed out exclusively, so concurrent tasks never share one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def _key(self, backend):
+        return (
+            type(backend), backend.host, backend.port, backend.username, backend.password, backend.use_tls,
+            backend.use_ssl,
+        )
+
+    def acquire(self, backend):
+        """
+        Returns a tuple of a backend to send with and whether it is an already open, reused connection.
+        """
+        if not isinstance(backend, SMTPEmailBackend) or settings.MAIL_CONNECTION_MAX_IDLE <= 0:
+            return backend, False
+        with self._lock:
+            entry = self._connections.pop(self._key(backend), None)
+        if entry:
+            pooled, last_used, sent = entry
+            if time.monotonic() - last_used < settings.MAIL_CONNECTION_MAX_IDLE:
+                pooled._pretix_sent = sent
+                return pooled, True
+            pooled.close()
+        backend.open()
+        backend._pretix_sent = 0
+        return backend, False
+
+    def release(self, backend):
+        if not isinstance(backend, SMTPEmailBackend) or settings.MAIL_CONNECTION_MAX_IDLE <= 0:
+            return
+        sent = backend._pretix_sent + 1
+        if sent >= settings.MAIL_CONNECTION_MAX_MESSAGES:
+            backend.close()
+            return
+        with self._lock:
+            previous = self._connections.pop(self._key(backend), None)
+            self._connections[self._key(backend)] = (backend, time.monotonic(), sent)
+        if previous:
+            previous[0].close()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for backend, last_used, sent in connections.values():
+            try:
+                backend.close()
+            except Exception:
+                pass
+
+    def _reset(self):
+        # Connections must never be shared with a forked process
+        self._lock = threading.Lock()
+        self._connections = {}
+
+
+_connection_pool = SMTPConnectionPool()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_connection_pool._reset)
+atexit.register(_connection_pool.close_all)
+
+
+def _send_messages(backend, messages):
+    connection, reused = _connection_pool.acquire(backend)
+    try:
+        try:
+            connection.send_messages(messages)
+        except smtplib.SMTPServerDisconnected:
+            if not reused:
+                raise
+            # The server closed the connection while it was idle, try again with a fresh one
+            connection.close()
+            connection = backend
+            connection.open()
+            connection._pretix_sent = 0
+            connection.send_messages(messages)
+    except Exception:
+        connection.close()
+        raise
+    _connection_pool.release(connection)
+
+
 @app.task(base=TransactionAwareTask, bind=True, acks_late=True)
 def mail_send_task(self, *args, to: List[str], subject: str, body: str, html: str, sender: str,
                    event: int = None, position: int = None, headers: dict = None, cc: List[str] = None, bcc: List[str] = None,
@@ -538,7 +648,7 @@ def mail_send_task(self, *args, to: List[str], subject: str, body: str, html: st
                                                  organizer=organizer, customer=customer)
 
         try:
-            backend.send_messages([email])
+            _send_messages(backend, [email])
         except (smtplib.SMTPResponseException, smtplib.SMTPSenderRefused) as e:
             if e.smtp_code in (101, 111, 421, 422, 431, 432, 442, 447, 452):
                 if e.smtp_code == 432 and settings.HAS_REDIS:
@@ -737,9 +847,8 @@ def convert_image_to_cid(image_src, cid_id, verify_ssl=True):
             path = urlparse(image_src).path
             image_type = os.path.splitext(path)[1][1:]
 
-            response = requests.get(image_src, verify=verify_ssl)
             mime_image = MIMEImage(
-                response.content, _subtype=image_type)
+                get_cid_image_content(image_src, verify_ssl), _subtype=image_type)
 
         mime_image.add_header('Content-ID', '<%s>' % cid_id)
         mime_image.add_header('Content-Disposition', 'inline;\n filename="{}.{}"'.format(cid_id, image_type))
@@ -750,6 +859,49 @@ def convert_image_to_cid(image_src, cid_id, verify_ssl=True):
         return None
 
 
+def _storage_name_for_url(url):
+    """
+    Returns the name of the file in ``default_storage`` if the given URL points to one of our public media files.
+    Other files, e.g. invoices, are protected by the web server and must not be embedded just because someone
+    links to them.
+    """
+    url = url.split('#')[0].split('?')[0]
+    prefixes = [settings.MEDIA_URL]
+    if '://' not in settings.MEDIA_URL:
+        prefixes.append(urljoin(settings.SITE_URL, settings.MEDIA_URL))
+    for prefix in prefixes:
+        if url.startswith(prefix):
+            name = unquote(url[len(prefix):])
+            if name.startswith('pub/') and '..' not in name.split('/'):
+                return name
+    return None
+
+
+def get_cid_image_content(url, verify_ssl=True):
+    """
+    Returns the content of an image referenced by a normalized URL. Media files are read from our storage, all
+    other files are downloaded. Results are cached by URL, unless the image is larger than
+    ``CID_IMAGE_CACHE_MAX_SIZE``.
+    """
+    cache_key = 'pretix_mail_cid_image_{}'.format(hashlib.sha256(url.encode()).hexdigest())
+    content = cache.get(cache_key)
+    if content is not None:
+        return content
+
+    storage_name = _storage_name_for_url(url)
+    if storage_name and default_storage.exists(storage_name):
+        with default_storage.open(storage_name) as f:
+            content = f.read()
+    else:
+        response = requests.get(url, verify=verify_ssl, timeout=10)
+        response.raise_for_status()
+        content = response.content
+
+    if len(content) <= CID_IMAGE_CACHE_MAX_SIZE:
+        cache.set(cache_key, content, timeout=CID_IMAGE_CACHE_TIMEOUT)
+    return content
+
+
 def normalize_image_url(url):
     if '://' not in url:
         """
@@ -24,7 +24,7 @@ from typing import List
 
 from django.conf import settings as django_settings
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import connection, transaction
 from django.utils.timezone import now
 from django.utils.translation import gettext as _
 
@@ -33,18 +33,46 @@ from pretix.base.modelimport import DataImportError, ImportColumn, parse_csv
 from pretix.base.modelimport_orders import get_order_import_columns
 from pretix.base.modelimport_vouchers import get_voucher_import_columns
 from pretix.base.models import (
-    CachedFile, Event, InvoiceAddress, Order, OrderPayment, OrderPosition,
-    User, Voucher,
+    CachedFile, Event, Invoice, InvoiceAddress, LogEntry, Order, OrderPayment,
+    OrderPosition, User, Voucher,
 )
 from pretix.base.models.orders import Transaction
-from pretix.base.services.invoices import generate_invoice, invoice_qualified
+from pretix.base.services.invoices import (
+    generate_invoice, invoice_pdf_batch, invoice_qualified,
+)
 from pretix.base.services.locking import lock_objects
 from pretix.base.services.tasks import ProfiledEventTask
 from pretix.base.signals import order_paid, order_placed
 from pretix.celery_app import app
 
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 10
+
+
+def _raise_collected_errors(errors: List[str]):
+    if len(errors) == 1:
+        raise DataImportError(errors[0])
+    msg = '\n'.join(errors[:MAX_REPORTED_ERRORS])
+    if len(errors) > MAX_REPORTED_ERRORS:
+        msg += '\n' + _('… and {count} more errors.').format(count=len(errors) - MAX_REPORTED_ERRORS)
+    raise DataImportError(msg)
+
+
+def _task_progress_setter(task):
+    def set_progress(val):
+        if not task.request.called_directly:
+            task.update_state(
+                state='PROGRESS',
+                meta={'value': val}
+            )
+    return set_progress
+
 
-def _validate(cf: CachedFile, charset: str, cols: List[ImportColumn], settings: dict):
+def _validate(cf: CachedFile, charset: str, cols: List[ImportColumn], settings: dict, progress_callback=None):
+    """
+    Parses and cleans all rows of the file. Instead of stopping at the first invalid value, this collects the first
+    error of every row so the user can fix all of them at once.
+    """
     try:
         parsed = parse_csv(cf.file, charset=charset)
     except UnicodeDecodeError as e:
@@ -55,6 +83,7 @@ def _validate(cf: CachedFile, charset: str, cols: List[ImportColumn], settings:
             )
         )
     data = []
+    errors = []
     for i, record in enumerate(parsed):
         if not any(record.values()):
             continue
@@ -66,23 +95,33 @@ def _validate(cf: CachedFile, charset: str, cols: List[ImportColumn], settings:
             try:
                 values[c.identifier] = c.clean(val, values)
             except ValidationError as e:
-                raise DataImportError(
+                # Later columns might depend on this value, so we skip the rest of the row to not report
+                # errors that are just a consequence of this one.
+                errors.append(
                     _(
                         'Error while importing value "{value}" for column "{column}" in line "{line}": {message}').format(
                         value=val if val is not None else '', column=c.verbose_name, line=i + 1, message=e.message
                     )
                 )
-        data.append(values)
+                break
+        else:
+            data.append(values)
+        if progress_callback and i % 100 == 0:
+            progress_callback(i)
+    if errors:
+        _raise_collected_errors(errors)
     return data
 
 
-@app.task(base=ProfiledEventTask, throws=(DataImportError,))
-def import_orders(event: Event, fileid: str, settings: dict, locale: str, user, charset=None) -> None:
+@app.task(base=ProfiledEventTask, throws=(DataImportError,), bind=True)
+def import_orders(self, event: Event, fileid: str, settings: dict, locale: str, user, charset=None) -> None:
     cf = CachedFile.objects.get(id=fileid)
     user = User.objects.get(pk=user)
+    set_progress = _task_progress_setter(self)
     with language(locale, event.settings.region):
         cols = get_order_import_columns(event)
-        data = _validate(cf, charset, cols, settings)
+        data = _validate(cf, charset, cols, settings, progress_callback=lambda i: set_progress(min(i / 100, 20)))
+        set_progress(20)
 
         if settings['orders'] == 'one' and len(data) > django_settings.PRETIX_MAX_ORDER_SIZE:
             raise DataImportError(
@@ -95,6 +134,7 @@ def import_orders(event: Event, fileid: str, settings: dict, locale: str, user,
         # Prepare model objects. Yes, this might consume lots of RAM, but allows us to make the actual SQL transaction
         # shorter. We'll see what works better in reality…
         lock_seats = []
+        errors = []
         for i, record in enumerate(data):
             try:
                 if order is None or settings['orders'] == 'many':
@@ -120,9 +160,12 @@ def import_orders(event: Event, fileid: str, settings: dict, locale: str, user,
                 if position.seat is not None:
                     lock_seats.append((order.sales_channel, position.seat))
             except (ValidationError, ImportError) as e:
-                raise DataImportError(
+                errors.append(
                     _('Invalid data in row {row}: {message}').format(row=i, message=str(e))
                 )
+        if errors:
+            _raise_collected_errors(errors)
+        set_progress(30)
 
         try:
             with transaction.atomic():
@@ -134,7 +177,8 @@ def import_orders(event: Event, fileid: str, settings: dict, locale: str, user,
                             raise DataImportError(_('The seat you selected has already been taken. Please select a different seat.'))
 
                 save_transactions = []
-                for o in orders:
+                log_entries = []
+                for i, o in enumerate(orders):
                     o.total = sum([c.price for c in o._positions])  # currently no support for fees
                     if o.total == Decimal('0.00'):
                         o.status = Order.STATUS_PAID
@@ -170,15 +214,25 @@ def import_orders(event: Event, fileid: str, settings: dict, locale: str, user,
                     o._address.save()
                     for c in cols:
                         c.save(o)
-                    o.log_action(
+                    log_entries.append(o.log_action(
                         'pretix.event.order.placed',
                         user=user,
-                        data={'source': 'import'}
-                    )
+                        data={'source': 'import'},
+                        save=False,
+                    ))
                     save_transactions += o.create_transactions(is_new=True, fees=[], positions=o._positions, save=False)
+                    if len(log_entries) >= IMPORT_BATCH_SIZE:
+                        LogEntry.bulk_create_and_postprocess(log_entries)
+                        Transaction.objects.bulk_create(save_transactions)
+                        log_entries.clear()
+                        save_transactions.clear()
+                        set_progress(30 + 50 * i / len(orders))
+                LogEntry.bulk_create_and_postprocess(log_entries)
                 Transaction.objects.bulk_create(save_transactions)
+            set_progress(80)
 
-            for o in orders:
+            invoiced_orders = []
+            for i, o in enumerate(orders):
                 with language(o.locale, event.settings.region):
                     order_placed.send(event, order=o)
                     if o.status == Order.STATUS_PAID:
@@ -189,25 +243,35 @@ def import_orders(event: Event, fileid: str, settings: dict, locale: str, user,
                         (event.settings.get('invoice_generate') == 'paid' and o.status == Order.STATUS_PAID)
                     ) and not o.invoices.last()
                     if gen_invoice:
-                        generate_invoice(o, trigger_pdf=True)
+                        generate_invoice(o, trigger_pdf=False)
+                        invoiced_orders.append(o.pk)
+                if i % 100 == 0:
+                    set_progress(80 + 20 * i / len(orders))
+            if invoiced_orders:
+                invoice_pdf_batch(event, list(
+                    Invoice.objects.filter(order_id__in=invoiced_orders).order_by('pk').values_list('pk', flat=True)
+                ))
         except DataImportError:
             raise ValidationError(_('We were not able to process your request completely as the server was too busy. '
                                     'Please try again.'))
     cf.delete()
 
 
-@app.task(base=ProfiledEventTask, throws=(DataImportError,))
-def import_vouchers(event: Event, fileid: str, settings: dict, locale: str, user, charset=None) -> None:
+@app.task(base=ProfiledEventTask, throws=(DataImportError,), bind=True)
+def import_vouchers(self, event: Event, fileid: str, settings: dict, locale: str, user, charset=None) -> None:
     cf = CachedFile.objects.get(id=fileid)
     user = User.objects.get(pk=user)
+    set_progress = _task_progress_setter(self)
     with language(locale, event.settings.region):
         cols = get_voucher_import_columns(event)
-        data = _validate(cf, charset, cols, settings)
+        data = _validate(cf, charset, cols, settings, progress_callback=lambda i: set_progress(min(i / 1000, 20)))
+        set_progress(20)
 
         # Prepare model objects. Yes, this might consume lots of RAM, but allows us to make the actual SQL transaction
         # shorter. We'll see what works better in reality…
         vouchers = []
         lock_seats = []
+        errors = []
         for i, record in enumerate(data):
             try:
                 voucher = Voucher(event=event)
@@ -232,9 +296,12 @@ def import_vouchers(event: Event, fileid: str, settings: dict, locale: str, user
                 if voucher.seat is not None:
                     lock_seats.append(voucher.seat)
             except (ValidationError, ImportError) as e:
-                raise DataImportError(
+                errors.append(
                     _('Invalid data in row {row}: {message}').format(row=i, message=str(e))
                 )
+        if errors:
+            _raise_collected_errors(errors)
+        set_progress(30)
 
         with transaction.atomic():
             # We don't support quotas here, so we only need to lock if seats are in use
@@ -245,13 +312,28 @@ def import_vouchers(event: Event, fileid: str, settings: dict, locale: str, user
                         raise DataImportError(
                             _('The seat you selected has already been taken. Please select a different seat.'))
 
-            for v in vouchers:
-                v.save()
-                v.log_action(
-                    'pretix.voucher.added',
-                    user=user,
-                    data={'source': 'import'}
-                )
-                for c in cols:
-                    c.save(v)
+            for batch_start in range(0, len(vouchers), IMPORT_BATCH_SIZE):
+                batch = vouchers[batch_start:batch_start + IMPORT_BATCH_SIZE]
+                for v in batch:
+                    v.code = v.code.upper()
+                Voucher.objects.bulk_create(batch)
+                if not connection.features.can_return_rows_from_bulk_insert:
+                    from_db = {v.code: v for v in event.vouchers.filter(code__in=[v.code for v in batch])}
+                    for v in batch:
+                        v.pk = from_db[v.code].pk
+
+                LogEntry.bulk_create_and_postprocess([
+                    v.log_action(
+                        'pretix.voucher.added',
+                        user=user,
+                        data={'source': 'import'},
+                        save=False,
+                    ) for v in batch
+                ])
+                for v in batch:
+                    for c in cols:
+                        c.save(v)
+                set_progress(30 + 70 * (batch_start + len(batch)) / len(vouchers))
+            if vouchers:
+                event.cache.set('vouchers_exist', True)
     cf.delete()
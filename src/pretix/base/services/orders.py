@@ -50,8 +50,8 @@ from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.db.models import (
-    Count, Exists, F, IntegerField, Max, Min, OuterRef, Q, QuerySet, Sum,
-    Value,
+    Count, Exists, F, IntegerField, Max, Min, OuterRef, Q, QuerySet, Subquery,
+    Sum, Value,
 )
 from django.db.models.functions import Coalesce, Greatest
 from django.db.transaction import get_connection
@@ -341,19 +341,23 @@ def mark_order_expired(order, user=None, auth=None):
             order = Order.objects.get(pk=order)
         if isinstance(user, int):
             user = User.objects.get(pk=user)
-        order.status = Order.STATUS_EXPIRED
-        order.save(update_fields=['status'])
-
-        order.log_action('pretix.event.order.expired', user=user, auth=auth)
-        i = order.invoices.filter(is_cancellation=False).last()
-        if i and not i.refered.exists():
-            generate_cancellation(i)
-        order.create_transactions()
+        _expire_order(order, user=user, auth=auth)
 
     order_expired.send(order.event, order=order)
     return order
 
 
+def _expire_order(order, user=None, auth=None):
+    order.status = Order.STATUS_EXPIRED
+    order.save(update_fields=['status'])
+
+    order.log_action('pretix.event.order.expired', user=user, auth=auth)
+    i = order.invoices.filter(is_cancellation=False).last()
+    if i and not i.refered.exists():
+        generate_cancellation(i)
+    order.create_transactions()
+
+
 def approve_order(order, user=None, send_mail: bool=True, auth=None, force=False):
     """
     Mark this order as approved
@@ -1324,13 +1328,11 @@ def _perform_order(event: Event, payment_requests: List[dict], position_ids: Lis
     }
 
 
-@receiver(signal=periodic_task)
-@scopes_disabled()
-def expire_orders(sender, **kwargs):
-    event_id = None
-    expire = None
+EXPIRE_ORDERS_BATCH_SIZE = 500
 
-    qs = Order.objects.filter(
+
+def _expirable_orders():
+    return Order.objects.filter(
         expires__lt=now(),
         status=Order.STATUS_PENDING,
         valid_if_pending=False,
@@ -1339,13 +1341,64 @@ def expire_orders(sender, **kwargs):
         Exists(
             OrderFee.objects.filter(order_id=OuterRef('pk'), fee_type=OrderFee.FEE_TYPE_CANCELLATION)
         )
-    ).prefetch_related('event').order_by('event_id')
-    for o in qs:
-        if o.event_id != event_id:
-            expire = o.event.settings.get('payment_term_expire_automatically', as_type=bool)
-            event_id = o.event_id
-        if expire and now() >= o.payment_term_expire_date:
-            mark_order_expired(o)
+    )
+
+
+@app.task(base=ProfiledEventTask, acks_late=True)
+def expire_orders_batch(event: Event, order_ids: List[int]):
+    for o in _expirable_orders().filter(event=event, pk__in=order_ids).order_by('pk'):
+        o.event = event
+        if now() < o.payment_term_expire_date:
+            continue
+        with transaction.atomic():
+            # The same order might be part of a batch queued by an earlier run, make sure we only expire it once
+            locked = Order.objects.select_for_update(of=OF_SELF).get(pk=o.pk)
+            if locked.status != Order.STATUS_PENDING:
+                continue
+            _expire_order(o)
+        order_expired.send(event, order=o)
+
+
+@receiver(signal=periodic_task)
+@scopes_disabled()
+def expire_orders(sender, **kwargs):
+    qs = _expirable_orders()
+    event_ids = qs.order_by().values_list('event_id', flat=True).distinct()
+    for event in Event.objects.filter(pk__in=event_ids):
+        if not event.settings.get('payment_term_expire_automatically', as_type=bool):
+            continue
+        if event.settings.get('payment_term_expire_delay_days', as_type=int):
+            # The payment term might be extended beyond the expiry date, only queue orders that are actually due
+            order_ids = []
+            for o in qs.filter(event=event).order_by('pk').iterator():
+                o.event = event
+                if now() >= o.payment_term_expire_date:
+                    order_ids.append(o.pk)
+        else:
+            order_ids = list(qs.filter(event=event).order_by('pk').values_list('pk', flat=True))
+        for i in range(0, len(order_ids), EXPIRE_ORDERS_BATCH_SIZE):
+            expire_orders_batch.apply_async(args=(event.pk, order_ids[i:i + EXPIRE_ORDERS_BATCH_SIZE]))
+
+
+def _iter_with_open_payments(orders, chunk_size=1000):
+    """
+    Iterates over orders annotated with ``last_payment_id`` and attaches their last payment as ``open_last_payment``
+    if it has not been completed yet, using one query per chunk of orders.
+    """
+    last_pk = 0
+    while True:
+        # We do not use a database cursor here since the caller opens transactions while iterating
+        chunk = list(orders.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1].pk
+        payments = OrderPayment.objects.filter(
+            pk__in=[o.last_payment_id for o in chunk if o.last_payment_id],
+            state__in=[OrderPayment.PAYMENT_STATE_CREATED, OrderPayment.PAYMENT_STATE_PENDING],
+        ).in_bulk()
+        for o in chunk:
+            o.open_last_payment = payments.get(o.last_payment_id)
+            yield o
 
 
 @receiver(signal=periodic_task)
@@ -1353,32 +1406,40 @@ def expire_orders(sender, **kwargs):
 @minimum_interval(minutes_after_success=60)
 def send_expiry_warnings(sender, **kwargs):
     today = now().replace(hour=0, minute=0, second=0)
-    days = None
-    settings = None
-    event_id = None
 
-    for o in Order.objects.filter(
-            expires__gte=today, expiry_reminder_sent=False, status=Order.STATUS_PENDING,
-            datetime__lte=now() - timedelta(hours=2), require_approval=False
-    ).only('pk', 'event_id', 'expires').order_by('event_id'):
-
-        lp = o.payments.last()
-        if (
-                lp and
-                lp.state in [OrderPayment.PAYMENT_STATE_CREATED, OrderPayment.PAYMENT_STATE_PENDING] and
-                lp.payment_provider and
-                lp.payment_provider.prevent_reminder_mail(o, lp)
-        ):
+    qs = Order.objects.filter(
+        expires__gte=today, expiry_reminder_sent=False, status=Order.STATUS_PENDING,
+        datetime__lte=now() - timedelta(hours=2), require_approval=False
+    )
+    event_ids = qs.order_by().values_list('event_id', flat=True).distinct()
+    for event in Event.objects.filter(pk__in=event_ids).select_related('organizer'):
+        settings = event.settings
+        days = cache.get_or_set('{}:{}:setting_mail_days_order_expire_warning'.format('event', event.pk),
+                                default=lambda: settings.get('mail_days_order_expire_warning', as_type=int),
+                                timeout=3600)
+        if not days:
             continue
 
-        if event_id != o.event_id:
-            settings = o.event.settings
-            days = cache.get_or_set('{}:{}:setting_mail_days_order_expire_warning'.format('event', o.event_id),
-                                    default=lambda: settings.get('mail_days_order_expire_warning', as_type=int),
-                                    timeout=3600)
-            event_id = o.event_id
+        orders = qs.filter(
+            event=event,
+            expires__lt=today + timedelta(days=days + 1),
+        ).annotate(
+            last_payment_id=Subquery(
+                OrderPayment.objects.filter(order_id=OuterRef('pk')).order_by('-local_id').values('pk')[:1]
+            ),
+        ).only('pk', 'event_id', 'expires').order_by('pk')
+
+        for o in _iter_with_open_payments(orders):
+            o.event = event
+            lp = o.open_last_payment
+            if lp:
+                lp.order = o
+                if lp.payment_provider and lp.payment_provider.prevent_reminder_mail(o, lp):
+                    continue
+
+            if (o.expires - today).days > days:
+                continue
 
-        if days and (o.expires - today).days <= days:
             with transaction.atomic():
                 o = Order.objects.select_related('event').select_for_update(of=OF_SELF).get(pk=o.pk)
                 if o.status != Order.STATUS_PENDING or o.expiry_reminder_sent:
@@ -0,0 +1,197 @@
+#
+# This file is part of pretix (Community Edition).
+#
+# Copyright (C) 2014-2020 Raphael Michel and contributors
+# Copyright (C) 2020-2021 rami.io GmbH and contributors
+#
+# This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation in version 3 of the License.
+#
+# ADDITIONAL TERMS APPLY: Pursuant to Section 7 of the GNU Affero General Public License, additional terms are
+# applicable granting you additional permissions and placing additional restrictions on your usage of this software.
+# Please refer to the pretix LICENSE file to obtain the full terms applicable to this work. If you did not receive
+# this file, see <https://pretix.eu/about/en/license>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
+# <https://www.gnu.org/licenses/>.
+#
+import threading
+from typing import Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django_scopes import scopes_disabled
+
+from pretix.base.models import (
+    InvoiceAddress, Order, OrderPosition, OrderSearchDocument,
+)
+from pretix.base.signals import periodic_task
+from pretix.helpers.periodic import minimum_interval
+
+ORDER_FIELDS = {'code', 'email', 'comment'}
+POSITION_FIELDS = {'attendee_name_cached', 'attendee_name_parts', 'attendee_email', 'secret', 'pseudonymization_id',
+                   'canceled'}
+INVOICE_ADDRESS_FIELDS = {'name_cached', 'name_parts', 'company'}
+
+BACKFILL_COMPLETE_KEY = 'ordersearch_backfill_complete'
+
+_pending = threading.local()
+
+
+def build_search_text(order: Order) -> str:
+    """
+    Returns the search document of ``order``. Expects ``order.event``, ``order.invoice_address`` and
+    ``order.positions`` to be prefetched.
+    """
+    parts = [
+        order.code,
+        '{}-{}'.format(order.event.slug, order.code),
+        order.email,
+        order.comment,
+    ]
+    try:
+        ia = order.invoice_address
+    except InvoiceAddress.DoesNotExist:
+        pass
+    else:
+        parts += [ia.name_cached, ia.company]
+    for p in order.positions.all():
+        parts += [p.attendee_name_cached, p.attendee_email]
+    # Newlines can't be part of a search query, so matches never span two fields
+    return '\n'.join(p.replace('\n', ' ') for p in parts if p).lower()
+
+
+def build_search_prefixes(order: Order) -> str:
+    """
+    Returns the values of ``order`` that the search only matches from their start, i.e. the secrets and
+    pseudonymization IDs of all positions. Every value is preceded by a newline, so a prefix match is a search
+    for the newline followed by the query. Expects ``order.positions`` to be prefetched.
+    """
+    parts = []
+    for p in order.positions.all():
+        parts += [p.secret, p.pseudonymization_id]
+    return ''.join('\n' + p.replace('\n', ' ') for p in parts if p).lower()
+
+
+@scopes_disabled()
+def update_search_documents(order_ids: Iterable[int]):
+    orders = Order.objects.filter(pk__in=order_ids).select_related('event', 'invoice_address').prefetch_related(
+        Prefetch(
+            'positions',
+            queryset=OrderPosition.objects.only(
+                'order', 'attendee_name_cached', 'attendee_email', 'secret', 'pseudonymization_id'
+            )
+        )
+    )
+    OrderSearchDocument.objects.bulk_create(
+        [
+            OrderSearchDocument(order=o, text=build_search_text(o), prefixes=build_search_prefixes(o))
+            for o in orders
+        ],
+        update_conflicts=True,
+        unique_fields=['order'],
+        update_fields=['text', 'prefixes'],
+    )
+
+
+def rebuild_search_documents(event, batch_size=1000):
+    """
+    Rebuilds the search documents of all orders of ``event``, e.g. after data has been changed with bulk
+    updates that do not trigger the signals below.
+    """
+    last_pk = 0
+    while True:
+        ids = list(
+            Order.objects.filter(event=event, pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        update_search_documents(ids)
+        last_pk = ids[-1]
+
+
+def search_documents_q(query: str) -> Q:
+    """
+    Returns a filter for ``Order`` querysets that matches all orders whose search document contains
+    ``query``, including the variants of order codes that the search accepts.
+    """
+    terms = {query.lower()}
+    if "-" in query:
+        slug, code = query.rsplit("-", 1)
+        terms.add('{}-{}'.format(slug, Order.normalize_code(code)).lower())
+    else:
+        terms.add(Order.normalize_code(query).lower())
+    q = Q(prefixes__contains='\n' + query.lower())
+    for t in terms:
+        q |= Q(text__contains=t)
+    return Q(pk__in=OrderSearchDocument.objects.filter(q).values('order_id'))
+
+
+def search_documents_complete() -> bool:
+    """
+    Returns whether all orders had a search document when the backfill last ran. Until then, the search needs to
+    look at the individual tables for orders without a document.
+    """
+    return bool(cache.get(BACKFILL_COMPLETE_KEY))
+
+
+def _flush_pending():
+    order_ids = getattr(_pending, 'order_ids', None)
+    if order_ids:
+        _pending.order_ids = set()
+        update_search_documents(order_ids)
+
+
+def schedule_search_document_update(order_id: int):
+    """
+    Updates the search document of the given order once the current transaction is committed. Multiple calls
+    within the same transaction, e.g. for all positions of an order, only cause a single update.
+    """
+    if not hasattr(_pending, 'order_ids'):
+        _pending.order_ids = set()
+    _pending.order_ids.add(order_id)
+    transaction.on_commit(_flush_pending, robust=True)
+
+
+def _fields_changed(update_fields, relevant_fields):
+    return update_fields is None or bool(set(update_fields) & relevant_fields)
+
+
+@receiver(post_save, sender=Order, dispatch_uid="ordersearch_order_saved")
+def order_saved(sender, instance, created, update_fields=None, **kwargs):
+    if _fields_changed(update_fields, ORDER_FIELDS):
+        schedule_search_document_update(instance.pk)
+
+
+@receiver(post_save, sender=OrderPosition, dispatch_uid="ordersearch_position_saved")
+def position_saved(sender, instance, created, update_fields=None, **kwargs):
+    if _fields_changed(update_fields, POSITION_FIELDS):
+        schedule_search_document_update(instance.order_id)
+
+
+@receiver(post_save, sender=InvoiceAddress, dispatch_uid="ordersearch_invoice_address_saved")
+def invoice_address_saved(sender, instance, created, update_fields=None, **kwargs):
+    if instance.order_id and _fields_changed(update_fields, INVOICE_ADDRESS_FIELDS):
+        schedule_search_document_update(instance.order_id)
+
+
+@receiver(signal=periodic_task, dispatch_uid="ordersearch_backfill")
+@scopes_disabled()
+@minimum_interval(minutes_after_success=5)
+def backfill_search_documents(sender, **kwargs):
+    # Create documents for orders that existed before search documents were introduced
+    ids = list(
+        Order.objects.filter(search_document__isnull=True).order_by('-pk').values_list('pk', flat=True)[:5000]
+    )
+    if ids:
+        cache.delete(BACKFILL_COMPLETE_KEY)
+        update_search_documents(ids)
+    else:
+        cache.set(BACKFILL_COMPLETE_KEY, True, None)
@@ -0,0 +1,123 @@
+#
+# This file is part of pretix (Community Edition).
+#
+# Copyright (C) 2014-2020 Raphael Michel and contributors
+# Copyright (C) 2020-2021 rami.io GmbH and contributors
+#
+# This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation in version 3 of the License.
+#
+# ADDITIONAL TERMS APPLY: Pursuant to Section 7 of the GNU Affero General Public License, additional terms are
+# applicable granting you additional permissions and placing additional restrictions on your usage of this software.
+# Please refer to the pretix LICENSE file to obtain the full terms applicable to this work. If you did not receive
+# this file, see <https://pretix.eu/about/en/license>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
+# <https://www.gnu.org/licenses/>.
+#
+import logging
+import time
+import uuid
+
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch.dispatcher import NO_RECEIVERS
+
+from pretix.base.metrics import (
+    pretix_periodic_task_duration_seconds, pretix_periodic_task_runs_total,
+)
+from pretix.base.services.tasks import ProfiledTask
+from pretix.base.signals import periodic_task
+from pretix.celery_app import app
+from pretix.helpers.periodic import SKIPPED
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single receiver run when dispatched to the workers. The overlap lock expires
+# shortly after, so a crashed worker does not block the receiver forever.
+PERIODIC_TASK_TIME_LIMIT = 3600
+PERIODIC_TASK_LOCK_TIMEOUT = PERIODIC_TASK_TIME_LIMIT + 300
+
+
+def receiver_name(receiver):
+    return f'{receiver.__module__}.{receiver.__name__}'
+
+
+def get_periodic_receivers(sender=None):
+    if not periodic_task.receivers or periodic_task.sender_receivers_cache.get(sender) is NO_RECEIVERS:
+        return []
+    return periodic_task._live_receivers(sender)
+
+
+def _record(name, status, duration=None):
+    if not settings.METRICS_ENABLED:
+        return
+    pretix_periodic_task_runs_total.inc(1, task_name=name, status=status)
+    if duration is not None:
+        pretix_periodic_task_duration_seconds.observe(duration, task_name=name)
+
+
+def run_periodic_receiver(receiver, sender=None):
+    """
+    Calls a single receiver of the ``periodic_task`` signal and records its outcome and run time
+    in the metrics. Exceptions are passed on to the caller.
+    """
+    name = receiver_name(receiver)
+    t0 = time.perf_counter()
+    try:
+        r = receiver(signal=periodic_task, sender=sender)
+    except SoftTimeLimitExceeded:
+        _record(name, 'timeout', time.perf_counter() - t0)
+        raise
+    except Exception:
+        _record(name, 'error', time.perf_counter() - t0)
+        raise
+    if r is SKIPPED:
+        _record(name, 'skipped')
+    else:
+        _record(name, 'success', time.perf_counter() - t0)
+    return r
+
+
+def _lock_key(name):
+    return f'pretix_periodic_{name}_dispatched'
+
+
+def dispatch_periodic_receiver(receiver):
+    """
+    Queues a receiver of the ``periodic_task`` signal to run on a worker. Returns ``False`` without
+    queueing anything if a previous run of the same receiver is still queued or running.
+    """
+    name = receiver_name(receiver)
+    lock_id = str(uuid.uuid4())
+    if not cache.add(_lock_key(name), lock_id, timeout=PERIODIC_TASK_LOCK_TIMEOUT):
+        _record(name, 'locked')
+        return False
+    try:
+        run_periodic_task.apply_async(args=(name, lock_id))
+    except Exception:
+        cache.delete(_lock_key(name))
+        raise
+    return True
+
+
+@app.task(base=ProfiledTask, soft_time_limit=PERIODIC_TASK_TIME_LIMIT)
+def run_periodic_task(name: str, lock_id: str = None):
+    try:
+        receiver = {receiver_name(r): r for r in get_periodic_receivers()}.get(name)
+        if not receiver:
+            logger.warning(f'Periodic task {name} is not known to this worker.')
+            return
+        run_periodic_receiver(receiver)
+    finally:
+        if lock_id:
+            try:
+                if cache.get(_lock_key(name)) == lock_id:
+                    cache.delete(_lock_key(name))
+            except Exception:
+                logger.exception('Could not release lock')
@@ -25,6 +25,7 @@ from datetime import timedelta
 from decimal import Decimal
 
 from django.dispatch import receiver
+from django.utils import timezone, translation
 from django.utils.formats import date_format
 from django.utils.html import escape
 from django.utils.timezone import now
@@ -194,6 +195,80 @@ class SimpleButtonPlaceholder(BaseRichTextPlaceholder):
         return f'{text}: {url}'
 
 
+def _registered_placeholders(event):
+    # Asking all plugins for their placeholders is not free, and when sending many emails we do it for the
+    # same event object over and over again.
+    if event is None:
+        return _collect_placeholders(event)
+    if getattr(event, '_registered_placeholders', None) is None:
+        event._registered_placeholders = _collect_placeholders(event)
+    return event._registered_placeholders
+
+
+def _collect_placeholders(event):
+    placeholders = []
+    for r, val in [
+        *register_mail_placeholders.send(sender=event),
+        *register_text_placeholders.send(sender=event)
+    ]:
+        if not isinstance(val, (list, tuple)):
+            val = [val]
+        placeholders += val
+    return placeholders
+
+
+class LazyPlaceholderDict(dict):
+    """
+    Dictionary of all placeholder values of a ``PlaceholderContext``. A placeholder is only rendered when it is
+    looked up for the first time, so formatting a text only computes the placeholders the text actually contains.
+    Placeholders are rendered with the language and timezone that were active when the dictionary was created.
+    """
+
+    def __init__(self, placeholder_context):
+        super().__init__()
+        self.placeholder_context = placeholder_context
+        self.language = translation.get_language()
+        self.timezone = timezone.get_current_timezone()
+
+    def __missing__(self, key):
+        placeholder = self.placeholder_context.placeholders.get(key)
+        if placeholder is None:
+            raise KeyError(key)
+        with translation.override(self.language), timezone.override(self.timezone):
+            value = self.placeholder_context.render_placeholder(placeholder)
+        self[key] = value
+        return value
+
+    def __contains__(self, key):
+        return super().__contains__(key) or key in self.placeholder_context.placeholders
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return dict.fromkeys([*self.placeholder_context.placeholders, *super().keys()]).keys()
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def copy(self):
+        c = LazyPlaceholderDict(self.placeholder_context)
+        dict.update(c, super().items())
+        return c
+
+
 class PlaceholderContext(SafeFormatter):
     """
     Holds the contextual arguments and corresponding list of available placeholders for formatting
@@ -210,15 +285,9 @@ class PlaceholderContext(SafeFormatter):
         self.placeholders = {}
         self.cache = {}
         event = kwargs['event']
-        for r, val in [
-            *register_mail_placeholders.send(sender=event),
-            *register_text_placeholders.send(sender=event)
-        ]:
-            if not isinstance(val, (list, tuple)):
-                val = [val]
-            for v in val:
-                if all(rp in kwargs for rp in v.required_context):
-                    self.placeholders[v.identifier] = v
+        for v in _registered_placeholders(event):
+            if all(rp in kwargs for rp in v.required_context):
+                self.placeholders[v.identifier] = v
 
     def _extend_context_args(self):
         from pretix.base.models import InvoiceAddress
@@ -249,6 +318,12 @@ class PlaceholderContext(SafeFormatter):
         return {identifier: self.render_placeholder(placeholder)
                 for (identifier, placeholder) in self.placeholders.items()}
 
+    def render_lazy(self):
+        """
+        Returns a dictionary like ``render_all``, but only renders placeholders once they are looked up.
+        """
+        return LazyPlaceholderDict(self)
+
     def get_value(self, key, args, kwargs):
         if key not in self.placeholders:
             return '{' + str(key) + '}'
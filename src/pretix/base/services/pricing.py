@@ -161,6 +161,44 @@ def get_line_price(price_after_voucher: Decimal, custom_price_input: Decimal, cu
     return price
 
 
+def get_compiled_discounts(event: Event, sales_channel: str, now_dt) -> List[Discount]:
+    """
+    Returns the discounts of ``event`` that are active for ``sales_channel`` at ``now_dt``, in the order they
+    need to be applied.
+
+    Since this is needed on every cart change, the discount configuration of the event is cached per sales channel,
+    including the sets of products every discount applies to. On a cache hit, the discount objects are reconstructed
+    without touching the database. The cache entry is invalidated whenever a discount or its relations change.
+    """
+    compiled = event.cache.get('compiled_discounts') or {}
+    if sales_channel not in compiled:
+        field_names = [f.attname for f in Discount._meta.concrete_fields]
+        discounts = list(event.discounts.filter(
+            Q(all_sales_channels=True) | Q(limit_sales_channels__identifier=sales_channel),
+            active=True,
+        ).prefetch_related('condition_limit_products', 'benefit_limit_products').order_by('position', 'pk'))
+        for d in discounts:
+            d._condition_product_ids = frozenset(p.pk for p in d.condition_limit_products.all())
+            d._benefit_product_ids = frozenset(p.pk for p in d.benefit_limit_products.all())
+        compiled[sales_channel] = [
+            (field_names, [getattr(d, f) for f in field_names], d._condition_product_ids, d._benefit_product_ids)
+            for d in discounts
+        ]
+        event.cache.set('compiled_discounts', compiled)
+        return [d for d in discounts if d.is_available_by_time(now_dt)]
+
+    discounts = []
+    for field_names, values, condition_product_ids, benefit_product_ids in compiled[sales_channel]:
+        d = Discount.from_db('default', field_names, values)
+        if not d.is_available_by_time(now_dt):
+            continue
+        d.event = event
+        d._condition_product_ids = condition_product_ids
+        d._benefit_product_ids = benefit_product_ids
+        discounts.append(d)
+    return discounts
+
+
 def apply_discounts(event: Event, sales_channel: Union[str, SalesChannel],
                     positions: List[Tuple[int, Optional[int], Decimal, bool, bool, Decimal]],
                     collect_potential_discounts: Optional[defaultdict]=None) -> List[Tuple[Decimal, Optional[Discount]]]:
@@ -183,17 +221,19 @@ def apply_discounts(event: Event, sales_channel: Union[str, SalesChannel],
         sales_channel = sales_channel.identifier
     new_prices = {}
 
-    discount_qs = event.discounts.filter(
-        Q(available_from__isnull=True) | Q(available_from__lte=time_machine_now()),
-        Q(available_until__isnull=True) | Q(available_until__gte=time_machine_now()),
-        Q(all_sales_channels=True) | Q(limit_sales_channels__identifier=sales_channel),
-        active=True,
-    ).prefetch_related('condition_limit_products', 'benefit_limit_products').order_by('position', 'pk')
-    for discount in discount_qs:
+    discounts = get_compiled_discounts(event, sales_channel, time_machine_now())
+    if not discounts:
+        return [(p[2], None) for p in positions]
+
+    position_infos = {
+        idx: PositionInfo(item_id, subevent_id, line_price_gross, is_addon_to, voucher_discount)
+        for idx, (item_id, subevent_id, line_price_gross, is_addon_to, is_bundled, voucher_discount) in enumerate(positions)
+        if not is_bundled
+    }
+    for discount in discounts:
         result = discount.apply({
-            idx: PositionInfo(item_id, subevent_id, line_price_gross, is_addon_to, voucher_discount)
-            for idx, (item_id, subevent_id, line_price_gross, is_addon_to, is_bundled, voucher_discount) in enumerate(positions)
-            if not is_bundled and idx not in new_prices
+            idx: info for idx, info in position_infos.items()
+            if idx not in new_prices
         }, collect_potential_discounts)
         for k in result.keys():
             result[k] = (result[k], discount)
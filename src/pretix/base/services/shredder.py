@@ -49,6 +49,7 @@ from django.utils.translation import gettext_lazy as _
 from pretix.base.i18n import language
 from pretix.base.models import CachedFile, Event, User, cachedfile_name
 from pretix.base.services.mail import SendMailException, mail
+from pretix.base.services.ordersearch import rebuild_search_documents
 from pretix.base.services.tasks import ProfiledEventTask
 from pretix.base.shredder import ShredError
 from pretix.celery_app import app
@@ -137,18 +138,36 @@ def shred(self, event: Event, fileid: str, confirm_code: str, user: int=None, lo
     if confirm_code is not True and any(shredder.require_download_confirmation for shredder in shredders):
         if indexdata['confirm_code'] != confirm_code:
             raise ShredError(_("The confirm code you entered was incorrect."))
-    if event.logentry_set.filter(datetime__gte=parse(indexdata['time'])):
+    if event.logentry_set.filter(datetime__gte=parse(indexdata['time'])).exclude(action_type__startswith='pretix.event.shredder.'):
         raise ShredError(_("Something happened in your event after the export, please try again."))
 
+    # If a previous run with the same export was interrupted, we skip all shredders that already finished
+    # successfully instead of starting from scratch.
+    completed_shredders = {
+        le.parsed_data.get('shredder')
+        for le in event.logentry_set.filter(
+            action_type='pretix.event.shredder.step.completed', datetime__gte=parse(indexdata['time'])
+        )
+        if le.parsed_data.get('indexdata') == indexdata
+    }
+
+    # Keep the file around long enough for an interrupted run to be resumed with it.
+    cf.expires = max(cf.expires or now(), now() + timedelta(days=1))
+    cf.save(update_fields=['expires'])
+
     event.log_action(
         'pretix.event.shredder.started', user=user, data={
-            'indexdata': indexdata
+            'indexdata': indexdata,
+            'resumed': bool(completed_shredders),
         }
     )
 
     for i, shredder in enumerate(shredders):
         with language(locale):
             steps.append({'label': str(shredder.verbose_name), 'done': False})
+        if shredder.identifier in completed_shredders:
+            steps[-1]['done'] = True
+            continue
         set_progress(i * 100 / len(shredders))
         if 'progress_callback' in inspect.signature(shredder.shred_data).parameters:
             shredder.shred_data(
@@ -159,6 +178,15 @@ def shred(self, event: Event, fileid: str, confirm_code: str, user: int=None, lo
         else:
             shredder.shred_data()
         steps[-1]['done'] = True
+        event.log_action(
+            'pretix.event.shredder.step.completed', user=user, data={
+                'indexdata': indexdata,
+                'shredder': shredder.identifier,
+            }
+        )
+
+    # Shredders use bulk updates, so the search documents still contain the removed data
+    rebuild_search_documents(event)
 
     cf.file.delete(save=False)
     cf.delete()
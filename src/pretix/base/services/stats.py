@@ -36,17 +36,34 @@ from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from typing import Any, Dict, Iterable, List, Tuple
 
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.db.models import (
-    Case, Count, DateTimeField, F, Max, OuterRef, QuerySet, Subquery, Sum,
-    Value, When,
+    Case, Count, DateTimeField, Exists, F, Max, OuterRef, QuerySet, Subquery,
+    Sum, Value, When,
 )
-from django.utils.timezone import make_aware
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.timezone import make_aware, now
 from django.utils.translation import gettext_lazy as _
+from django_scopes import scopes_disabled
 
-from pretix.base.models import Event, Item, ItemCategory, Order, OrderPosition
+from pretix.base.models import (
+    Event, Item, ItemCategory, Order, OrderPosition, SalesRollup, Transaction,
+    TransactionRollup, TransactionRollupState,
+)
 from pretix.base.models.event import SubEvent
 from pretix.base.models.orders import OrderFee, OrderPayment
-from pretix.base.signals import order_fee_type_name
+from pretix.base.services.tasks import EventTask
+from pretix.base.signals import (
+    order_approved, order_canceled, order_changed, order_denied, order_expired,
+    order_fee_type_name, order_gracefully_delete, order_paid, order_placed,
+    order_reactivated, order_split, periodic_task,
+)
+from pretix.celery_app import app
+from pretix.helpers import OF_SELF
+from pretix.helpers.periodic import minimum_interval
 
 
 class DummyObject:
@@ -112,15 +129,31 @@ def dictsum(*dicts) -> dict:
 
 def order_overview(
         event: Event, subevent: SubEvent=None, date_filter='', date_from=None, date_until=None, fees=False,
-        admission_only=False, base_qs=None, base_fees_qs=None, subevent_date_from=None, subevent_date_until=None
+        admission_only=False, base_qs=None, base_fees_qs=None, subevent_date_from=None, subevent_date_until=None,
+        use_rollups=False
 ) -> Tuple[List[Tuple[ItemCategory, List[Item]]], Dict[str, Tuple[Decimal, Decimal]]]:
+    """
+    Computes the number and value of sold products, grouped by category, product and order status.
+
+    If ``use_rollups`` is set, the numbers are read from the pre-aggregated ``SalesRollup`` table whenever the
+    given filters allow it. These numbers may lag a few seconds behind, so this should only be used for display
+    purposes and not for exports.
+    """
     items = event.items.all().select_related(
         'category',  # for re-grouping
     ).prefetch_related(
         'variations'
     ).order_by('category__position', 'category_id', 'position', 'name')
 
-    qs = OrderPosition.all if base_qs is None else base_qs
+    use_rollups = (
+        use_rollups and base_qs is None and
+        all(_is_plain_date(d) for d in (date_from, date_until) if d) and
+        sales_rollups_available(event)
+    )
+    if use_rollups:
+        qs = SalesRollup.objects.filter(event=event)
+    else:
+        qs = OrderPosition.all if base_qs is None else base_qs
     if isinstance(subevent, (list, QuerySet)):
         qs = qs.filter(subevent__in=subevent)
     elif subevent:
@@ -134,6 +167,8 @@ def order_overview(
         qs = qs.filter(item__admission=True)
         items = items.filter(admission=True)
 
+    day_from, day_until = date_from, date_until
+
     if date_from and isinstance(date_from, date):
         date_from = make_aware(datetime.combine(
             date_from,
@@ -146,36 +181,59 @@ def order_overview(
             time(hour=0, minute=0, second=0, microsecond=0)
         ), event.timezone)
 
-    if date_filter == 'order_date':
-        if date_from:
-            qs = qs.filter(order__datetime__gte=date_from)
-        if date_until:
-            qs = qs.filter(order__datetime__lt=date_until)
-    elif date_filter == 'last_payment_date':
-        p_date = OrderPayment.objects.filter(
-            order=OuterRef('order'),
-            state__in=[OrderPayment.PAYMENT_STATE_CONFIRMED, OrderPayment.PAYMENT_STATE_REFUNDED],
-            payment_date__isnull=False
-        ).values('order').annotate(
-            m=Max('payment_date')
-        ).values('m').order_by()
-        qs = qs.annotate(payment_date=Subquery(p_date, output_field=DateTimeField()))
-        if date_from:
-            qs = qs.filter(payment_date__gte=date_from)
-        if date_until:
-            qs = qs.filter(payment_date__lt=date_until)
-
-    counters = qs.filter(
-        order__event=event
-    ).annotate(
-        status=Case(
-            When(order__status='n', order__require_approval=True, then=Value('unapproved')),
-            When(canceled=True, then=Value('c')),
-            default=F('order__status')
-        )
-    ).values(
-        'item', 'variation', 'status'
-    ).annotate(cnt=Count('id'), price=Sum('price'), tax_value=Sum('tax_value')).order_by()
+    p_date = OrderPayment.objects.filter(
+        order=OuterRef('order'),
+        state__in=[OrderPayment.PAYMENT_STATE_CONFIRMED, OrderPayment.PAYMENT_STATE_REFUNDED],
+        payment_date__isnull=False
+    ).values('order').annotate(
+        m=Max('payment_date')
+    ).values('m').order_by()
+
+    if use_rollups:
+        if date_filter == 'order_date':
+            if day_from:
+                qs = qs.filter(order_date__gte=day_from)
+            if day_until:
+                qs = qs.filter(order_date__lte=day_until)
+        elif date_filter == 'last_payment_date':
+            if day_from:
+                qs = qs.filter(payment_date__gte=day_from)
+            if day_until:
+                qs = qs.filter(payment_date__lte=day_until)
+
+        counters = qs.annotate(
+            status=Case(
+                When(order_status='n', order_require_approval=True, then=Value('unapproved')),
+                When(canceled=True, then=Value('c')),
+                default=F('order_status')
+            )
+        ).values(
+            'item', 'variation', 'status'
+        ).annotate(cnt=Sum('count'), price=Sum('price'), tax_value=Sum('tax_value')).order_by()
+    else:
+        if date_filter == 'order_date':
+            if date_from:
+                qs = qs.filter(order__datetime__gte=date_from)
+            if date_until:
+                qs = qs.filter(order__datetime__lt=date_until)
+        elif date_filter == 'last_payment_date':
+            qs = qs.annotate(payment_date=Subquery(p_date, output_field=DateTimeField()))
+            if date_from:
+                qs = qs.filter(payment_date__gte=date_from)
+            if date_until:
+                qs = qs.filter(payment_date__lt=date_until)
+
+        counters = qs.filter(
+            order__event=event
+        ).annotate(
+            status=Case(
+                When(order__status='n', order__require_approval=True, then=Value('unapproved')),
+                When(canceled=True, then=Value('c')),
+                default=F('order__status')
+            )
+        ).values(
+            'item', 'variation', 'status'
+        ).annotate(cnt=Count('id'), price=Sum('price'), tax_value=Sum('tax_value')).order_by()
 
     states = {
         'unapproved': 'unapproved',
@@ -316,3 +374,246 @@ def order_overview(
         total['num'][l] = tuplesum(c.num[l] for c, i in items_by_category)
 
     return items_by_category, total
+
+
+def _is_plain_date(d) -> bool:
+    return isinstance(d, date) and not isinstance(d, datetime)
+
+
+def sales_rollups_available(event: Event) -> bool:
+    """
+    Returns whether ``SalesRollup`` rows can be used for ``event``. If the event has orders but no rollups yet,
+    e.g. because it predates them, a rebuild is scheduled and ``False`` is returned in the meantime.
+    """
+    if event.sales_rollups.exists():
+        return True
+    if event.orders.exists():
+        _schedule_rollup_refresh(event, None)
+    return False
+
+
+def rebuild_sales_rollups(event: Event, day: date=None):
+    """
+    Recomputes the ``SalesRollup`` rows of ``event``, either for all orders or only for the orders placed on
+    ``day`` (in the timezone of the event). Since the day an order is placed never changes, this is enough to
+    incorporate any change of an order.
+    """
+    with transaction.atomic():
+        # Concurrent refreshes of the same event would otherwise both insert their rows or overwrite newer rows
+        # with an outdated snapshot
+        _lock_event_rollups(event)
+        if day and not SalesRollup.objects.filter(event=event).exists():
+            # Without any rollups, refreshing a single day would make the rest of the event look empty
+            day = None
+        rows = _compute_sales_rollups(event, day)
+        existing = SalesRollup.objects.filter(event=event)
+        if day:
+            existing = existing.filter(order_date=day)
+        existing.delete()
+        SalesRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+def _lock_event_rollups(event: Event):
+    # FOR NO KEY UPDATE does not conflict with the key share locks taken while orders of the event are created
+    list(Event.objects.select_for_update(
+        of=OF_SELF, no_key=connection.features.has_select_for_no_key_update
+    ).filter(pk=event.pk).values_list('pk', flat=True))
+
+
+def _compute_sales_rollups(event: Event, day: date=None) -> List[SalesRollup]:
+    tz = event.timezone
+    qs = OrderPosition.all.filter(order__event=event)
+    if day:
+        qs = qs.filter(
+            order__datetime__gte=make_aware(datetime.combine(day, time(0, 0)), tz),
+            order__datetime__lt=make_aware(datetime.combine(day + timedelta(days=1), time(0, 0)), tz),
+        )
+
+    p_date = OrderPayment.objects.filter(
+        order=OuterRef('order'),
+        state__in=[OrderPayment.PAYMENT_STATE_CONFIRMED, OrderPayment.PAYMENT_STATE_REFUNDED],
+        payment_date__isnull=False
+    ).values('order').annotate(
+        m=Max('payment_date')
+    ).values('m').order_by()
+    qs = qs.annotate(
+        payment_datetime=Subquery(p_date, output_field=DateTimeField()),
+    ).annotate(
+        order_day=TruncDate('order__datetime', tzinfo=tz),
+        payment_day=TruncDate('payment_datetime', tzinfo=tz),
+    ).values(
+        'subevent', 'item', 'variation', 'order__status', 'order__require_approval', 'canceled', 'order_day',
+        'payment_day',
+    ).annotate(cnt=Count('id'), sum_price=Sum('price'), sum_tax_value=Sum('tax_value')).order_by()
+
+    return [
+        SalesRollup(
+            event=event,
+            subevent_id=r['subevent'],
+            item_id=r['item'],
+            variation_id=r['variation'],
+            order_status=r['order__status'],
+            order_require_approval=r['order__require_approval'],
+            canceled=r['canceled'],
+            order_date=r['order_day'],
+            payment_date=r['payment_day'],
+            count=r['cnt'],
+            price=r['sum_price'],
+            tax_value=r['sum_tax_value'],
+        )
+        for r in qs
+    ]
+
+
+@app.task(base=EventTask)
+def refresh_sales_rollups(event: Event, day: str=None):
+    # Remove the marker first, so that changes committed while we are running schedule another refresh
+    cache.delete('sales_rollup_refresh:{}:{}'.format(event.pk, day or 'all'))
+    rebuild_sales_rollups(event, date.fromisoformat(day) if day else None)
+
+
+def _schedule_rollup_refresh(event: Event, day: date=None):
+    day = day.isoformat() if day else None
+
+    def _schedule():
+        # Collapse the many changes during e.g. a ticket rush into a few refreshes
+        if cache.add('sales_rollup_refresh:{}:{}'.format(event.pk, day or 'all'), True, 300):
+            refresh_sales_rollups.apply_async(args=(event.pk, day), countdown=5)
+
+    transaction.on_commit(_schedule)
+
+
+@receiver(order_placed, dispatch_uid="stats_rollup_order_placed")
+@receiver(order_paid, dispatch_uid="stats_rollup_order_paid")
+@receiver(order_canceled, dispatch_uid="stats_rollup_order_canceled")
+@receiver(order_reactivated, dispatch_uid="stats_rollup_order_reactivated")
+@receiver(order_expired, dispatch_uid="stats_rollup_order_expired")
+@receiver(order_changed, dispatch_uid="stats_rollup_order_changed")
+@receiver(order_approved, dispatch_uid="stats_rollup_order_approved")
+@receiver(order_denied, dispatch_uid="stats_rollup_order_denied")
+@receiver(order_gracefully_delete, dispatch_uid="stats_rollup_order_deleted")
+def order_state_changed(sender: Event, order: Order, **kwargs):
+    _schedule_rollup_refresh(sender, order.datetime.astimezone(sender.timezone).date())
+
+
+@receiver(order_split, dispatch_uid="stats_rollup_order_split")
+def order_split_rollups(sender: Event, original: Order, split_order: Order, **kwargs):
+    _schedule_rollup_refresh(sender, original.datetime.astimezone(sender.timezone).date())
+    _schedule_rollup_refresh(sender, split_order.datetime.astimezone(sender.timezone).date())
+
+
+@receiver(post_save, sender=Order, dispatch_uid="stats_rollup_order_saved")
+def order_saved_rollups(sender, instance: Order, created, update_fields=None, **kwargs):
+    # Not every status change sends a signal, e.g. extending an expired order or marking it unpaid again
+    if created or instance._rollup_state_changed(update_fields):
+        _schedule_rollup_refresh(instance.event, instance.datetime.astimezone(instance.event.timezone).date())
+    instance._rollup_state_reset()
+
+
+@receiver(signal=periodic_task, dispatch_uid="stats_sales_rollups_reconcile")
+@scopes_disabled()
+@minimum_interval(minutes_after_success=60)
+def reconcile_sales_rollups(sender, **kwargs):
+    # Catches changes that bypass Order.save(), e.g. bulk updates, by refreshing every day of an event that
+    # contains recently modified orders. The window overlaps with the previous run on purpose.
+    cutoff = now() - timedelta(hours=2)
+    qs = Event.objects.filter(
+        Exists(SalesRollup.objects.filter(event=OuterRef('pk'))),
+        Exists(Order.objects.filter(event=OuterRef('pk'), last_modified__gte=cutoff)),
+    )
+    for event in qs:
+        days = event.orders.filter(last_modified__gte=cutoff).annotate(
+            day=TruncDate('datetime', tzinfo=event.timezone)
+        ).values_list('day', flat=True).distinct().order_by()
+        for day in days:
+            refresh_sales_rollups.apply_async(args=(event.pk, day.isoformat()))
+
+
+def rollup_transactions(event: Event):
+    """
+    Persists ``TransactionRollup`` rows for all days of ``event`` that are over but not yet rolled up. Days are
+    computed in the timezone of the event. If that timezone changed since the last run, all rows are recomputed.
+    """
+    with transaction.atomic():
+        tz = event.timezone
+        # Give transactions created right before midnight some time to be committed before we close the day
+        closed_until = (now() - timedelta(hours=1)).astimezone(tz).date()
+
+        # Runs that overlap, e.g. because the task queue lags behind, must not roll up the same days twice. The
+        # state is only read once we hold the lock, so we see everything a previous run committed.
+        _lock_event_rollups(event)
+        state = TransactionRollupState.objects.filter(event=event).first()
+        if state and state.timezone != str(tz):
+            reset_transaction_rollups(event)
+            state = None
+        if state and state.closed_until >= closed_until:
+            return
+
+        qs = Transaction.objects.filter(
+            order__event=event,
+            order__testmode=False,
+            datetime__lt=make_aware(datetime.combine(closed_until, time(0, 0)), tz),
+        )
+        if state:
+            qs = qs.filter(datetime__gte=make_aware(datetime.combine(state.closed_until, time(0, 0)), tz))
+        qs = qs.annotate(
+            day=TruncDate('datetime', tzinfo=tz),
+        ).values(
+            'day', 'subevent', 'item', 'variation', 'price', 'tax_rate', 'fee_type', 'internal_type',
+        ).annotate(
+            sum_count=Sum('count'),
+            sum_price=Sum(F('count') * F('price')),
+            sum_tax=Sum(F('count') * F('tax_value')),
+        ).order_by()
+
+        rows = [
+            TransactionRollup(
+                event=event,
+                day=r['day'],
+                subevent_id=r['subevent'],
+                item_id=r['item'],
+                variation_id=r['variation'],
+                price=r['price'],
+                tax_rate=r['tax_rate'],
+                fee_type=r['fee_type'],
+                internal_type=r['internal_type'],
+                count=r['sum_count'],
+                gross_total=r['sum_price'],
+                tax_total=r['sum_tax'],
+            )
+            for r in qs
+        ]
+        TransactionRollup.objects.bulk_create(rows, batch_size=1000)
+        TransactionRollupState.objects.update_or_create(
+            event=event,
+            defaults={'closed_until': closed_until, 'timezone': str(tz)},
+        )
+
+
+def reset_transaction_rollups(event: Event):
+    """
+    Removes all ``TransactionRollup`` rows of ``event``. This needs to be called whenever transactions in the
+    past are created or removed, e.g. when missing transactions are backfilled.
+    """
+    with transaction.atomic():
+        _lock_event_rollups(event)
+        TransactionRollupState.objects.filter(event=event).delete()
+        TransactionRollup.objects.filter(event=event).delete()
+
+
+@app.task(base=EventTask)
+def refresh_transaction_rollups(event: Event):
+    rollup_transactions(event)
+
+
+@receiver(signal=periodic_task, dispatch_uid="stats_transaction_rollups")
+@scopes_disabled()
+@minimum_interval(minutes_after_success=60)
+def schedule_transaction_rollups(sender, **kwargs):
+    qs = Event.objects.filter(
+        Exists(Order.objects.filter(event=OuterRef('pk'), testmode=False))
+    ).exclude(
+        transaction_rollup_state__closed_until__gte=now().date()
+    )
+    for pk in qs.values_list('pk', flat=True):
+        refresh_transaction_rollups.apply_async(args=(pk,))
@@ -24,6 +24,8 @@ import os
 from decimal import Decimal
 
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.dispatch import receiver
 from django.utils.timezone import now
 from django.utils.translation import gettext as _
 from django_scopes import scopes_disabled
@@ -35,7 +37,7 @@ from pretix.base.models import (
 )
 from pretix.base.services.tasks import EventTask, ProfiledTask
 from pretix.base.settings import PERSON_NAME_SCHEMES
-from pretix.base.signals import register_ticket_outputs
+from pretix.base.signals import order_paid, register_ticket_outputs
 from pretix.celery_app import app
 from pretix.helpers.database import rolledback_transaction
 
@@ -47,7 +49,7 @@ def generate_orderposition(order_position: int, provider: str):
 
     with language(order_position.order.locale, order_position.order.event.settings.region):
         responses = register_ticket_outputs.send(order_position.order.event)
-        for receiver, response in responses:
+        for recv, response in responses:
             prov = response(order_position.order.event)
             if prov.identifier == provider:
                 filename, ttype, data = prov.generate(order_position)
@@ -65,7 +67,7 @@ def generate_order(order: int, provider: str):
 
     with language(order.locale, order.event.settings.region):
         responses = register_ticket_outputs.send(order.event)
-        for receiver, response in responses:
+        for recv, response in responses:
             prov = response(order.event)
             if prov.identifier == provider:
                 filename, ttype, data = prov.generate_order(order)
@@ -119,7 +121,7 @@ def preview(event: int, provider: str):
         InvoiceAddress.objects.create(order=order, name_parts=sample, company=_("Sample company"))
 
         responses = register_ticket_outputs.send(event)
-        for receiver, response in responses:
+        for recv, response in responses:
             prov = response(event)
             if prov.identifier == provider:
                 return prov.generate(p)
@@ -134,7 +136,7 @@ def get_tickets_for_order(order, base_position=None):
 
     providers = [
         response(order.event)
-        for receiver, response
+        for recv, response
         in register_ticket_outputs.send(order.event)
     ]
     tickets = []
@@ -205,6 +207,24 @@ def get_tickets_for_order(order, base_position=None):
     return tickets
 
 
+@app.task(base=EventTask, acks_late=True)
+def prewarm_ticket_cache(event: Event, order: int):
+    """
+    Renders and caches all ticket files of an order, so the first download does not need to wait for them.
+    """
+    order = Order.objects.select_related('event').get(pk=order, event=event)
+    with language(order.locale, event.settings.region):
+        get_tickets_for_order(order)
+
+
+@receiver(order_paid, dispatch_uid="tickets_order_paid_prewarm")
+def order_paid_prewarm(sender: Event, order: Order, **kwargs):
+    # If tickets are attached to emails, the email task renders them right away anyway
+    if sender.settings.mail_attach_tickets or not order.ticket_download_available:
+        return
+    transaction.on_commit(lambda: prewarm_ticket_cache.apply_async(args=(sender.pk, order.pk)))
+
+
 @app.task(base=EventTask, acks_late=True)
 def invalidate_cache(event: Event, item: int=None, provider: str=None, order: int=None, **kwargs):
     qs = CachedTicket.objects.filter(order_position__order__event=event)
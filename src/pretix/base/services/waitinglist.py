@@ -19,8 +19,7 @@
 # You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
 # <https://www.gnu.org/licenses/>.
 #
-import sys
-from collections import defaultdict
+import logging
 from datetime import timedelta
 
 from django.db import transaction
@@ -32,46 +31,64 @@ from django.utils.timezone import now
 from django_scopes import scopes_disabled
 
 from pretix.base.models import (
-    Event, EventMetaValue, SeatCategoryMapping, User, WaitingListEntry,
+    Event, EventMetaValue, LogEntry, SeatCategoryMapping, User, Voucher,
+    WaitingListEntry,
 )
-from pretix.base.models.waitinglist import WaitingListException
+from pretix.base.models.vouchers import generate_codes
 from pretix.base.services.locking import lock_objects
+from pretix.base.services.mail import SendMailException
+from pretix.base.services.quotas import QuotaAvailability
 from pretix.base.services.tasks import EventTask
 from pretix.base.signals import periodic_task
 from pretix.celery_app import app
 
+logger = logging.getLogger(__name__)
+
 
 @app.task(base=EventTask)
 def assign_automatically(event: Event, user_id: int=None, subevent_id: int=None):
+    """
+    Sends vouchers to as many waiting list entries as current availability allows.
+
+    This works in two phases to keep the time we hold the quota locks short even for very long waiting lists:
+    First, all entries are loaded and everything that does not depend on quota availability (presale periods,
+    product availability, seat capacity) is evaluated. Then, after acquiring the locks, availability of all
+    affected quotas is computed in one go, entries are assigned in memory in priority order and all vouchers and
+    log entries are created in bulk. Emails are only rendered and queued once the transaction has been committed.
+    """
     if user_id:
         user = User.objects.get(id=user_id)
     else:
         user = None
 
-    quota_cache = {}
     gone = set()
-    _seats_available_cache = {}
-    seats_used = defaultdict(int)
+    seats_available = {}
 
     seated_product_set = set(
         SeatCategoryMapping.objects.filter(event=event).values_list('product_id', 'subevent_id')
     )
 
+    free_seats_by_subevent = {}
+    waitinglist_vouchers_by_subevent = {}
+
     def _seats_available(item, subevent):
         # See comment in WaitingListEntry.send_voucher() for rationale
         subevent_id = subevent.pk if subevent else None
-        if (item.pk, subevent_id) not in _seats_available_cache:
-            num_free_seats_for_product = (subevent or event).free_seats().filter(product_id=item.pk).count()
-            num_valid_vouchers_for_product = event.vouchers.filter(
-                Q(valid_until__isnull=True) | Q(valid_until__gte=now()),
-                block_quota=True,
-                item_id=item.pk,
-                subevent_id=subevent_id,
-                waitinglistentries__isnull=False
-            ).aggregate(free=Sum(F('max_usages') - F('redeemed')))['free'] or 0
-            _seats_available_cache[item.pk, subevent_id] = num_free_seats_for_product - num_valid_vouchers_for_product
-
-        return _seats_available_cache[item.pk, subevent_id] - seats_used[item.pk, subevent_id]
+        if subevent_id not in free_seats_by_subevent:
+            # Evaluating seat availability is expensive for large seating plans, so we do it once per date for
+            # all products instead of once per product.
+            free_seats_by_subevent[subevent_id] = (subevent or event).free_seats_by_product()
+            waitinglist_vouchers_by_subevent[subevent_id] = dict(
+                event.vouchers.filter(
+                    Q(valid_until__isnull=True) | Q(valid_until__gte=now()),
+                    block_quota=True,
+                    subevent_id=subevent_id,
+                    waitinglistentries__isnull=False
+                ).order_by().values('item').annotate(free=Sum(F('max_usages') - F('redeemed'))).values_list('item', 'free')
+            )
+        num_free_seats_for_product = free_seats_by_subevent[subevent_id].get(item.pk, 0)
+        num_valid_vouchers_for_product = waitinglist_vouchers_by_subevent[subevent_id].get(item.pk) or 0
+        return num_free_seats_for_product - num_valid_vouchers_for_product
 
     prefetch_related_objects(
         [event.organizer],
@@ -96,67 +113,115 @@ def assign_automatically(event: Event, user_id: int=None, subevent_id: int=None)
         subevent = event.subevents.get(id=subevent_id)
         qs = qs.filter(subevent=subevent)
 
-    sent = 0
+    # Phase 1: Filter out everything that can be decided without looking at quotas
+    candidates = []
+    quotas_by_item = {}
+    quotas = set()
+    for wle in qs:
+        key = (wle.item_id, wle.variation_id, wle.subevent_id)
+        if key in gone:
+            continue
+        ev = (wle.subevent or event)
+        if not ev.presale_is_running or (wle.subevent and not wle.subevent.active):
+            continue
+        if wle.subevent and not wle.subevent.presale_is_running:
+            continue
+        if event.settings.waiting_list_auto_disable and event.settings.waiting_list_auto_disable.datetime(wle.subevent or event) <= now():
+            gone.add(key)
+            continue
+        if not wle.item.is_available():
+            gone.add(key)
+            continue
+        if '@' not in wle.email:
+            # Anonymized entry
+            continue
+
+        if key not in quotas_by_item:
+            quotas_by_item[key] = list(
+                wle.variation.quotas.filter(subevent=wle.subevent)
+                if wle.variation
+                else wle.item.quotas.filter(subevent=wle.subevent)
+            )
+        wle._quotas = quotas_by_item[key]
+        quotas |= set(wle._quotas)
+        candidates.append(wle)
 
-    with transaction.atomic(durable=True):
-        quotas_by_item = {}
-        quotas = set()
-        for wle in qs:
-            if (wle.item_id, wle.variation_id, wle.subevent_id) not in quotas_by_item:
-                quotas_by_item[wle.item_id, wle.variation_id, wle.subevent_id] = list(
-                    wle.variation.quotas.filter(subevent=wle.subevent)
-                    if wle.variation
-                    else wle.item.quotas.filter(subevent=wle.subevent)
-                )
-            wle._quotas = quotas_by_item[wle.item_id, wle.variation_id, wle.subevent_id]
-            quotas |= set(wle._quotas)
+    if not candidates:
+        return 0
 
+    assigned = []
+    with transaction.atomic(durable=True):
         lock_objects(quotas, shared_lock_objects=[event])
-        for wle in qs:
-            if (wle.item_id, wle.variation_id, wle.subevent_id) in gone:
-                continue
-            ev = (wle.subevent or event)
-            if not ev.presale_is_running or (wle.subevent and not wle.subevent.active):
-                continue
-            if wle.subevent and not wle.subevent.presale_is_running:
-                continue
-            if event.settings.waiting_list_auto_disable and event.settings.waiting_list_auto_disable.datetime(wle.subevent or event) <= now():
-                gone.add((wle.item_id, wle.variation_id, wle.subevent_id))
-                continue
-            if not wle.item.is_available():
-                gone.add((wle.item_id, wle.variation_id, wle.subevent_id))
+
+        # Entries might have received a voucher manually in the meantime
+        still_open = set(
+            WaitingListEntry.objects.filter(
+                pk__in=[wle.pk for wle in candidates], voucher__isnull=True
+            ).values_list('pk', flat=True)
+        )
+
+        # Phase 2: Compute availability of all quotas once and assign in memory
+        qa = QuotaAvailability(count_waitinglist=False, early_out=False)
+        qa.queue(*quotas)
+        qa.compute()
+        quota_left = {q.pk: qa.results[q][1] for q in quotas}
+
+        # Seats need to be counted while holding the lock as well, otherwise seats sold in the meantime are missed
+        for wle in candidates:
+            if (wle.item_id, wle.subevent_id) in seated_product_set and (wle.item_id, wle.subevent_id) not in seats_available:
+                seats_available[wle.item_id, wle.subevent_id] = _seats_available(wle.item, wle.subevent)
+
+        for wle in candidates:
+            key = (wle.item_id, wle.variation_id, wle.subevent_id)
+            if key in gone or wle.pk not in still_open:
                 continue
 
             if (wle.item_id, wle.subevent_id) in seated_product_set:
-                if _seats_available(wle.item, wle.subevent) < 1:
-                    gone.add((wle.item_id, wle.variation_id, wle.subevent_id))
-                    continue
-
-            availability = (
-                wle.variation.check_quotas(count_waitinglist=False, _cache=quota_cache, subevent=wle.subevent)
-                if wle.variation
-                else wle.item.check_quotas(count_waitinglist=False, _cache=quota_cache, subevent=wle.subevent)
-            )
-            if availability[1] is None or availability[1] > 0:
-                try:
-                    wle.send_voucher(quota_cache, user=user)
-                    sent += 1
-                except WaitingListException:  # noqa
+                if seats_available[wle.item_id, wle.subevent_id] < 1:
+                    gone.add(key)
                     continue
 
-                # Reduce affected quotas in cache
-                for q in wle._quotas:
-                    quota_cache[q.pk] = (
-                        quota_cache[q.pk][0] if quota_cache[q.pk][0] > 1 else 0,
-                        quota_cache[q.pk][1] - 1 if quota_cache[q.pk][1] is not None else sys.maxsize
-                    )
-
-                if (wle.item_id, wle.subevent_id) in seated_product_set:
-                    seats_used[wle.item_id, wle.subevent_id] += 1
-            else:
-                gone.add((wle.item_id, wle.variation_id, wle.subevent_id))
+            limits = [quota_left[q.pk] for q in wle._quotas if quota_left[q.pk] is not None]
+            if wle._quotas and not limits:
+                # Unlimited quotas are rejected by WaitingListEntry.send_voucher() as well
+                continue
+            if limits and min(limits) < 1:
+                gone.add(key)
+                continue
 
-    return sent
+            for q in wle._quotas:
+                if quota_left[q.pk] is not None:
+                    quota_left[q.pk] -= 1
+            if (wle.item_id, wle.subevent_id) in seated_product_set:
+                seats_available[wle.item_id, wle.subevent_id] -= 1
+            assigned.append(wle)
+
+        # Phase 3: Persist everything in bulk
+        if assigned:
+            codes = generate_codes(event.organizer, num=len(assigned))
+            vouchers = [wle.build_voucher(code=code) for wle, code in zip(assigned, codes)]
+            Voucher.objects.bulk_create(vouchers, batch_size=500)
+            event.cache.set('vouchers_exist', True)
+
+            log_entries = []
+            for wle, v in zip(assigned, vouchers):
+                wle.voucher = v
+                log_entries.append(v.log_action(
+                    'pretix.voucher.added.waitinglist', wle.voucher_log_data(v), user=user, save=False
+                ))
+                log_entries.append(wle.log_action(
+                    'pretix.event.orders.waitinglist.voucher_assigned', user=user, save=False
+                ))
+            WaitingListEntry.objects.bulk_update(assigned, fields=['voucher'], batch_size=500)
+            LogEntry.bulk_create_and_postprocess(log_entries)
+
+    for wle in assigned:
+        try:
+            wle.send_voucher_mail(user=user)
+        except SendMailException:  # noqa
+            logger.exception('Could not send waiting list voucher email.')
+
+    return len(assigned)
 
 
 @receiver(signal=periodic_task)
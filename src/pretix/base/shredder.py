@@ -50,8 +50,8 @@ from pretix.api.serializers.order import (
 from pretix.api.serializers.waitinglist import WaitingListSerializer
 from pretix.base.i18n import LazyLocaleException
 from pretix.base.models import (
-    CachedCombinedTicket, CachedTicket, Event, InvoiceAddress, OrderPayment,
-    OrderPosition, OrderRefund, QuestionAnswer,
+    CachedCombinedTicket, CachedTicket, Event, InvoiceAddress, Order,
+    OrderPayment, OrderPosition, OrderRefund, QuestionAnswer,
 )
 from pretix.base.services.invoices import invoice_pdf_task
 from pretix.base.signals import register_data_shredders
@@ -243,14 +243,42 @@ def slow_delete(qs, batch_size=1000, sleep_time=.5, progress_callback=None, prog
     return total_deleted
 
 
+def chunked_iterator(queryset, chunk_size=1000):
+    """
+    Iterates over a queryset in chunks of objects ordered by primary key. In contrast to iterating over the queryset
+    directly, this never holds more than ``chunk_size`` objects in memory and does not keep a database cursor open
+    while the caller modifies the rows. Since every chunk is fetched with a ``pk > last_seen_pk`` condition, it is
+    safe to use with filter conditions that no longer apply after the rows have been modified.
+    """
+    last_pk = None
+    while True:
+        qs = queryset.order_by('pk')
+        if last_pk is not None:
+            qs = qs.filter(pk__gt=last_pk)
+        chunk = list(qs[:chunk_size])
+        if not chunk:
+            break
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def _progress_chunk_helper(queryset, progress_callback, offset, total, chunk_size=1000):
+    done = 0
+    for chunk in chunked_iterator(queryset, chunk_size):
+        yield chunk
+        done += len(chunk)
+        if progress_callback:
+            progress_callback((done + offset) / total * 100)
+
+
 def _progress_helper(queryset, progress_callback, offset, total):
-    if not progress_callback:
-        yield from queryset
-    else:
-        for i, o in enumerate(queryset):
+    i = 0
+    for chunk in chunked_iterator(queryset):
+        for o in chunk:
             yield o
-            if i % 10 == 0:
+            if progress_callback and i % 10 == 0:
                 progress_callback((i + offset) / total * 100)
+            i += 1
 
 
 class PhoneNumberShredder(BaseDataShredder):
@@ -270,17 +298,21 @@ class PhoneNumberShredder(BaseDataShredder):
         qs_le_cnt = qs_le.count()
         total = qs_le_cnt + qs_orders_cnt
 
-        for o in _progress_helper(qs_orders, progress_callback, 0, total):
-            changed = bool(o.phone)
-            o.phone = None
-            d = o.meta_info_data
-            if d:
-                if 'contact_form_data' in d and 'phone' in d['contact_form_data']:
-                    changed = True
-                    del d['contact_form_data']['phone']
-                    o.meta_info = json.dumps(d)
-            if changed:
-                o.save(update_fields=['meta_info', 'phone'])
+        for orders in _progress_chunk_helper(qs_orders, progress_callback, 0, total):
+            changed_orders = []
+            for o in orders:
+                changed = bool(o.phone)
+                o.phone = None
+                d = o.meta_info_data
+                if d:
+                    if 'contact_form_data' in d and 'phone' in d['contact_form_data']:
+                        changed = True
+                        del d['contact_form_data']['phone']
+                        o.meta_info = json.dumps(d)
+                if changed:
+                    o.last_modified = now()
+                    changed_orders.append(o)
+            Order.objects.bulk_update(changed_orders, ['meta_info', 'phone', 'last_modified'])
 
         for le in _progress_helper(qs_le, progress_callback, qs_orders_cnt, total):
             shred_log_fields(le, banlist=['old_phone', 'new_phone'])
@@ -329,23 +361,27 @@ class EmailAddressShredder(BaseDataShredder):
             sleep_time=2,
         )
 
-        for o in _progress_helper(qs_orders, progress_callback, qs_op_cnt, total):
-            changed = bool(o.email) or bool(o.customer)
-            o.email = None
-            o.customer = None
-            d = o.meta_info_data
-            if d:
-                if 'contact_form_data' in d and 'email' in d['contact_form_data']:
-                    del d['contact_form_data']['email']
-                    changed = True
-                    o.meta_info = json.dumps(d)
-                if 'contact_form_data' in d and 'email_repeat' in d['contact_form_data']:
-                    del d['contact_form_data']['email_repeat']
-                    changed = True
-            if changed:
+        for orders in _progress_chunk_helper(qs_orders, progress_callback, qs_op_cnt, total):
+            changed_orders = []
+            for o in orders:
+                changed = bool(o.email) or bool(o.customer_id)
+                o.email = None
+                o.customer = None
+                d = o.meta_info_data
                 if d:
-                    o.meta_info = json.dumps(d)
-                o.save(update_fields=['meta_info', 'email', 'customer'])
+                    if 'contact_form_data' in d and 'email' in d['contact_form_data']:
+                        del d['contact_form_data']['email']
+                        changed = True
+                        o.meta_info = json.dumps(d)
+                    if 'contact_form_data' in d and 'email_repeat' in d['contact_form_data']:
+                        del d['contact_form_data']['email_repeat']
+                        changed = True
+                if changed:
+                    if d:
+                        o.meta_info = json.dumps(d)
+                    o.last_modified = now()
+                    changed_orders.append(o)
+            Order.objects.bulk_update(changed_orders, ['meta_info', 'email', 'customer', 'last_modified'])
 
         for le in _progress_helper(qs_le, progress_callback, qs_op_cnt + qs_orders_cnt, total):
             if le.action_type == "pretix.event.order.modified":
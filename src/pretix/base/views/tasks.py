@@ -73,7 +73,7 @@ class AsyncMixin:
 
     def _return_ajax_result(self, res, timeout=.5):
         ready = res.ready()
-        if not ready:
+        if not ready and timeout:
             try:
                 res.get(timeout=timeout, propagate=False)
             except celery.exceptions.TimeoutError:
@@ -137,7 +137,9 @@ class AsyncMixin:
             raise BadRequest("No async_id given")
         res = AsyncResult(request.GET.get('async_id'))
         if 'ajax' in self.request.GET:
-            return JsonResponse(self._return_ajax_result(res, timeout=0.25))
+            # Do not wait for the result here, this would block a web worker for every client that is polling. The
+            # client increases its polling interval instead.
+            return JsonResponse(self._return_ajax_result(res, timeout=0))
         else:
             if res.ready():
                 if res.successful() and not isinstance(res.info, Exception):
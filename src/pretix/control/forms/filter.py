@@ -60,6 +60,9 @@ from pretix.base.models import (
     OrderRefund, Organizer, Question, QuestionAnswer, Quota, SalesChannel,
     SubEvent, SubEventMetaValue, Team, TeamAPIToken, TeamInvite, Voucher,
 )
+from pretix.base.services.ordersearch import (
+    search_documents_complete, search_documents_q,
+)
 from pretix.base.signals import register_payment_providers
 from pretix.control.forms import SplitDateTimeField
 from pretix.control.forms.widgets import Select2, Select2ItemVarQuota
@@ -252,12 +255,6 @@ class OrderFilterForm(FilterForm):
         if fdata.get('query'):
             u = fdata.get('query')
 
-            if "-" in u:
-                code = (Q(event__slug__icontains=u.rsplit("-", 1)[0])
-                        & Q(code__icontains=Order.normalize_code(u.rsplit("-", 1)[1])))
-            else:
-                code = Q(code__icontains=Order.normalize_code(u))
-
             invoice_nos = {u, u.upper()}
             if u.isdigit():
                 for i in range(2, 12):
@@ -267,30 +264,46 @@ class OrderFilterForm(FilterForm):
                 Q(invoice_no__in=invoice_nos)
                 | Q(full_invoice_no__iexact=u)
             ).values_list('order_id', flat=True)
-            matching_positions = OrderPosition.objects.filter(
-                Q(
-                    Q(attendee_name_cached__icontains=u) | Q(attendee_email__icontains=u)
-                    | Q(secret__istartswith=u)
-                    | Q(pseudonymization_id__istartswith=u)
-                )
-            ).values_list('order_id', flat=True)
-            matching_invoice_addresses = InvoiceAddress.objects.filter(
-                Q(
-                    Q(name_cached__icontains=u) | Q(company__icontains=u)
-                )
-            ).values_list('order_id', flat=True)
-            matching_orders = Order.objects.filter(
-                code
-                | Q(email__icontains=u)
-                | Q(comment__icontains=u)
-            ).values_list('id', flat=True)
 
-            mainq = (
-                Q(pk__in=matching_orders)
-                | Q(pk__in=matching_invoices)
-                | Q(pk__in=matching_positions)
-                | Q(pk__in=matching_invoice_addresses)
-            )
+            mainq = search_documents_q(u) | Q(pk__in=matching_invoices)
+            if not search_documents_complete():
+                # Orders that are not yet indexed are still searched in all tables
+                if "-" in u:
+                    code = (Q(event__slug__icontains=u.rsplit("-", 1)[0])
+                            & Q(code__icontains=Order.normalize_code(u.rsplit("-", 1)[1])))
+                else:
+                    code = Q(code__icontains=Order.normalize_code(u))
+
+                matching_positions = OrderPosition.objects.filter(
+                    order__search_document__isnull=True,
+                ).filter(
+                    Q(
+                        Q(attendee_name_cached__icontains=u) | Q(attendee_email__icontains=u)
+                        | Q(secret__istartswith=u)
+                        | Q(pseudonymization_id__istartswith=u)
+                    )
+                ).values_list('order_id', flat=True)
+                matching_invoice_addresses = InvoiceAddress.objects.filter(
+                    order__search_document__isnull=True,
+                ).filter(
+                    Q(
+                        Q(name_cached__icontains=u) | Q(company__icontains=u)
+                    )
+                ).values_list('order_id', flat=True)
+                matching_orders = Order.objects.filter(
+                    search_document__isnull=True,
+                ).filter(
+                    code
+                    | Q(email__icontains=u)
+                    | Q(comment__icontains=u)
+                ).values_list('id', flat=True)
+
+                mainq = (
+                    mainq
+                    | Q(pk__in=matching_orders)
+                    | Q(pk__in=matching_positions)
+                    | Q(pk__in=matching_invoice_addresses)
+                )
             for recv, q in order_search_filter_q.send(sender=getattr(self, 'event', None), query=u):
                 mainq = mainq | q
             qs = qs.filter(
@@ -670,6 +670,7 @@ class CoreUserImpersonatedLogEntryType(UserImpersonatedLogEntryType):
     'pretix.event.deleted': _('An event has been deleted.'),
     'pretix.event.shredder.started': _('A removal process for personal data has been started.'),
     'pretix.event.shredder.completed': _('A removal process for personal data has been completed.'),
+    'pretix.event.shredder.step.completed': _('A step of a removal process for personal data has been completed.'),
     'pretix.event.export.schedule.added': _('A scheduled export has been added.'),
     'pretix.event.export.schedule.changed': _('A scheduled export has been changed.'),
     'pretix.event.export.schedule.deleted': _('A scheduled export has been deleted.'),
@@ -59,6 +59,7 @@ from pretix.base.models import (
     Question, Quota, SubEvent, Voucher, WaitingListEntry,
 )
 from pretix.base.services.quotas import QuotaAvailability
+from pretix.base.services.stats import sales_rollups_available
 from pretix.base.timeline import timeline_for_event
 from pretix.control.forms.event import CommentForm
 from pretix.control.signals import (
@@ -83,28 +84,51 @@ def base_widgets(sender, subevent=None, lazy=False, **kwargs):
             (Q(available_from__isnull=True) | Q(available_from__lte=now()))
         ).count()
 
-        if subevent:
-            opqs = OrderPosition.objects.filter(subevent=subevent)
-        else:
-            opqs = OrderPosition.objects
-
-        tickc = opqs.filter(
-            order__event=sender, item__admission=True,
-            order__status__in=(Order.STATUS_PAID, Order.STATUS_PENDING),
-        ).count()
-
-        paidc = opqs.filter(
-            order__event=sender, item__admission=True,
-            order__status=Order.STATUS_PAID,
-        ).count()
-
-        if subevent:
-            rev = opqs.filter(
-                order__event=sender, order__status=Order.STATUS_PAID
-            ).aggregate(
-                sum=Sum('price')
-            )['sum'] or Decimal('0.00')
+        if sales_rollups_available(sender):
+            rqs = sender.sales_rollups.filter(canceled=False)
+            if subevent:
+                rqs = rqs.filter(subevent=subevent)
+
+            tickc = rqs.filter(
+                item__admission=True,
+                order_status__in=(Order.STATUS_PAID, Order.STATUS_PENDING),
+            ).aggregate(sum=Sum('count'))['sum'] or 0
+
+            paidc = rqs.filter(
+                item__admission=True,
+                order_status=Order.STATUS_PAID,
+            ).aggregate(sum=Sum('count'))['sum'] or 0
+
+            if subevent:
+                rev = rqs.filter(
+                    order_status=Order.STATUS_PAID
+                ).aggregate(
+                    sum=Sum('price')
+                )['sum'] or Decimal('0.00')
         else:
+            if subevent:
+                opqs = OrderPosition.objects.filter(subevent=subevent)
+            else:
+                opqs = OrderPosition.objects
+
+            tickc = opqs.filter(
+                order__event=sender, item__admission=True,
+                order__status__in=(Order.STATUS_PAID, Order.STATUS_PENDING),
+            ).count()
+
+            paidc = opqs.filter(
+                order__event=sender, item__admission=True,
+                order__status=Order.STATUS_PAID,
+            ).count()
+
+            if subevent:
+                rev = opqs.filter(
+                    order__event=sender, order__status=Order.STATUS_PAID
+                ).aggregate(
+                    sum=Sum('price')
+                )['sum'] or Decimal('0.00')
+
+        if not subevent:
             rev = Order.objects.filter(
                 event=sender,
                 status=Order.STATUS_PAID
@@ -58,6 +58,7 @@ from pretix.base.services.mail import SendMailException
 from pretix.base.services.orders import change_payment_provider
 from pretix.base.services.tasks import TransactionAwareTask
 from pretix.celery_app import app
+from pretix.helpers.iter import chunked_iterable
 
 from .models import BankImportJob, BankTransaction
 
@@ -103,56 +104,110 @@ def cancel_old_payments(order):
             )
 
 
-def _find_order_for_code(base_qs, code):
-    try_codes = [
+def _code_candidates(code):
+    return [
         code,
         Order.normalize_code(code, is_fallback=True),
         code[:settings.ENTROPY['order_code']],
         Order.normalize_code(code[:settings.ENTROPY['order_code']], is_fallback=True)
     ]
-    for c in try_codes:
-        try:
-            return base_qs.get(code=c)
-        except Order.DoesNotExist:
-            pass
 
 
-def _find_order_for_invoice_id(base_qs, prefix, number):
-    try:
-        # Working with __iregex here is an experiment, if this turns out to be too slow in production
-        # we might need to switch to a different approach.
-        return base_qs.select_related('order').get(
-            prefix__istartswith=prefix,  # redundant, but hopefully makes it a little faster
-            full_invoice_no__iregex=prefix + r'[\- ]*0*' + number
-        ).order
-    except (Invoice.DoesNotExist, Invoice.MultipleObjectsReturned):
-        pass
+def _invoice_no_candidates(number, lengths):
+    # Invoice numbers are stored zero-padded, while references usually omit the zeros. We only try the lengths
+    # that invoice numbers actually have.
+    number = number.lstrip('0')
+    if not number:
+        return []
+    return [
+        n.rjust(length, '0')
+        for n in {number, number.upper(), number.lower()}
+        for length in lengths
+        if length >= len(n)
+    ]
 
 
-@transaction.atomic
-def _handle_transaction(trans: BankTransaction, matches: tuple, event: Event = None, organizer: Organizer = None):
-    orders = []
-    if event:
-        for slug, code in matches:
-            order = _find_order_for_code(event.orders, code)
-            if order:
-                if order.code not in {o.code for o in orders}:
-                    orders.append(order)
-            else:
-                order = _find_order_for_invoice_id(Invoice.objects.filter(event=event), slug, code)
-                if order and order.code not in {o.code for o in orders}:
-                    orders.append(order)
-    else:
-        qs = Order.objects.filter(event__organizer=organizer)
+def _normalize_invoice_prefix(prefix):
+    return re.sub(r'[\- ]', '', prefix.upper())
+
+
+class OrderMatcher:
+    """
+    Resolves the ``(prefix, code)`` pairs found in the references of many bank transactions to order IDs at once.
+    Instead of trying every spelling of every code with a separate query, all candidate order codes and invoice
+    prefixes are looked up with a few set-based queries per chunk of references and normalized in Python.
+    """
+    chunk_size = 500
+
+    def __init__(self, matches, event: Event = None, organizer: Organizer = None):
+        self.event = event
+        self.organizer = organizer
+        self.orders = {}
+        self.invoices = {}
+        matches = list(set(matches))
+        if not matches:
+            return
+
+        if event:
+            order_qs = Order.objects.filter(event=event)
+        else:
+            order_qs = Order.objects.filter(event__organizer=organizer)
+        for chunk in chunked_iterable(matches, self.chunk_size):
+            candidates = {c for slug, code in chunk for c in _code_candidates(code)}
+            for pk, code, slug in order_qs.filter(code__in=candidates).values_list('pk', 'code', 'event__slug'):
+                self.orders[(None if event else slug.upper(), code)] = pk
+
+        unresolved = [(slug, code) for slug, code in matches if not self._find_order_id_for_code(slug, code)]
+        if not unresolved:
+            return
+
+        if event:
+            invoice_qs = Invoice.objects.filter(event=event)
+        else:
+            invoice_qs = Invoice.objects.filter(event__organizer=organizer)
+        lengths = sorted(
+            invoice_qs.annotate(nlen=Length('invoice_no')).values_list('nlen', flat=True).distinct().order_by()
+        )
+        seen = set()
+        for chunk in chunked_iterable(unresolved, self.chunk_size):
+            wanted_prefixes = {_normalize_invoice_prefix(slug) for slug, code in chunk}
+            numbers = {c for slug, code in chunk for c in _invoice_no_candidates(code, lengths)}
+            if not numbers:
+                continue
+            for pk, prefix, invoice_no, order_id in invoice_qs.filter(invoice_no__in=numbers).values_list(
+                    'pk', 'prefix', 'invoice_no', 'order_id'):
+                if pk in seen or _normalize_invoice_prefix(prefix) not in wanted_prefixes:
+                    continue
+                seen.add(pk)
+                key = (_normalize_invoice_prefix(prefix), invoice_no.upper().lstrip('0'))
+                # An ambiguous invoice number does not match any order
+                self.invoices[key] = order_id if key not in self.invoices else None
+
+    def _find_order_id_for_code(self, slug, code):
+        for c in _code_candidates(code):
+            pk = self.orders.get((None if self.event else slug.upper(), c))
+            if pk:
+                return pk
+
+    def _find_order_id_for_invoice_id(self, prefix, number):
+        return self.invoices.get((_normalize_invoice_prefix(prefix), number.upper().lstrip('0')))
+
+    def find_orders(self, matches):
+        order_ids = []
         for slug, code in matches:
-            order = _find_order_for_code(qs.filter(event__slug__iexact=slug), code)
-            if order:
-                if order.code not in {o.code for o in orders}:
-                    orders.append(order)
-            else:
-                order = _find_order_for_invoice_id(Invoice.objects.filter(event__organizer=organizer), slug, code)
-                if order and order.code not in {o.code for o in orders}:
-                    orders.append(order)
+            pk = self._find_order_id_for_code(slug, code) or self._find_order_id_for_invoice_id(slug, code)
+            if pk and pk not in order_ids:
+                order_ids.append(pk)
+        orders = Order.objects.select_related('event').in_bulk(order_ids)
+        return [orders[pk] for pk in order_ids if pk in orders]
+
+
+@transaction.atomic
+def _handle_transaction(trans: BankTransaction, matches: tuple, event: Event = None, organizer: Organizer = None,
+                        matcher: OrderMatcher = None):
+    if not matcher:
+        matcher = OrderMatcher(matches, event=event, organizer=organizer)
+    orders = matcher.find_orders(matches)
 
     if not orders:
         # No match
@@ -303,49 +358,69 @@ def parse_date(date_str, region=None):
     return None
 
 
-def _get_unknown_transactions(job: BankImportJob, data: list, event: Event = None, organizer: Organizer = None):
-    amount_pattern = re.compile("[^0-9.-]")
-    known_checksums = set(t['checksum'] for t in BankTransaction.objects.filter(
-        Q(event=event) if event else Q(organizer=organizer)
-    ).values('checksum'))
-    known_by_external_id = set((t['external_id'], t['date'], t['amount']) for t in BankTransaction.objects.filter(
-        Q(event=event) if event else Q(organizer=organizer), external_id__isnull=False
-    ).values('external_id', 'date', 'amount'))
+amount_pattern = re.compile("[^0-9.-]")
+
+
+def _parse_amount(amount):
+    if isinstance(amount, Decimal):
+        return amount
+    if ',' in amount and '.' in amount:
+        # Handle thousand-seperator , or .
+        if amount.find(',') < amount.find('.'):
+            amount = amount.replace(',', '')
+        else:
+            amount = amount.replace('.', '')
+    amount = amount_pattern.sub("", amount.replace(',', '.'))
+    try:
+        return Decimal(amount)
+    except:
+        logger.exception('Could not parse amount of transaction: {}'.format(amount))
+        return Decimal("0.00")
+
+
+def _get_unknown_transactions(job: BankImportJob, data: list, event: Event = None, organizer: Organizer = None,
+                              chunk_size=1000):
+    region = (event and event.settings.region) or (organizer and organizer.settings.region) or None
+    owner_q = Q(event=event) if event else Q(organizer=organizer)
 
     transactions = []
-    for row in data:
-        amount = row['amount']
-        if not isinstance(amount, Decimal):
-            if ',' in amount and '.' in amount:
-                # Handle thousand-seperator , or .
-                if amount.find(',') < amount.find('.'):
-                    amount = amount.replace(',', '')
-                else:
-                    amount = amount.replace('.', '')
-            amount = amount_pattern.sub("", amount.replace(',', '.'))
-            try:
-                amount = Decimal(amount)
-            except:
-                logger.exception('Could not parse amount of transaction: {}'.format(amount))
-                amount = Decimal("0.00")
-
-        trans = BankTransaction(event=event, organizer=organizer, import_job=job,
-                                payer=row.get('payer', ''),
-                                reference=row.get('reference', ''),
-                                amount=amount,
-                                date=row.get('date', ''),
-                                iban=row.get('iban', ''),
-                                bic=row.get('bic', ''),
-                                external_id=row.get('external_id'),
-                                currency=event.currency if event else job.currency)
-
-        trans.date_parsed = parse_date(trans.date, (event and event.settings.region) or (organizer and organizer.settings.region) or None)
-
-        trans.checksum = trans.calculate_checksum()
-        if trans.checksum not in known_checksums and (not trans.external_id or (trans.external_id, trans.date, trans.amount) not in known_by_external_id):
-            trans.state = BankTransaction.STATE_UNCHECKED
-            trans.save()
-            transactions.append(trans)
+    # We only compare each chunk of the import against the existing transactions with the same checksums or
+    # external IDs, so neither memory usage nor query time depend on the size of the organizer's bank history.
+    for chunk_start in range(0, len(data), chunk_size):
+        chunk = []
+        for row in data[chunk_start:chunk_start + chunk_size]:
+            trans = BankTransaction(event=event, organizer=organizer, import_job=job,
+                                    payer=row.get('payer', ''),
+                                    reference=row.get('reference', ''),
+                                    amount=_parse_amount(row['amount']),
+                                    date=row.get('date', ''),
+                                    iban=row.get('iban', ''),
+                                    bic=row.get('bic', ''),
+                                    external_id=row.get('external_id'),
+                                    currency=event.currency if event else job.currency,
+                                    state=BankTransaction.STATE_UNCHECKED)
+            trans.date_parsed = parse_date(trans.date, region)
+            trans.checksum = trans.calculate_checksum()
+            chunk.append(trans)
+
+        known_checksums = set(BankTransaction.objects.filter(
+            owner_q, checksum__in={t.checksum for t in chunk}
+        ).values_list('checksum', flat=True))
+        external_ids = {t.external_id for t in chunk if t.external_id}
+        if external_ids:
+            known_by_external_id = set(BankTransaction.objects.filter(
+                owner_q, external_id__in=external_ids, date__in={t.date for t in chunk if t.external_id},
+            ).values_list('external_id', 'date', 'amount'))
+        else:
+            known_by_external_id = set()
+
+        new = [
+            t for t in chunk
+            if t.checksum not in known_checksums and (
+                not t.external_id or (t.external_id, t.date, t.amount) not in known_by_external_id
+            )
+        ]
+        transactions += BankTransaction.objects.bulk_create(new)
 
     return transactions
 
@@ -394,6 +469,7 @@ def process_banktransfers(self, job: int, data: list) -> None:
                     )
                 )
 
+                transaction_matches = []
                 for trans in transactions:
                     # Whitespace in references is unreliable since linebreaks and spaces can occur almost anywhere, e.g.
                     # DEMOCON-123\n45 should be matched to DEMOCON-12345. However, sometimes whitespace is important,
@@ -403,15 +479,17 @@ def process_banktransfers(self, job: int, data: list) -> None:
                     matches_without_whitespace = pattern.findall(trans.reference.replace(" ", "").replace("\n", "").upper())
 
                     if len(matches_without_whitespace) > len(matches_with_whitespace):
-                        matches = matches_without_whitespace
+                        transaction_matches.append((trans, matches_without_whitespace))
                     else:
-                        matches = matches_with_whitespace
+                        transaction_matches.append((trans, matches_with_whitespace))
 
+                matcher = OrderMatcher(
+                    [m for trans, matches in transaction_matches for m in matches],
+                    **job.owner_kwargs
+                )
+                for trans, matches in transaction_matches:
                     if matches:
-                        if job.event:
-                            _handle_transaction(trans, matches, event=job.event)
-                        else:
-                            _handle_transaction(trans, matches, organizer=job.organizer)
+                        _handle_transaction(trans, matches, matcher=matcher, **job.owner_kwargs)
                     else:
                         trans.state = BankTransaction.STATE_NOMATCH
                         trans.save()
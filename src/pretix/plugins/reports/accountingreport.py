@@ -26,11 +26,12 @@ from collections import OrderedDict, defaultdict
 from decimal import Decimal
 
 from django import forms
-from django.db.models import F, Sum
+from django.db.models import F, Q, Sum
 from django.db.models.functions import Coalesce
 from django.utils.formats import date_format, localize
+from django.utils.functional import cached_property
 from django.utils.html import escape
-from django.utils.timezone import now
+from django.utils.timezone import make_aware, now
 from django.utils.translation import gettext as _, gettext_lazy, pgettext_lazy
 from reportlab.lib import colors, pagesizes
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
@@ -42,6 +43,7 @@ from reportlab.platypus import (
 from pretix.base.exporter import BaseExporter
 from pretix.base.models import (
     GiftCardTransaction, OrderFee, OrderPayment, OrderRefund, Transaction,
+    TransactionRollup, TransactionRollupState,
 )
 from pretix.base.templatetags.money import money_filter
 from pretix.base.timeframes import (
@@ -228,17 +230,86 @@ class ReportExporter(ReportlabExportMixin, BaseExporter):
             qs = qs.filter(order__testmode=False)
         return qs
 
-    def _transaction_qs_group(self, qs, form_data):
+    @cached_property
+    def _transaction_rollups_closed_until(self):
+        """
+        Returns the day up to which (exclusive) ``TransactionRollup`` rows exist for all events of this report, or
+        ``None`` if the rollups can't be used, e.g. because they were computed in a different timezone.
+        """
+        states = list(
+            TransactionRollupState.objects.filter(event__in=self.events).values_list("timezone", "closed_until")
+        )
+        if not states or any(tz != str(self.timezone) for tz, closed_until in states):
+            return None
+        if Transaction.objects.filter(
+            order__event__in=self.events.filter(transaction_rollup_state__isnull=True),
+            order__testmode=False,
+        ).exists():
+            return None
+        return min(closed_until for tz, closed_until in states)
+
+    def _start_of_day(self, day):
+        return make_aware(datetime.datetime.combine(day, datetime.time(0, 0)), self.timezone)
+
+    def _transaction_sources(self, form_data, currency, df_start, df_end):
+        """
+        Returns a queryset of ``Transaction`` objects and a queryset of ``TransactionRollup`` objects that together
+        cover all transactions between ``df_start`` (inclusive) and ``df_end`` (exclusive). Full days that are
+        already rolled up are taken from the rollups, the partial days at the start of the time frame and the days
+        that are not yet over are left for the transaction queryset. The second queryset is ``None`` if no rollups
+        can be used.
+        """
+        qs = self._transaction_qs(form_data, currency, ignore_dates=True)
+        closed_until = self._transaction_rollups_closed_until if form_data["no_testmode"] else None
+
+        if closed_until:
+            day_from = None
+            if df_start:
+                day_from = df_start.astimezone(self.timezone).date()
+                if self._start_of_day(day_from) < df_start:
+                    day_from += datetime.timedelta(days=1)
+            day_until = closed_until
+            if df_end:
+                day_until = min(day_until, df_end.astimezone(self.timezone).date())
+
+            if not day_from or day_from < day_until:
+                rollup_qs = TransactionRollup.objects.filter(
+                    event__in=self.events,
+                    event__currency=currency,
+                    day__lt=day_until,
+                )
+                q_live = Q(datetime__gte=self._start_of_day(day_until))
+                if df_end:
+                    q_live &= Q(datetime__lt=df_end)
+                if day_from:
+                    rollup_qs = rollup_qs.filter(day__gte=day_from)
+                    q_live |= Q(datetime__gte=df_start, datetime__lt=self._start_of_day(day_from))
+                return qs.filter(q_live), rollup_qs
+
+        if df_start:
+            qs = qs.filter(datetime__gte=df_start)
+        if df_end:
+            qs = qs.filter(datetime__lt=df_end)
+        return qs, None
+
+    def _transaction_total(self, form_data, currency, df_start, df_end):
+        qs, rollup_qs = self._transaction_sources(form_data, currency, df_start, df_end)
+        total = qs.aggregate(s=Sum(F("count") * F("price")))["s"] or Decimal("0.00")
+        if rollup_qs is not None:
+            total += rollup_qs.aggregate(s=Sum("gross_total"))["s"] or Decimal("0.00")
+        return total
+
+    def _transaction_qs_group(self, qs, form_data, event_field="order__event", extra_values=()):
         subevent_values = {}
         subevent_order_by = {}
         if form_data.get("split_subevents"):
             subevent_values = {"subevent_id", "subevent__name", "subevent__date_from"}
-            subevent_order_by = {Coalesce(F("subevent__date_from"), F("order__event__date_from")), Coalesce(F("subevent_id"), F("order__event_id"))}
+            subevent_order_by = {Coalesce(F("subevent__date_from"), F(f"{event_field}__date_from")), Coalesce(F("subevent_id"), F(f"{event_field}_id"))}
 
         qs = qs.order_by(
             *subevent_order_by,
-            "order__event__date_from",
-            "order__event__slug",
+            f"{event_field}__date_from",
+            f"{event_field}__slug",
             F("fee_type").asc(nulls_first=True),
             F("internal_type").asc(nulls_first=True),
             F("item__category__position").asc(nulls_first=True),
@@ -251,9 +322,9 @@ class ReportExporter(ReportlabExportMixin, BaseExporter):
             "tax_rate",
         ).values(
             *subevent_values,
-            "order__event__date_from",
-            "order__event__slug",
-            "order__event__name",
+            f"{event_field}__date_from",
+            f"{event_field}__slug",
+            f"{event_field}__name",
             "item_id",
             "item__internal_name",
             "item__name",
@@ -263,9 +334,95 @@ class ReportExporter(ReportlabExportMixin, BaseExporter):
             "internal_type",
             "price",
             "tax_rate",
+            *extra_values,
         )
         return qs
 
+    def _transaction_rows(self, form_data, currency):
+        df_start = df_end = None
+        if form_data["date_range"]:
+            df_start, df_end = resolve_timeframe_to_datetime_start_inclusive_end_exclusive(
+                now(), form_data["date_range"], self.timezone
+            )
+        qs, rollup_qs = self._transaction_sources(form_data, currency, df_start, df_end)
+        if rollup_qs is None:
+            return self._transaction_qs_group(qs, form_data).annotate(
+                sum_cont=Sum("count"),
+                sum_price=Sum(F("count") * F("price")),
+                sum_tax=Sum(F("count") * F("tax_value")),
+            )
+
+        # Rows of both sources can't be combined in the database, so we merge and sort them here, in the same
+        # order the database would have used.
+        sort_values = (
+            "item__category__position",
+            "item__category_id",
+            "item__position",
+            "variation__position",
+        )
+        rows = self._transaction_qs_group(
+            qs, form_data, extra_values=("order__event_id", *sort_values)
+        ).annotate(
+            sum_cont=Sum("count"),
+            sum_price=Sum(F("count") * F("price")),
+            sum_tax=Sum(F("count") * F("tax_value")),
+        )
+        rollup_rows = self._transaction_qs_group(
+            rollup_qs, form_data, event_field="event", extra_values=("event_id", *sort_values)
+        ).annotate(
+            sum_cont=Sum("count"),
+            sum_price=Sum("gross_total"),
+            sum_tax=Sum("tax_total"),
+        )
+
+        def group_key(r):
+            return (
+                r["order__event_id"], r.get("subevent_id"), r["item_id"], r["variation_id"], r["fee_type"],
+                r["internal_type"], r["price"], r["tax_rate"],
+            )
+
+        merged = {}
+        for r in rollup_rows:
+            r = {("order__" + k if k.startswith("event_") else k): v for k, v in r.items()}
+            merged[group_key(r)] = r
+        for r in rows:
+            key = group_key(r)
+            if key in merged:
+                for k in ("sum_cont", "sum_price", "sum_tax"):
+                    merged[key][k] += r[k]
+            else:
+                merged[key] = r
+
+        def nulls_first(v):
+            return v is not None, v
+
+        def nulls_last(v):
+            return v is None, v
+
+        def sort_key(r):
+            key = ()
+            if form_data.get("split_subevents"):
+                key += (
+                    r["subevent__date_from"] or r["order__event__date_from"],
+                    r["subevent_id"] or r["order__event_id"],
+                )
+            return key + (
+                r["order__event__date_from"],
+                r["order__event__slug"],
+                nulls_first(r["fee_type"]),
+                nulls_first(r["internal_type"]),
+                nulls_first(r["item__category__position"]),
+                nulls_first(r["item__category_id"]),
+                nulls_last(r["item__position"]),
+                nulls_last(r["item_id"]),
+                nulls_last(r["variation__position"]),
+                nulls_last(r["variation_id"]),
+                r["price"],
+                r["tax_rate"],
+            )
+
+        return sorted(merged.values(), key=sort_key)
+
     def _transaction_group_header_label(self):
         return _("Event") + " / " + _("Product")
 
@@ -320,17 +477,7 @@ class ReportExporter(ReportlabExportMixin, BaseExporter):
             ]
         ]
 
-        qs = (
-            self._transaction_qs_group(
-                self._transaction_qs(form_data, currency),
-                form_data
-            )
-            .annotate(
-                sum_cont=Sum("count"),
-                sum_price=Sum(F("count") * F("price")),
-                sum_tax=Sum(F("count") * F("tax_value")),
-            )
-        )
+        qs = self._transaction_rows(form_data, currency)
 
         tstyledata = []
 
@@ -628,9 +775,7 @@ class ReportExporter(ReportlabExportMixin, BaseExporter):
         tdata = []
 
         if df_start:
-            tx_before = self._transaction_qs(form_data, currency, ignore_dates=True).filter(
-                datetime__lt=df_start
-            ).aggregate(s=Sum(F("count") * F("price")))["s"] or Decimal("0.00")
+            tx_before = self._transaction_total(form_data, currency, None, df_start)
             p_before = self._payment_qs(form_data, currency, ignore_dates=True).filter(
                 payment_date__lt=df_start
             ).aggregate(s=Sum("amount"))["s"] or Decimal("0.00")
@@ -656,9 +801,7 @@ class ReportExporter(ReportlabExportMixin, BaseExporter):
         else:
             open_before = Decimal("0.00")
 
-        tx_during = self._transaction_qs(form_data, currency).aggregate(
-            s=Sum(F("count") * F("price"))
-        )["s"] or Decimal("0.00")
+        tx_during = self._transaction_total(form_data, currency, df_start, df_end)
         p_during = self._payment_qs(form_data, currency).aggregate(s=Sum("amount"))[
             "s"
         ] or Decimal("0.00")
@@ -33,17 +33,21 @@
 # License for the specific language governing permissions and limitations under the License.
 from datetime import datetime
 
-from django.db.models import Exists, OuterRef, Q
+from django.db.models import Exists, OuterRef, Prefetch, Q
 from i18nfield.strings import LazyI18nString
 
 from pretix.base.email import get_email_context
 from pretix.base.i18n import language
-from pretix.base.models import Checkin, Event, InvoiceAddress, Order, User
+from pretix.base.models import (
+    Checkin, Event, InvoiceAddress, LogEntry, Order, OrderPosition, User,
+)
 from pretix.base.services.mail import SendMailException, mail
 from pretix.base.services.tasks import ProfiledEventTask
 from pretix.celery_app import app
 from pretix.helpers.format import format_map
 
+SEND_MAILS_CHUNK_SIZE = 500
+
 
 @app.task(base=ProfiledEventTask, acks_late=True)
 def send_mails_to_orders(event: Event, user: int, subject: dict, message: dict, objects: list, items: list,
@@ -53,120 +57,145 @@ def send_mails_to_orders(event: Event, user: int, subject: dict, message: dict,
                          attach_ical: bool = False) -> None:
     failures = []
     user = User.objects.get(pk=user) if user else None
-    orders = Order.objects.filter(pk__in=objects, event=event)
     subject = LazyI18nString(subject)
     message = LazyI18nString(message)
-
-    for o in orders:
-        send_to_order = recipients in ('both', 'orders')
+    localized = {}
+
+    def localize(locale):
+        # The texts only depend on the locale, so we only look them up once per locale instead of once per email
+        if locale not in localized:
+            localized[locale] = subject.localize(locale), message.localize(locale)
+        return localized[locale]
+
+    positions_qs = OrderPosition.objects.annotate(
+        any_checkins=Exists(
+            Checkin.objects.filter(
+                Q(position_id=OuterRef('pk')) | Q(position__addon_to_id=OuterRef('pk')),
+                list__consider_tickets_used=True,
+            )
+        ),
+        matching_checkins=Exists(
+            Checkin.objects.filter(
+                Q(position_id=OuterRef('pk')) | Q(position__addon_to_id=OuterRef('pk')),
+                list_id__in=checkin_lists or []
+            )
+        ),
+    ).prefetch_related('addons', 'subevent')
+
+    objects = sorted(objects)
+    for i in range(0, len(objects), SEND_MAILS_CHUNK_SIZE):
+        orders = Order.objects.filter(
+            pk__in=objects[i:i + SEND_MAILS_CHUNK_SIZE], event=event
+        ).select_related('invoice_address').prefetch_related(
+            Prefetch('all_positions', queryset=positions_qs, to_attr='sendmail_positions')
+        ).order_by('pk')
+        logentries = []
 
         try:
-            ia = o.invoice_address
-        except InvoiceAddress.DoesNotExist:
-            ia = InvoiceAddress(order=o)
-
-        if recipients in ('both', 'attendees'):
-            for p in o.positions.annotate(
-                any_checkins=Exists(
-                    Checkin.objects.filter(
-                        Q(position_id=OuterRef('pk')) | Q(position__addon_to_id=OuterRef('pk')),
-                        list__consider_tickets_used=True,
-                    )
-                ),
-                matching_checkins=Exists(
-                    Checkin.objects.filter(
-                        Q(position_id=OuterRef('pk')) | Q(position__addon_to_id=OuterRef('pk')),
-                        list_id__in=checkin_lists or []
-                    )
-                ),
-            ).prefetch_related('addons', 'subevent'):
-                if p.addon_to_id is not None:
-                    continue
-
-                if p.item_id not in items and not any(a.item_id in items for a in p.addons.all()):
-                    continue
-
-                if filter_checkins:
-                    allowed = (
-                        (not_checked_in and not p.any_checkins)
-                        or p.matching_checkins
-                    )
-                    if not allowed:
-                        continue
-
-                if not p.attendee_email:
-                    if recipients == 'attendees':
-                        send_to_order = True
-                    continue
-
-                if p.attendee_email == o.email and send_to_order:
-                    continue
-
-                if subevent and p.subevent_id != subevent:
-                    continue
-
-                if subevents_from and p.subevent.date_from < subevents_from:
-                    continue
-
-                if subevents_to and p.subevent.date_from >= subevents_to:
-                    continue
+            for o in orders:
+                send_to_order = recipients in ('both', 'orders')
+                subject_localized, message_localized = localize(o.locale)
 
                 try:
-                    with language(o.locale, event.settings.region):
-                        email_context = get_email_context(event=event, order=o, invoice_address=ia, position=p)
-                        mail(
-                            p.attendee_email,
-                            subject,
-                            message,
-                            email_context,
-                            event,
-                            locale=o.locale,
-                            order=o,
-                            position=p,
-                            attach_tickets=attach_tickets,
-                            attach_ical=attach_ical,
-                            attach_cached_files=attachments
-                        )
-                        o.log_action(
-                            'pretix.plugins.sendmail.order.email.sent.attendee',
-                            user=user,
-                            data={
-                                'position': p.positionid,
-                                'subject': format_map(subject.localize(o.locale), email_context),
-                                'message': format_map(message.localize(o.locale), email_context),
-                                'recipient': p.attendee_email
-                            }
-                        )
-                except SendMailException:
-                    failures.append(p.attendee_email)
-
-        if send_to_order and o.email:
-            try:
-                with language(o.locale, event.settings.region):
-                    email_context = get_email_context(event=event, order=o, invoice_address=ia)
-                    mail(
-                        o.email,
-                        subject,
-                        message,
-                        email_context,
-                        event,
-                        locale=o.locale,
-                        order=o,
-                        attach_tickets=attach_tickets,
-                        attach_ical=attach_ical,
-                        attach_cached_files=attachments,
-                    )
-                    o.log_action(
-                        'pretix.plugins.sendmail.order.email.sent',
-                        user=user,
-                        data={
-                            'subject': format_map(subject.localize(o.locale), email_context),
-                            'message': format_map(message.localize(o.locale), email_context),
-                            'recipient': o.email
-                        }
-                    )
-            except SendMailException:
-                failures.append(o.email)
+                    ia = o.invoice_address
+                except InvoiceAddress.DoesNotExist:
+                    ia = InvoiceAddress(order=o)
+
+                if recipients in ('both', 'attendees'):
+                    for p in o.sendmail_positions:
+                        if p.addon_to_id is not None:
+                            continue
+
+                        if p.item_id not in items and not any(a.item_id in items for a in p.addons.all()):
+                            continue
+
+                        if filter_checkins:
+                            allowed = (
+                                (not_checked_in and not p.any_checkins)
+                                or p.matching_checkins
+                            )
+                            if not allowed:
+                                continue
+
+                        if not p.attendee_email:
+                            if recipients == 'attendees':
+                                send_to_order = True
+                            continue
+
+                        if p.attendee_email == o.email and send_to_order:
+                            continue
+
+                        if subevent and p.subevent_id != subevent:
+                            continue
+
+                        if subevents_from and p.subevent.date_from < subevents_from:
+                            continue
+
+                        if subevents_to and p.subevent.date_from >= subevents_to:
+                            continue
+
+                        try:
+                            with language(o.locale, event.settings.region):
+                                email_context = get_email_context(event=event, order=o, invoice_address=ia, position=p)
+                                mail(
+                                    p.attendee_email,
+                                    subject,
+                                    message,
+                                    email_context,
+                                    event,
+                                    locale=o.locale,
+                                    order=o,
+                                    position=p,
+                                    attach_tickets=attach_tickets,
+                                    attach_ical=attach_ical,
+                                    attach_cached_files=attachments
+                                )
+                                logentries.append(o.log_action(
+                                    'pretix.plugins.sendmail.order.email.sent.attendee',
+                                    user=user,
+                                    data={
+                                        'position': p.positionid,
+                                        'subject': format_map(subject_localized, email_context),
+                                        'message': format_map(message_localized, email_context),
+                                        'recipient': p.attendee_email
+                                    },
+                                    save=False,
+                                ))
+                        except SendMailException:
+                            failures.append(p.attendee_email)
+
+                if send_to_order and o.email:
+                    try:
+                        with language(o.locale, event.settings.region):
+                            email_context = get_email_context(event=event, order=o, invoice_address=ia)
+                            mail(
+                                o.email,
+                                subject,
+                                message,
+                                email_context,
+                                event,
+                                locale=o.locale,
+                                order=o,
+                                attach_tickets=attach_tickets,
+                                attach_ical=attach_ical,
+                                attach_cached_files=attachments,
+                            )
+                            logentries.append(o.log_action(
+                                'pretix.plugins.sendmail.order.email.sent',
+                                user=user,
+                                data={
+                                    'subject': format_map(subject_localized, email_context),
+                                    'message': format_map(message_localized, email_context),
+                                    'recipient': o.email
+                                },
+                                save=False,
+                            ))
+                    except SendMailException:
+                        failures.append(o.email)
+
+        finally:
+            # Emails that have already been queued must show up in the order history, even if we fail halfway
+            LogEntry.bulk_create_and_postprocess(logentries)
 
 
 @app.task(base=ProfiledEventTask, acks_late=True)
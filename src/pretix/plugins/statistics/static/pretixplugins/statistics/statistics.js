@@ -6,6 +6,9 @@ function gettext(msgid) {
     return msgid;
 }
 $(function () {
+    $("#statistics-granularity").change(function () {
+        $(this).closest("form").submit();
+    });
     $(".chart").css("height", "250px");
     new Morris.Area({
         element: 'obd_chart',
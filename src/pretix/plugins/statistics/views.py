@@ -38,17 +38,66 @@ from decimal import Decimal
 
 import dateutil.parser
 import dateutil.rrule
-from django.db.models import Count, DateTimeField, Max, Min, OuterRef, Subquery
+from django.db.models import (
+    Count, DateTimeField, Exists, Max, Min, OuterRef, Subquery, Sum,
+)
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
 from django.utils import timezone
 from django.views.generic import TemplateView
 
 from pretix.base.models import (
     Item, Order, OrderPayment, OrderPosition, SubEvent,
 )
+from pretix.base.services.stats import sales_rollups_available
 from pretix.control.permissions import EventPermissionRequiredMixin
 from pretix.control.views import ChartContainingView
 from pretix.plugins.statistics.signals import clear_cache
 
+GRANULARITIES = {
+    'hour': (TruncHour, dateutil.rrule.HOURLY, '%Y-%m-%d %H:00'),
+    'day': (TruncDay, dateutil.rrule.DAILY, '%Y-%m-%d'),
+    'week': (TruncWeek, dateutil.rrule.WEEKLY, '%Y-%m-%d'),
+}
+
+
+def _bucketed(qs, field, granularity, tz, **aggregates):
+    """
+    Groups ``qs`` by ``field`` truncated to the given granularity in the database and returns a dictionary
+    mapping the formatted start of every non-empty bucket to the aggregated values.
+    """
+    trunc, freq, fmt = GRANULARITIES[granularity]
+    return {
+        r['bucket'].astimezone(tz).replace(tzinfo=None): r
+        for r in qs.annotate(
+            bucket=trunc(field, tzinfo=tz)
+        ).values('bucket').annotate(**aggregates).order_by()
+    }
+
+
+def _bucket_range(granularity, tz, *bucket_dicts):
+    """
+    Returns all buckets between the first and the last bucket used in any of the given dictionaries, or just
+    the current bucket if all of them are empty.
+    """
+    trunc, freq, fmt = GRANULARITIES[granularity]
+    keys = [k for d in bucket_dicts for k in d.keys()]
+    if not keys:
+        keys = [timezone.now().astimezone(tz).replace(tzinfo=None)]
+        if granularity == 'hour':
+            keys = [keys[0].replace(minute=0, second=0, microsecond=0)]
+        else:
+            keys = [keys[0].replace(hour=0, minute=0, second=0, microsecond=0)]
+            if granularity == 'week':
+                keys = [keys[0] - datetime.timedelta(days=keys[0].weekday())]
+    buckets = dateutil.rrule.rrule(freq, dtstart=min(keys), until=max(keys))
+    if granularity == 'hour':
+        # Skip the hour that does not exist locally when clocks are set forward
+        return [
+            d for d in buckets
+            if d.replace(tzinfo=tz).astimezone(datetime.timezone.utc).astimezone(tz).replace(tzinfo=None) == d
+        ]
+    return list(buckets)
+
 
 class IndexView(EventPermissionRequiredMixin, ChartContainingView, TemplateView):
     template_name = 'pretixplugins/statistics/index.html'
@@ -69,8 +118,15 @@ class IndexView(EventPermissionRequiredMixin, ChartContainingView, TemplateView)
             except SubEvent.DoesNotExist:
                 pass
 
+        granularity = self.request.GET.get('granularity')
+        if granularity not in GRANULARITIES:
+            granularity = 'day'
+        fmt = GRANULARITIES[granularity][2]
+        ctx['granularity'] = granularity
+
         cache = self.request.event.cache
         ckey = str(subevent.pk) if subevent else 'all'
+        gkey = ckey if granularity == 'day' else '{}:{}'.format(ckey, granularity)
 
         p_date = OrderPayment.objects.filter(
             order=OuterRef('pk'),
@@ -92,59 +148,69 @@ class IndexView(EventPermissionRequiredMixin, ChartContainingView, TemplateView)
         ).order_by()
 
         # Orders by day
-        ctx['obd_data'] = cache.get('statistics_obd_data' + ckey)
+        ctx['obd_data'] = cache.get('statistics_obd_data' + gkey)
         if not ctx['obd_data']:
-            oqs = Order.objects.annotate(payment_date=Subquery(p_date, output_field=DateTimeField()))
+            oqs = Order.objects.filter(event=self.request.event)
             if subevent:
-                oqs = oqs.filter(all_positions__subevent_id=subevent, all_positions__canceled=False).distinct()
+                oqs = oqs.filter(
+                    Exists(OrderPosition.objects.filter(order_id=OuterRef('pk'), subevent=subevent))
+                )
 
-            ordered_by_day = {}
-            for o in oqs.filter(event=self.request.event).values('datetime'):
-                day = o['datetime'].astimezone(tz).date()
-                ordered_by_day[day] = ordered_by_day.get(day, 0) + 1
-            paid_by_day = {}
-            for o in oqs.filter(event=self.request.event, payment_date__isnull=False).values('payment_date'):
-                day = o['payment_date'].astimezone(tz).date()
-                paid_by_day[day] = paid_by_day.get(day, 0) + 1
+            ordered = _bucketed(oqs, 'datetime', granularity, tz, cnt=Count('id'))
+            paid = _bucketed(
+                oqs.annotate(
+                    payment_date=Subquery(p_date, output_field=DateTimeField())
+                ).filter(payment_date__isnull=False),
+                'payment_date', granularity, tz, cnt=Count('id')
+            )
 
             data = []
-            for d in dateutil.rrule.rrule(
-                    dateutil.rrule.DAILY,
-                    dtstart=min(ordered_by_day.keys()) if ordered_by_day else datetime.date.today(),
-                    until=max(
-                        max(ordered_by_day.keys() if paid_by_day else [datetime.date.today()]),
-                        max(paid_by_day.keys() if paid_by_day else [datetime.date(1970, 1, 1)])
-                    )):
-                d = d.date()
+            for d in _bucket_range(granularity, tz, ordered, paid):
                 data.append({
-                    'date': d.strftime('%Y-%m-%d'),
-                    'ordered': ordered_by_day.get(d, 0),
-                    'paid': paid_by_day.get(d, 0)
+                    'date': d.strftime(fmt),
+                    'ordered': ordered[d]['cnt'] if d in ordered else 0,
+                    'paid': paid[d]['cnt'] if d in paid else 0,
                 })
 
             ctx['obd_data'] = json.dumps(data)
-            cache.set('statistics_obd_data' + ckey, ctx['obd_data'])
+            cache.set('statistics_obd_data' + gkey, ctx['obd_data'])
 
         # Orders by product
         ctx['obp_data'] = cache.get('statistics_obp_data' + ckey)
         if not ctx['obp_data']:
-            opqs = OrderPosition.objects
-            if subevent:
-                opqs = opqs.filter(subevent=subevent)
-            num_ordered = {
-                p['item']: p['cnt']
-                for p in (opqs
-                          .filter(order__event=self.request.event)
-                          .values('item')
-                          .annotate(cnt=Count('id')).order_by())
-            }
-            num_paid = {
-                p['item']: p['cnt']
-                for p in (opqs
-                          .filter(order__event=self.request.event, order__status=Order.STATUS_PAID)
-                          .values('item')
-                          .annotate(cnt=Count('id')).order_by())
-            }
+            if sales_rollups_available(self.request.event):
+                rqs = self.request.event.sales_rollups.filter(canceled=False)
+                if subevent:
+                    rqs = rqs.filter(subevent=subevent)
+                num_ordered = {
+                    p['item']: p['cnt']
+                    for p in rqs.values('item').annotate(cnt=Sum('count')).order_by()
+                }
+                num_paid = {
+                    p['item']: p['cnt']
+                    for p in (rqs
+                              .filter(order_status=Order.STATUS_PAID)
+                              .values('item')
+                              .annotate(cnt=Sum('count')).order_by())
+                }
+            else:
+                opqs = OrderPosition.objects
+                if subevent:
+                    opqs = opqs.filter(subevent=subevent)
+                num_ordered = {
+                    p['item']: p['cnt']
+                    for p in (opqs
+                              .filter(order__event=self.request.event)
+                              .values('item')
+                              .annotate(cnt=Count('id')).order_by())
+                }
+                num_paid = {
+                    p['item']: p['cnt']
+                    for p in (opqs
+                              .filter(order__event=self.request.event, order__status=Order.STATUS_PAID)
+                              .values('item')
+                              .annotate(cnt=Count('id')).order_by())
+                }
             item_names = {
                 i.id: str(i)
                 for i in Item.objects.filter(event=self.request.event)
@@ -159,41 +225,52 @@ class IndexView(EventPermissionRequiredMixin, ChartContainingView, TemplateView)
             ])
             cache.set('statistics_obp_data' + ckey, ctx['obp_data'])
 
-        ctx['rev_data'] = cache.get('statistics_rev_data' + ckey)
+        ctx['rev_data'] = cache.get('statistics_rev_data' + gkey)
         if not ctx['rev_data']:
-            rev_by_day = {}
-            if subevent:
-                for o in OrderPosition.objects.annotate(
+            if subevent and granularity == 'day' and sales_rollups_available(self.request.event):
+                rev = {
+                    datetime.datetime.combine(r['payment_date'], datetime.time(0, 0)): r
+                    for r in self.request.event.sales_rollups.filter(
+                        subevent=subevent,
+                        canceled=False,
+                        order_status=Order.STATUS_PAID,
+                        payment_date__isnull=False,
+                    ).values('payment_date').annotate(revenue=Sum('price')).order_by()
+                }
+            elif subevent:
+                rev = _bucketed(
+                    OrderPosition.objects.annotate(
                         payment_date=Subquery(op_date, output_field=DateTimeField())
-                ).filter(order__event=self.request.event,
-                         subevent=subevent,
-                         order__status=Order.STATUS_PAID,
-                         payment_date__isnull=False).values('payment_date', 'price'):
-                    day = o['payment_date'].astimezone(tz).date()
-                    rev_by_day[day] = rev_by_day.get(day, 0) + o['price']
+                    ).filter(
+                        order__event=self.request.event,
+                        subevent=subevent,
+                        order__status=Order.STATUS_PAID,
+                        payment_date__isnull=False
+                    ),
+                    'payment_date', granularity, tz, revenue=Sum('price')
+                )
             else:
-                for o in Order.objects.annotate(
+                rev = _bucketed(
+                    Order.objects.annotate(
                         payment_date=Subquery(p_date, output_field=DateTimeField())
-                ).filter(event=self.request.event,
-                         status=Order.STATUS_PAID,
-                         payment_date__isnull=False).values('payment_date', 'total'):
-                    day = o['payment_date'].astimezone(tz).date()
-                    rev_by_day[day] = rev_by_day.get(day, 0) + o['total']
+                    ).filter(
+                        event=self.request.event,
+                        status=Order.STATUS_PAID,
+                        payment_date__isnull=False
+                    ),
+                    'payment_date', granularity, tz, revenue=Sum('total')
+                )
 
             data = []
             total = 0
-            for d in dateutil.rrule.rrule(
-                    dateutil.rrule.DAILY,
-                    dtstart=min(rev_by_day.keys() if rev_by_day else [datetime.date.today()]),
-                    until=max(rev_by_day.keys() if rev_by_day else [datetime.date.today()])):
-                d = d.date()
-                total += float(rev_by_day.get(d, 0))
+            for d in _bucket_range(granularity, tz, rev):
+                total += float(rev[d]['revenue'] if d in rev else 0)
                 data.append({
-                    'date': d.strftime('%Y-%m-%d'),
+                    'date': d.strftime(fmt),
                     'revenue': round(total, 2),
                 })
             ctx['rev_data'] = json.dumps(data)
-            cache.set('statistics_rev_data' + ckey, ctx['rev_data'])
+            cache.set('statistics_rev_data' + gkey, ctx['rev_data'])
 
         ctx['has_orders'] = self.request.event.orders.exists()
 
@@ -47,7 +47,7 @@ from django.utils.translation import gettext_lazy as _
 from pypdf import PdfWriter
 
 from pretix.base.i18n import language
-from pretix.base.models import Order, OrderPosition
+from pretix.base.models import CachedTicket, Order, OrderPosition
 from pretix.base.pdf import Renderer
 from pretix.base.ticketoutput import BaseTicketOutput
 from pretix.plugins.ticketoutputpdf.models import (
@@ -112,21 +112,51 @@ class PdfTicketOutput(BaseTicketOutput):
         p.save()
         return renderer.render_background(buffer, _('Ticket'))
 
+    def _read_cached_ticket(self, ct):
+        try:
+            with ct.file.open('rb') as f:
+                return f.read()
+        except OSError:
+            logger.warning('Could not read cached ticket %s, rendering it again.', ct.pk)
+            return None
+
+    def _store_cached_ticket(self, op: OrderPosition, order: Order, data: bytes):
+        ct = CachedTicket.objects.create(order_position=op, provider=self.identifier, extension='.pdf',
+                                         type='application/pdf', file=None)
+        ct.file.save('order%s%s.pdf' % (self.event.slug, order.code), ContentFile(data))
+
     def generate_order(self, order: Order):
         merger = PdfWriter()
+
+        # The combined file consists of exactly the same pages as the files of the individual positions, so we
+        # re-use and fill the per-position cache unless we are rendering with a non-standard configuration.
+        use_cache = not (self.override_layout or self.override_background or self.override_channel)
+        cached_tickets = {}
+        if use_cache:
+            for ct in CachedTicket.objects.filter(
+                order_position__order=order, provider=self.identifier, file__isnull=False
+            ).exclude(file='').order_by('pk'):
+                cached_tickets[ct.order_position_id] = ct
+
         with language(order.locale, self.event.settings.region):
             for op in self.get_tickets_to_print(order):
-                layout = override_layout.send_chained(
-                    order.event, 'layout', orderposition=op, layout=self.layout_map.get(
-                        (op.item_id, self.override_channel or order.sales_channel.identifier),
-                        self.layout_map.get(
-                            (op.item_id, 'web'),
-                            self.default_layout
+                data = None
+                if op.pk in cached_tickets:
+                    data = self._read_cached_ticket(cached_tickets[op.pk])
+                if data is None:
+                    layout = override_layout.send_chained(
+                        order.event, 'layout', orderposition=op, layout=self.layout_map.get(
+                            (op.item_id, self.override_channel or order.sales_channel.identifier),
+                            self.layout_map.get(
+                                (op.item_id, 'web'),
+                                self.default_layout
+                            )
                         )
                     )
-                )
-                outbuffer = self._draw_page(layout, op, order)
-                merger.append(ContentFile(outbuffer.read()))
+                    data = self._draw_page(layout, op, order).read()
+                    if use_cache:
+                        self._store_cached_ticket(op, order, data)
+                merger.append(ContentFile(data))
 
         outbuffer = BytesIO()
         merger.write(outbuffer)
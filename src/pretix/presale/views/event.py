@@ -34,11 +34,13 @@
 
 import calendar
 import hashlib
+import pickle
 import sys
 from collections import defaultdict
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from importlib import import_module
+from io import BytesIO
 from urllib.parse import urlencode
 
 import isoweek
@@ -46,13 +48,15 @@ from dateutil import parser
 from django import forms
 from django.conf import settings
 from django.contrib import messages
+from django.core.cache import caches
 from django.core.exceptions import PermissionDenied
 from django.db.models import (
-    Count, Exists, IntegerField, OuterRef, Prefetch, Q, Value,
+    Count, Exists, IntegerField, Min, OuterRef, Prefetch, Q, Value,
 )
 from django.db.models.lookups import Exact
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.utils.decorators import method_decorator
 from django.utils.formats import get_format
 from django.utils.functional import SimpleLazyObject
@@ -66,7 +70,8 @@ from django.views.generic import TemplateView
 from pretix.base.auth import has_event_access_permission
 from pretix.base.forms.widgets import SplitDateTimePickerWidget
 from pretix.base.models import (
-    ItemVariation, Quota, SalesChannel, SeatCategoryMapping, Voucher,
+    ItemVariation, Organizer, Quota, SalesChannel, SeatCategoryMapping,
+    Voucher,
 )
 from pretix.base.models.event import Event, SubEvent
 from pretix.base.models.items import (
@@ -110,6 +115,77 @@ def item_group_by_category(items):
     )
 
 
+# Maximum lifetime of a catalog snapshot. Snapshots are versioned through the event cache, which is cleared whenever
+# items, variations, categories, quotas, tax rules or subevents change, so this is only a safety net.
+CATALOG_SNAPSHOT_TIMEOUT = 300
+
+
+def _catalog_snapshot_timeout(event, subevent):
+    """
+    Products and variations can appear or disappear from the shop purely based on the passage of time. We therefore
+    never keep a catalog snapshot past the next ``available_from`` or ``available_until`` date of any of them.
+    """
+    n = now()
+    boundaries = []
+    for qs in (event.items.all(), ItemVariation.objects.filter(item__event=event)) + ((
+        SubEventItem.objects.filter(subevent=subevent),
+        SubEventItemVariation.objects.filter(subevent=subevent),
+    ) if subevent else ()):
+        boundaries += qs.using(settings.DATABASE_REPLICA).aggregate(
+            f=Min('available_from', filter=Q(available_from__gt=n)),
+            u=Min('available_until', filter=Q(available_until__gte=n)),
+        ).values()
+    boundaries = [b for b in boundaries if b is not None]
+    if not boundaries:
+        return CATALOG_SNAPSHOT_TIMEOUT
+    return max(1, min(CATALOG_SNAPSHOT_TIMEOUT, int((min(boundaries) - n).total_seconds())))
+
+
+class _CatalogSnapshotPickler(pickle.Pickler):
+    # Loaded model instances (and the prefetch querysets attached to them) carry references to the event, organizer
+    # and subevent, which hold settings and cache objects that cannot (and should not) be serialized. We store
+    # references to them instead and plug the live objects back in when loading.
+    def __init__(self, file, event, subevent):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.event = event
+        self.subevent = subevent
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Event) and obj.pk == self.event.pk:
+            return 'event'
+        if self.subevent and isinstance(obj, SubEvent) and obj.pk == self.subevent.pk:
+            return 'subevent'
+        if isinstance(obj, Organizer) and obj.pk == self.event.organizer_id:
+            return 'organizer'
+        return None
+
+
+class _CatalogSnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, event, subevent):
+        super().__init__(file)
+        self.event = event
+        self.subevent = subevent
+
+    def persistent_load(self, pid):
+        if pid == 'event':
+            return self.event
+        if pid == 'subevent' and self.subevent:
+            return self.subevent
+        if pid == 'organizer':
+            return self.event.organizer
+        raise pickle.UnpicklingError(f'Unsupported persistent object {pid}')
+
+
+def _dump_catalog_snapshot(items, event, subevent):
+    f = BytesIO()
+    _CatalogSnapshotPickler(f, event, subevent).dump(items)
+    return f.getvalue()
+
+
+def _load_catalog_snapshot(data, event, subevent):
+    return _CatalogSnapshotUnpickler(BytesIO(data), event, subevent).load()
+
+
 def get_grouped_items(event, *, channel: SalesChannel, subevent=None, voucher=None, require_seat=0, base_qs=None,
                       allow_addons=False, allow_cross_sell=False,
                       quota_cache=None, filter_items=None, filter_categories=None, memberships=None,
@@ -246,6 +322,28 @@ def get_grouped_items(event, *, channel: SalesChannel, subevent=None, voucher=No
     if filter_categories:
         items = items.filter(category_id__in=[a for a in filter_categories if a.isdigit()])
 
+    # The product structure loaded above only depends on the catalog, not on availability, so for the common case of
+    # a plain shop page we keep a serialized copy of it in the event cache. Everything below only overlays
+    # availability, prices and membership filters on top of it. We do not use the snapshot with a time machine
+    # override or for seated products, since seat category mappings are not part of the cache invalidation.
+    use_snapshot = (
+        not voucher and not allow_addons and not allow_cross_sell and not base_qs_set and not filter_items
+        and not filter_categories and time_machine_now(default=None) is None
+        and not (event.settings.seating_choice and (subevent or event).seating_plan_id)
+    )
+    if use_snapshot:
+        snapshot_key = (
+            f'catalog_snapshot:{subevent.id if subevent else 0}:{channel.identifier}:{require_seat}:'
+            f'{memberships is not None}'
+        )
+        snapshot = event.cache.get(snapshot_key)
+        if snapshot is None:
+            items = list(items)
+            event.cache.set(snapshot_key, _dump_catalog_snapshot(items, event, subevent),
+                            _catalog_snapshot_timeout(event, subevent))
+        else:
+            items = _load_catalog_snapshot(snapshot, event, subevent)
+
     display_add_to_cart = False
     quota_cache_key = f'item_quota_cache:{subevent.id if subevent else 0}:{channel.identifier}:{bool(require_seat)}'
     quota_cache = quota_cache or event.cache.get(quota_cache_key) or {}
@@ -568,7 +666,13 @@ class EventIndex(EventViewMixin, EventListMixin, CartMixin, TemplateView):
 
         context['allow_waitinglist'] = context['ev'].waiting_list_active and context['ev'].presale_is_running
 
-        if not self.request.event.has_subevents or self.subevent:
+        product_list_cache_key = self._product_list_cachekey()
+        product_list_cached = (
+            caches[settings.CACHE_LARGE_VALUES_ALIAS].get(product_list_cache_key) if product_list_cache_key else None
+        )
+        if product_list_cached and (not self.request.event.has_subevents or self.subevent):
+            context.update(product_list_cached)
+        elif not self.request.event.has_subevents or self.subevent:
             # Fetch all items
             items, display_add_to_cart = get_grouped_items(
                 self.request.event,
@@ -644,8 +748,39 @@ class EventIndex(EventViewMixin, EventListMixin, CartMixin, TemplateView):
         else:
             context['cart_redirect'] = self.request.path
 
+        if product_list_cache_key and not product_list_cached and 'items_by_category' in context:
+            context['product_list_html'] = render_to_string(
+                'pretixpresale/event/fragment_product_list.html', context, request=self.request
+            )
+            caches[settings.CACHE_LARGE_VALUES_ALIAS].set(product_list_cache_key, {
+                k: context[k] for k in (
+                    'product_list_html', 'itemnum', 'allfree', 'display_add_to_cart', 'waitinglist_seated',
+                )
+            }, 10)
+            # The rendered product list is shared by all anonymous visitors without a cart and cached for a really
+            # short duration – this should make it pretty accurate with regards to availability display, while still
+            # taking most of the load off the origin during burst traffic.
+
         return context
 
+    def _product_list_cachekey(self):
+        if (
+            not settings.CACHE_LARGE_VALUES_ALLOWED
+            or getattr(self.request, 'customer', None)
+            or getattr(self.request, 'now_dt_is_fake', False)
+            or get_cart(self.request)
+        ):
+            return None
+        cache_key_parts = [
+            self.request.host,
+            str(self.request.event.pk),
+            self.request.get_full_path(),
+            self.request.LANGUAGE_CODE,
+            self.request.sales_channel.identifier,
+        ]
+        cache_key = f'pretix.presale.views.event.EventIndex.product_list:{hashlib.md5(":".join(cache_key_parts).encode()).hexdigest()}'
+        return cache_key
+
     def _subevent_list_cachekey(self):
         cache_key_parts = [
             self.request.host,
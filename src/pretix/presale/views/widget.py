@@ -40,6 +40,9 @@ from django.db.models import Q
 from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.template import Context, Engine
 from django.template.loader import get_template
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, set_response_etag,
+)
 from django.utils.formats import date_format
 from django.utils.timezone import now
 from django.utils.translation import get_language, gettext, pgettext
@@ -356,9 +359,15 @@ class WidgetAPIProductList(EventListMixin, View):
     def post_process(self, data):
         data['poweredby'] = get_powered_by(self.request, safelink=False)
 
-    def response(self, data):
+    def response(self, data, max_age=None):
         self.post_process(data)
         resp = JsonResponse(data)
+        if max_age:
+            # Responses without a cart are the same for every visitor, so we allow shared caches (CDNs, proxies) to
+            # keep them for as long as we keep them ourselves and let browsers revalidate cheaply using the ETag.
+            patch_cache_control(resp, public=True, max_age=max_age)
+            set_response_etag(resp)
+            resp = get_conditional_response(self.request, etag=resp['ETag'], response=resp)
         resp['Access-Control-Allow-Origin'] = '*'
         resp._csp_ignore = True
         return resp
@@ -522,7 +531,7 @@ class WidgetAPIProductList(EventListMixin, View):
         ])
         cached_data = cache.get(cache_key)
         if cached_data:
-            return self.response(cached_data)
+            return self.response(cached_data, max_age=30)
 
         if list_type == "calendar":
             self._set_month_year()
@@ -694,7 +703,7 @@ class WidgetAPIProductList(EventListMixin, View):
         cache.set(cache_key, data, 30)
         # These pages are cached for a really short duration – this should make them pretty accurate, while still
         # providing some protection against burst traffic.
-        return self.response(data)
+        return self.response(data, max_age=30)
 
     def _get_event_view(self, request, **kwargs):
         cache_key = ':'.join([
@@ -710,7 +719,7 @@ class WidgetAPIProductList(EventListMixin, View):
         if "cart_id" not in request.GET:
             cached_data = cache.get(cache_key)
             if cached_data:
-                return self.response(cached_data)
+                return self.response(cached_data, max_age=10)
 
         data = {
             'target_url': build_absolute_uri(request.event, 'presale:event.index'),
@@ -823,4 +832,5 @@ class WidgetAPIProductList(EventListMixin, View):
             cache.set(cache_key, data, 10)
             # These pages are cached for a really short duration – this should make them pretty accurate with
             # regards to availability display, while still providing some protection against burst traffic.
+            return self.response(data, max_age=10)
         return self.response(data)
@@ -241,6 +241,8 @@ EMAIL_HOST_USER = config.get('mail', 'user', fallback='')
 EMAIL_HOST_PASSWORD = config.get('mail', 'password', fallback='')
 EMAIL_USE_TLS = config.getboolean('mail', 'tls', fallback=False)
 EMAIL_USE_SSL = config.getboolean('mail', 'ssl', fallback=False)
+MAIL_CONNECTION_MAX_IDLE = config.getint('mail', 'connection_max_idle', fallback=30)
+MAIL_CONNECTION_MAX_MESSAGES = config.getint('mail', 'connection_max_messages', fallback=100)
 EMAIL_SUBJECT_PREFIX = '[pretix] '
 EMAIL_BACKEND = EMAIL_CUSTOM_SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_TIMEOUT = 60
@@ -250,6 +252,8 @@ ADMINS = [('Admin', n) for n in config.get('mail', 'admins', fallback='').split(
 METRICS_ENABLED = config.getboolean('metrics', 'enabled', fallback=False)
 METRICS_USER = config.get('metrics', 'user', fallback="metrics")
 METRICS_PASSPHRASE = config.get('metrics', 'passphrase', fallback="")
+METRICS_FLUSH_INTERVAL = config.getfloat('metrics', 'flush_interval', fallback=5)
+METRICS_MODEL_COUNT_INTERVAL = config.getint('metrics', 'model_count_interval', fallback=15)
 
 CACHES = {
     'default': {
@@ -691,6 +695,7 @@ CELERY_TASK_ROUTES = ([
     ('pretix.base.services.export.scheduled_event_export', {'queue': 'background'}),
     ('pretix.base.services.orders.*', {'queue': 'checkout'}),
     ('pretix.base.services.mail.*', {'queue': 'mail'}),
+    ('pretix.base.services.periodic.*', {'queue': 'background'}),
     ('pretix.base.services.update_check.*', {'queue': 'background'}),
     ('pretix.base.services.quotas.*', {'queue': 'background'}),
     ('pretix.base.services.waitinglist.*', {'queue': 'background'}),
@@ -5,6 +5,7 @@ var async_task_check_url = null;
 var async_task_old_url = null;
 var async_task_is_download = false;
 var async_task_is_long = false;
+var async_task_interval = 250;
 
 function async_task_check() {
     "use strict";
@@ -50,7 +51,9 @@ function async_task_check_callback(data, textStatus, jqXHR) {
             }
         }
     }
-    async_task_timeout = window.setTimeout(async_task_check, 250);
+    // The server does not wait for the task when we poll, so we poll less often the longer the task takes
+    async_task_timeout = window.setTimeout(async_task_check, async_task_interval);
+    async_task_interval = Math.min(async_task_interval * 1.25, 2000);
 
     if (async_task_is_long) {
         if (data.started) {
@@ -127,6 +130,7 @@ function async_task_callback(data, jqXHR, status) {
     }
     async_task_id = data.async_id;
     async_task_check_url = data.check_url;
+    async_task_interval = 250;
     async_task_timeout = window.setTimeout(async_task_check, 100);
 
     if (async_task_is_long) {
@@ -755,7 +755,8 @@ var shared_methods = {
                 this.async_task_check_url = this.$root.target_url.replace(/^([^\/]+:\/\/[^\/]+)\/.*$/, "$1") + data.check_url;
             }
             this.async_task_timeout = window.setTimeout(this.buy_check, this.async_task_interval);
-            this.async_task_interval = 250;
+            // The server does not wait for the task when we poll, so we poll less often the longer it takes
+            this.async_task_interval = Math.min(Math.max(this.async_task_interval * 1.25, 250), 1000);
         }
     },
     buy_check: function () {
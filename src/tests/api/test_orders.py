@@ -34,8 +34,11 @@ from stripe import error
 from tests.plugins.stripe.test_checkout import apple_domain_create
 from tests.plugins.stripe.test_provider import MockedCharge
 
-from pretix.base.models import InvoiceAddress, Order, OrderPosition
+from pretix.base.models import (
+    InvoiceAddress, Order, OrderPosition, SalesRollup,
+)
 from pretix.base.models.orders import OrderFee, OrderPayment, OrderRefund
+from pretix.base.services.stats import rebuild_sales_rollups
 
 
 @pytest.fixture
@@ -1468,6 +1471,25 @@ def test_order_mark_paid_unpaid(token_client, organizer, event, order):
     assert resp.data['status'] == Order.STATUS_PENDING
 
 
+@pytest.mark.django_db
+def test_order_mark_paid_unpaid_refreshes_rollups(token_client, organizer, event, order,
+                                                  django_capture_on_commit_callbacks):
+    order.status = Order.STATUS_PAID
+    order.save()
+    with scopes_disabled():
+        rebuild_sales_rollups(event)
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = token_client.post(
+            '/api/v1/organizers/{}/events/{}/orders/{}/mark_pending/'.format(
+                organizer.slug, event.slug, order.code
+            )
+        )
+    assert resp.status_code == 200
+    with scopes_disabled():
+        assert not SalesRollup.objects.filter(event=event, order_status=Order.STATUS_PAID).exists()
+        assert SalesRollup.objects.filter(event=event, order_status=Order.STATUS_PENDING).exists()
+
+
 @pytest.mark.django_db
 def test_order_mark_canceled_unpaid(token_client, organizer, event, order):
     order.status = Order.STATUS_CANCELED
@@ -1004,6 +1004,8 @@ def test_create_multiple_vouchers(token_client, organizer, event, item):
         assert resp.data[1]['code'] == 'JKLMNOPQR'
         v2 = Voucher.objects.get(code='JKLMNOPQR')
         assert v2.block_quota
+        assert resp.data[1]['id'] == v2.pk
+        assert v2.all_logentries().filter(action_type='pretix.voucher.added').count() == 1
 
 
 @pytest.mark.django_db
@@ -51,7 +51,7 @@ from pretix.base.models import (
 from pretix.base.models.orders import OrderFee
 from pretix.base.services.invoices import (
     build_preview_invoice_pdf, generate_cancellation, generate_invoice,
-    invoice_pdf_task, invoice_qualified, regenerate_invoice,
+    invoice_pdf_batch, invoice_pdf_task, invoice_qualified, regenerate_invoice,
 )
 from pretix.base.services.orders import OrderChangeManager
 
@@ -423,6 +423,23 @@ def test_pdf_generation(env):
     assert invoice_pdf_task(cancellation.pk)
 
 
+@pytest.mark.django_db
+def test_pdf_batch_generation(env, monkeypatch, django_capture_on_commit_callbacks):
+    monkeypatch.setattr('pretix.base.services.invoices.INVOICE_PDF_BATCH_SIZE', 2)
+    event, order = env
+    inv = generate_invoice(order, trigger_pdf=False)
+    cancellation = generate_cancellation(inv, trigger_pdf=False)
+    inv2 = generate_invoice(order, trigger_pdf=False)
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        invoice_pdf_batch(event, [inv.pk, cancellation.pk, inv2.pk])
+    assert len(callbacks) == 2
+    for i in (inv, cancellation, inv2):
+        i.refresh_from_db()
+        assert i.file
+        with i.file.open('rb') as f:
+            assert f.read(5) == b'%PDF-'
+
+
 @pytest.mark.django_db
 def test_pdf_generation_custom_text(env):
     event, order = env
@@ -33,16 +33,29 @@
 # License for the specific language governing permissions and limitations under the License.
 
 import os
+import smtplib
 
 import pytest
 from django.conf import settings
 from django.core import mail as djmail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+from django.test import override_settings
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django_scopes import scope
+from i18nfield.strings import LazyI18nString
 
+from pretix.base.email import get_email_context
 from pretix.base.models import Event, Organizer, User
-from pretix.base.services.mail import mail
+from pretix.base.services.mail import (
+    _connection_pool, _send_messages, convert_image_to_cid, mail,
+)
+from pretix.base.services.placeholders import PlaceholderContext
+from pretix.testutils.mock import mocker_context
 
 
 @pytest.fixture
@@ -163,3 +176,105 @@ def test_sendmail_placeholder(env):
     assert len(djmail.outbox) == 1
     assert djmail.outbox[0].to == [user.email]
     assert djmail.outbox[0].subject == 'Dummy Test subject'
+
+
+@pytest.mark.django_db
+def test_email_context_only_renders_used_placeholders(env):
+    djmail.outbox = []
+    event, user, organizer = env
+    ctx = get_email_context(event=event)
+    assert 'event' in ctx
+    assert 'event_slug' in ctx
+    assert 'url' not in ctx
+    assert not ctx.placeholder_context.cache
+
+    mail('dummy@dummy.dummy', 'Test {event}', LazyI18nString('Hello {event}'), ctx, event)
+    assert djmail.outbox[0].subject == 'Test Dummy'
+    assert djmail.outbox[0].body.startswith('Hello Dummy')
+    assert set(ctx.placeholder_context.cache) == {'event'}
+
+    assert dict(ctx) == PlaceholderContext(event=event).render_all()
+
+
+@pytest.fixture
+def smtp():
+    _connection_pool.close_all()
+    with mocker_context() as mocker:
+        yield mocker.patch('django.core.mail.backends.smtp.smtplib.SMTP')
+    _connection_pool.close_all()
+
+
+def _test_message(i):
+    return EmailMessage('Test subject', 'Test', 'sender@example.org', ['recipient{}@example.org'.format(i)])
+
+
+def test_smtp_connection_reused(smtp):
+    for i in range(3):
+        _send_messages(SMTPEmailBackend(host='localhost', port=25), [_test_message(i)])
+    assert smtp.call_count == 1
+    assert smtp.return_value.sendmail.call_count == 3
+
+    # Another server gets its own connection
+    _send_messages(SMTPEmailBackend(host='otherhost', port=25), [_test_message(4)])
+    assert smtp.call_count == 2
+
+
+@override_settings(MAIL_CONNECTION_MAX_MESSAGES=2)
+def test_smtp_connection_max_messages(smtp):
+    for i in range(3):
+        _send_messages(SMTPEmailBackend(host='localhost', port=25), [_test_message(i)])
+    assert smtp.call_count == 2
+
+
+def test_smtp_connection_reconnect_after_disconnect(smtp):
+    smtp.return_value.sendmail.side_effect = [{}, smtplib.SMTPServerDisconnected(), {}]
+    for i in range(2):
+        _send_messages(SMTPEmailBackend(host='localhost', port=25), [_test_message(i)])
+    assert smtp.call_count == 2
+    assert smtp.return_value.sendmail.call_count == 3
+
+
+def test_smtp_connection_closed_after_error(smtp):
+    smtp.return_value.sendmail.side_effect = [smtplib.SMTPDataError(554, 'Rejected'), {}]
+    with pytest.raises(smtplib.SMTPDataError):
+        _send_messages(SMTPEmailBackend(host='localhost', port=25), [_test_message(0)])
+    _send_messages(SMTPEmailBackend(host='localhost', port=25), [_test_message(1)])
+    assert smtp.call_count == 2
+
+
+@pytest.mark.django_db
+def test_cid_image_from_storage():
+    name = default_storage.save('pub/test_cid_logo.png', ContentFile(b'storagedata'))
+    try:
+        with mocker_context() as mocker:
+            get = mocker.patch('pretix.base.services.mail.requests.get')
+            mime_image = convert_image_to_cid(settings.SITE_URL + settings.MEDIA_URL + name, 'image_0')
+            assert not get.called
+        assert mime_image.get_payload(decode=True) == b'storagedata'
+    finally:
+        default_storage.delete(name)
+
+
+def test_cid_image_private_media_not_from_storage():
+    name = default_storage.save('invoices/test_cid_invoice.png', ContentFile(b'secretdata'))
+    try:
+        with mocker_context() as mocker:
+            get = mocker.patch('pretix.base.services.mail.requests.get')
+            get.return_value.content = b'remotedata'
+            mime_image = convert_image_to_cid(settings.SITE_URL + settings.MEDIA_URL + name, 'image_0')
+            assert get.called
+        assert mime_image.get_payload(decode=True) == b'remotedata'
+    finally:
+        default_storage.delete(name)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+def test_cid_image_download_cached():
+    cache.clear()
+    with mocker_context() as mocker:
+        get = mocker.patch('pretix.base.services.mail.requests.get')
+        get.return_value.content = b'remotedata'
+        for i in range(3):
+            mime_image = convert_image_to_cid('https://cdn.example.org/logo.png', 'image_0')
+            assert mime_image.get_payload(decode=True) == b'remotedata'
+        assert get.call_count == 1
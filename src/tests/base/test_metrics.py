@@ -36,11 +36,14 @@
 # pytest
 
 import base64
+import time
 
 import pytest
+from celery.signals import worker_process_shutdown
 from django.test import override_settings
 
 from pretix.base import metrics
+from pretix.base.models import Organizer
 from pretix.base.views import metrics as metricsview
 
 
@@ -69,7 +72,15 @@ class FakeRedis(object):
         pass
 
 
-@override_settings(HAS_REDIS=True)
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    # Do not leak pending updates between tests
+    metrics._buffer._reset()
+    yield
+    metrics._buffer._reset()
+
+
+@override_settings(HAS_REDIS=True, METRICS_FLUSH_INTERVAL=0)
 def test_counter(monkeypatch):
 
     fake_redis = FakeRedis()
@@ -108,7 +119,7 @@ def test_counter(monkeypatch):
     assert fake_redis.storage[fullname_dimless] == 20
 
 
-@override_settings(HAS_REDIS=True)
+@override_settings(HAS_REDIS=True, METRICS_FLUSH_INTERVAL=0)
 def test_gauge(monkeypatch):
 
     fake_redis = FakeRedis()
@@ -166,7 +177,7 @@ def test_gauge(monkeypatch):
     assert fake_redis.storage[fullname_dimless] == 20
 
 
-@override_settings(HAS_REDIS=True)
+@override_settings(HAS_REDIS=True, METRICS_FLUSH_INTERVAL=0)
 def test_histogram(monkeypatch):
 
     fake_redis = FakeRedis()
@@ -201,6 +212,68 @@ def test_histogram(monkeypatch):
     assert fake_redis.storage['my_histogram_bucket{dimension="two",le="1.0"}'] == 1
 
 
+@override_settings(HAS_REDIS=True, METRICS_FLUSH_INTERVAL=3600)
+def test_buffered_until_flush(monkeypatch):
+    fake_redis = FakeRedis()
+    monkeypatch.setattr(metrics, "redis", fake_redis, raising=False)
+
+    test_counter = metrics.Counter("my_buffered_counter", "this is a helpstring", ["dimension"])
+    test_gauge = metrics.Gauge("my_buffered_gauge", "this is a helpstring")
+    test_counter.inc(dimension="one")
+    test_counter.inc(2, dimension="one")
+    test_gauge.inc(5)
+    test_gauge.set(3)
+    test_gauge.inc(2)
+    assert fake_redis.storage == {}
+
+    metrics._buffer.flush()
+    assert fake_redis.storage['my_buffered_counter{dimension="one"}'] == 3
+    assert fake_redis.storage['my_buffered_gauge'] == 5
+
+    metrics._buffer.flush()
+    assert fake_redis.storage['my_buffered_counter{dimension="one"}'] == 3
+
+
+@override_settings(HAS_REDIS=True, METRICS_FLUSH_INTERVAL=0.05)
+def test_flushed_when_idle(monkeypatch):
+    fake_redis = FakeRedis()
+    monkeypatch.setattr(metrics, "redis", fake_redis, raising=False)
+    metrics._buffer._last_flush = time.monotonic() + 3600
+
+    test_counter = metrics.Counter("my_idle_counter", "this is a helpstring")
+    test_counter.inc()
+    assert fake_redis.storage == {}
+
+    # No further update or scrape happens in this process, the buffer is flushed nevertheless
+    metrics._buffer._last_flush = time.monotonic()
+    deadline = time.monotonic() + 5
+    while not fake_redis.storage and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert fake_redis.storage['my_idle_counter'] == 1
+
+
+@override_settings(HAS_REDIS=True, METRICS_FLUSH_INTERVAL=3600)
+def test_flushed_on_worker_process_shutdown(monkeypatch):
+    fake_redis = FakeRedis()
+    monkeypatch.setattr(metrics, "redis", fake_redis, raising=False)
+
+    test_counter = metrics.Counter("my_worker_counter", "this is a helpstring")
+    test_counter.inc()
+    worker_process_shutdown.send(sender=None, pid=1, exitcode=0)
+    assert fake_redis.storage['my_worker_counter'] == 1
+
+
+@pytest.mark.django_db
+@override_settings(HAS_REDIS=True, METRICS_ENABLED=True)
+def test_model_counts_precomputed(monkeypatch):
+    fake_redis = FakeRedis()
+    monkeypatch.setattr(metrics, "redis", fake_redis, raising=False)
+    Organizer.objects.create(name='Dummy', slug='dummy')
+
+    metrics.update_model_counts(sender=None)
+    assert fake_redis.storage['pretix_model_instances{model="pretixbase.organizer"}'] == 1
+
+
 @pytest.mark.django_db
 @override_settings(HAS_REDIS=True, METRICS_USER="foo", METRICS_PASSPHRASE="bar")
 def test_metrics_view(monkeypatch, client):
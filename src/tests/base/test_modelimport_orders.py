@@ -32,8 +32,8 @@ from django_scopes import scopes_disabled
 from i18nfield.strings import LazyI18nString
 
 from pretix.base.models import (
-    CachedFile, Event, Item, Order, OrderPayment, OrderPosition, Organizer,
-    Question, QuestionAnswer, User,
+    CachedFile, Event, Invoice, Item, Order, OrderPayment, OrderPosition,
+    Organizer, Question, QuestionAnswer, User,
 )
 from pretix.base.services.modelimport import DataImportError, import_orders
 
@@ -229,14 +229,15 @@ def test_import_pending(user, event, item):
 
 @pytest.mark.django_db
 @scopes_disabled()
-def test_import_paid_generate_invoice(user, event, item):
+def test_import_paid_generate_invoice(user, event, item, django_capture_on_commit_callbacks):
     settings = dict(DEFAULT_SETTINGS)
     settings['item'] = 'static:{}'.format(item.pk)
     settings['status'] = 'paid'
     event.settings.invoice_generate = 'paid'
-    import_orders.apply(
-        args=(event.pk, inputfile_factory().id, settings, 'en', user.pk)
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        import_orders.apply(
+            args=(event.pk, inputfile_factory().id, settings, 'en', user.pk)
+        )
     o = event.orders.last()
     assert o.status == Order.STATUS_PAID
     assert o.total == Decimal('23.00')
@@ -244,6 +245,7 @@ def test_import_paid_generate_invoice(user, event, item):
     assert p.provider == 'manual'
     assert p.state == OrderPayment.PAYMENT_STATE_CONFIRMED
     assert o.invoices.count() == 1
+    assert all(i.file for i in Invoice.objects.filter(event=event))
 
 
 @pytest.mark.django_db
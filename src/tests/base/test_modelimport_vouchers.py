@@ -149,6 +149,20 @@ def test_integer_invalid(event, item, user):
     assert 'column "Minimum usages" in line "1": Enter a valid integer.' in str(excinfo.value)
 
 
+@pytest.mark.django_db
+@scopes_disabled()
+def test_errors_reported_for_all_lines(event, item, user):
+    settings = dict(DEFAULT_SETTINGS)
+    settings['min_usages'] = 'csv:A'
+    with pytest.raises(DataImportError) as excinfo:
+        import_vouchers.apply(
+            args=(event.pk, inputfile_factory().id, settings, 'en', user.pk)
+        ).get()
+    assert 'column "Minimum usages" in line "1": Enter a valid integer.' in str(excinfo.value)
+    assert 'column "Minimum usages" in line "2": Enter a valid integer.' in str(excinfo.value)
+    assert not event.vouchers.exists()
+
+
 @pytest.mark.django_db
 @scopes_disabled()
 def test_model_validation(event, item, user):
@@ -2713,6 +2713,14 @@ class SeatingTestCase(TestCase):
         assert not self.seat_a1.is_available()
         assert self.seat_a2.is_available()
 
+    @classscope(attr='organizer')
+    def test_free_by_product(self):
+        assert self.event.free_seats_by_product() == {self.ticket.pk: 2}
+        self.seat_a1.blocked = True
+        self.seat_a1.save()
+        assert self.event.free_seats_by_product() == {self.ticket.pk: 1}
+        assert self.event.free_seats_by_product(sales_channel=None) == {self.ticket.pk: 1}
+
     @classscope(attr='organizer')
     def test_blocked_in_proximity(self):
         o = Order.objects.create(
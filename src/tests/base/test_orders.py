@@ -28,6 +28,8 @@ from zoneinfo import ZoneInfo
 import pytest
 from django.conf import settings
 from django.core import mail as djmail
+from django.core.management import call_command
+from django.db import transaction
 from django.db.models import F, Sum
 from django.test import TestCase
 from django.utils.timezone import make_aware, now
@@ -51,8 +53,8 @@ from pretix.base.secrets import assign_ticket_secret
 from pretix.base.services.invoices import generate_invoice
 from pretix.base.services.orders import (
     OrderChangeManager, OrderError, _create_order, approve_order, cancel_order,
-    deny_order, expire_orders, reactivate_order, send_download_reminders,
-    send_expiry_warnings,
+    deny_order, expire_orders, expire_orders_batch, reactivate_order,
+    send_download_reminders, send_expiry_warnings,
 )
 from pretix.plugins.banktransfer.payment import BankTransfer
 from pretix.testutils.mock import mocker_context
@@ -357,6 +359,63 @@ def test_expiring_paid_invoice(event):
     assert o2.transactions.aggregate(s=Sum(F('price') * F('count')))['s'] == Decimal('12.00')
 
 
+@pytest.mark.django_db
+def test_bulk_create_transactions(event, django_assert_num_queries):
+    ticket = Item.objects.create(event=event, name='Early-bird ticket',
+                                 default_price=Decimal('23.00'), admission=True)
+    for i in range(3):
+        o = Order.objects.create(
+            code='FO{}'.format(i), event=event, email='dummy@dummy.test',
+            status=Order.STATUS_PENDING, locale='en',
+            datetime=now(), expires=now() + timedelta(days=10),
+            total=Decimal('23.00'),
+            sales_channel=event.organizer.sales_channels.get(identifier="web"),
+        )
+        OrderPosition.objects.create(
+            order=o, item=ticket, variation=None,
+            price=Decimal("23.00"), attendee_name_parts={'full_name': "Peter"}, positionid=1
+        )
+        if i == 0:
+            o.create_transactions()
+            OrderPosition.objects.filter(order=o).update(price=Decimal("20.00"))
+
+    orders = list(Order.objects.filter(event=event))
+    with django_assert_num_queries(4):
+        created = Order.bulk_create_transactions(orders)
+    # The changed order gets a reversal and a new transaction, the others one transaction each
+    assert len(created) == 4
+    for o in orders:
+        assert o.transactions.aggregate(s=Sum(F('price') * F('count')))['s'] == o.positions.get().price
+
+    assert Order.bulk_create_transactions(orders) == []
+
+
+@pytest.mark.django_db
+def test_create_order_transactions_command(event):
+    ticket = Item.objects.create(event=event, name='Early-bird ticket',
+                                 default_price=Decimal('23.00'), admission=True)
+    for i, status in enumerate((Order.STATUS_PAID, Order.STATUS_CANCELED)):
+        o = Order.objects.create(
+            code='FO{}'.format(i), event=event, email='dummy@dummy.test',
+            status=status, locale='en',
+            datetime=now() - timedelta(days=5), expires=now() + timedelta(days=10),
+            cancellation_date=now() - timedelta(days=1) if status == Order.STATUS_CANCELED else None,
+            total=Decimal('23.00'),
+            sales_channel=event.organizer.sales_channels.get(identifier="web"),
+        )
+        OrderPosition.objects.create(
+            order=o, item=ticket, variation=None,
+            price=Decimal("23.00"), attendee_name_parts={'full_name': "Peter"}, positionid=1
+        )
+
+    call_command('create_order_transactions', batch_size=1)
+    paid = Order.objects.get(code='FO0')
+    assert paid.transactions.aggregate(s=Sum(F('price') * F('count')))['s'] == Decimal('23.00')
+    canceled = Order.objects.get(code='FO1')
+    assert [(t.count, t.migrated) for t in canceled.transactions.all()] == [(1, True), (-1, True)]
+    call_command('check_order_transactions', batch_size=1)
+
+
 @pytest.mark.django_db
 def test_expire_twice(event):
     o2 = Order.objects.create(
@@ -380,6 +439,83 @@ def test_expire_twice(event):
     assert o2.invoices.count() == 2
 
 
+@pytest.mark.django_db
+def test_expire_in_batches(event, monkeypatch):
+    monkeypatch.setattr('pretix.base.services.orders.EXPIRE_ORDERS_BATCH_SIZE', 2)
+    orders = [
+        Order.objects.create(
+            code='FO{}'.format(i), event=event, email='dummy@dummy.test',
+            status=Order.STATUS_PENDING, locale='en',
+            datetime=now(), expires=now() - timedelta(days=10),
+            total=12,
+            sales_channel=event.organizer.sales_channels.get(identifier="web"),
+        ) for i in range(5)
+    ]
+    with mocker_context() as mocker:
+        batch = mocker.patch('pretix.base.services.orders.expire_orders_batch.apply_async',
+                             wraps=expire_orders_batch.apply_async)
+        expire_orders(None)
+    assert batch.call_count == 3
+    for o in orders:
+        o.refresh_from_db()
+        assert o.status == Order.STATUS_EXPIRED
+        assert o.all_logentries().filter(action_type='pretix.event.order.expired').count() == 1
+
+    # An outdated batch from an earlier run does not expire the order a second time
+    orders[0].status = Order.STATUS_PAID
+    orders[0].save()
+    expire_orders_batch.apply(args=(event.pk, [orders[0].pk]))
+    orders[0].refresh_from_db()
+    assert orders[0].status == Order.STATUS_PAID
+
+
+@pytest.mark.django_db
+def test_expire_only_queues_due_orders(event):
+    event.settings.set('payment_term_expire_delay_days', 3)
+    event.settings.set('payment_term_weekdays', False)
+    due = Order.objects.create(
+        code='FO1', event=event, email='dummy@dummy.test',
+        status=Order.STATUS_PENDING, locale='en',
+        datetime=now(), expires=now() - timedelta(days=10),
+        total=12,
+        sales_channel=event.organizer.sales_channels.get(identifier="web"),
+    )
+    Order.objects.create(
+        code='FO2', event=event, email='dummy@dummy.test',
+        status=Order.STATUS_PENDING, locale='en',
+        datetime=now(), expires=now() - timedelta(hours=1),
+        total=12,
+        sales_channel=event.organizer.sales_channels.get(identifier="web"),
+    )
+    with mocker_context() as mocker:
+        batch = mocker.patch('pretix.base.services.orders.expire_orders_batch.apply_async')
+        expire_orders(None)
+    batch.assert_called_once_with(args=(event.pk, [due.pk]))
+
+
+@pytest.mark.django_db
+def test_expire_signal_sent_after_commit(event):
+    o = Order.objects.create(
+        code='FO1', event=event, email='dummy@dummy.test',
+        status=Order.STATUS_PENDING, locale='en',
+        datetime=now(), expires=now() - timedelta(days=10),
+        total=12,
+        sales_channel=event.organizer.sales_channels.get(identifier="web"),
+    )
+    connection = transaction.get_connection()
+    savepoints = len(connection.savepoint_ids)
+    received = []
+
+    def send(sender, order, **kwargs):
+        # No transaction of the batch is open anymore, so the order is no longer locked
+        received.append((order.pk, len(connection.savepoint_ids)))
+
+    with mocker_context() as mocker:
+        mocker.patch('pretix.base.services.orders.order_expired.send', side_effect=send)
+        expire_orders_batch.apply(args=(event.pk, [o.pk]))
+    assert received == [(o.pk, savepoints)]
+
+
 @pytest.mark.django_db
 def test_expire_skipped_if_canceled_with_fee(event):
     o2 = Order.objects.create(
@@ -24,6 +24,7 @@ from datetime import timedelta
 from decimal import Decimal
 
 import pytest
+from django.test import override_settings
 from django.utils.timezone import now
 from django_scopes import scopes_disabled
 
@@ -1409,3 +1410,67 @@ def test_multiple_discounts_with_same_condition(event, item, item2, item3):
 
     new_prices = [p for p, d in apply_discounts(event, 'web', positions)]
     assert sorted(new_prices) == sorted(expected)
+
+
+@pytest.mark.django_db
+@scopes_disabled()
+def test_compiled_discounts_cached_and_invalidated(event, item, item2, django_assert_num_queries):
+    with override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'compiled-discounts',
+        }
+    }):
+        event = Event.objects.get(pk=event.pk)  # bind event.cache to the overridden cache backend
+        d1 = Discount.objects.create(
+            event=event,
+            condition_min_count=2,
+            condition_all_products=False,
+            benefit_discount_matching_percent=50,
+        )
+        d1.condition_limit_products.add(item)
+
+        positions = (
+            (item.pk, None, Decimal('100.00'), False, False, Decimal('0.00')),
+            (item.pk, None, Decimal('100.00'), False, False, Decimal('0.00')),
+            (item2.pk, None, Decimal('100.00'), False, False, Decimal('0.00')),
+            (item2.pk, None, Decimal('100.00'), False, False, Decimal('0.00')),
+        )
+        assert [p for p, d in apply_discounts(event, 'web', positions)] == [
+            Decimal('50.00'), Decimal('50.00'), Decimal('100.00'), Decimal('100.00')
+        ]
+
+        with django_assert_num_queries(0):
+            result = apply_discounts(event, 'web', positions)
+        assert [p for p, d in result] == [
+            Decimal('50.00'), Decimal('50.00'), Decimal('100.00'), Decimal('100.00')
+        ]
+        assert result[0][1] == d1
+
+        d1.condition_limit_products.add(item2)
+        assert [p for p, d in apply_discounts(event, 'web', positions)] == [
+            Decimal('50.00'), Decimal('50.00'), Decimal('50.00'), Decimal('50.00')
+        ]
+
+        # Changes from the organizer-level side of the relation
+        web = event.organizer.sales_channels.get(identifier='web')
+        other = event.organizer.sales_channels.create(identifier='other', label='Other', type='api')
+        d1.all_sales_channels = False
+        d1.save()
+        d1.limit_sales_channels.set([web])
+        assert apply_discounts(event, 'web', positions)[0][1] == d1
+        web.discount_set.remove(d1)
+        other.discount_set.add(d1)
+        assert [p for p, d in apply_discounts(event, 'web', positions)] == [
+            Decimal('100.00'), Decimal('100.00'), Decimal('100.00'), Decimal('100.00')
+        ]
+        web.discount_set.add(d1)
+        assert apply_discounts(event, 'web', positions)[0][1] == d1
+        web.discount_set.clear()
+        assert apply_discounts(event, 'web', positions)[0][1] is None
+
+        d1.available_until = now() - timedelta(hours=1)
+        d1.save()
+        assert [p for p, d in apply_discounts(event, 'web', positions)] == [
+            Decimal('100.00'), Decimal('100.00'), Decimal('100.00'), Decimal('100.00')
+        ]
@@ -20,10 +20,40 @@
 # <https://www.gnu.org/licenses/>.
 #
 import pytest
+from django.core.management import call_command
+from django.dispatch import receiver
+from django.test import override_settings
 
+from pretix.base.services.periodic import dispatch_periodic_receiver
 from pretix.base.signals import periodic_task
 
 
 @pytest.mark.django_db
 def test_all_periodic_tasks():
     periodic_task.send(sender=None)
+
+
+@pytest.mark.django_db
+def test_dispatch_periodic_tasks():
+    call_command('runperiodic', dispatch=True)
+
+
+@pytest.mark.django_db
+def test_dispatch_skipped_while_running():
+    calls = []
+
+    @receiver(periodic_task, dispatch_uid="test_dispatch_skipped_while_running")
+    def slow_task(sender, **kwargs):
+        calls.append(True)
+        # Simulate a cron tick while this receiver is still running
+        assert not dispatch_periodic_receiver(slow_task)
+
+    try:
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            assert dispatch_periodic_receiver(slow_task)
+            assert len(calls) == 1
+            # The lock is released once the run has finished
+            assert dispatch_periodic_receiver(slow_task)
+            assert len(calls) == 2
+    finally:
+        periodic_task.disconnect(dispatch_uid="test_dispatch_skipped_while_running")
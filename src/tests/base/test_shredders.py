@@ -23,6 +23,8 @@ import json
 import os
 from datetime import timedelta
 from decimal import Decimal
+from unittest import mock
+from zipfile import ZipFile
 
 import pytest
 from django.core.files.base import ContentFile
@@ -30,16 +32,17 @@ from django.utils.timezone import now
 from django_scopes import scope
 
 from pretix.base.models import (
-    CachedCombinedTicket, CachedTicket, Event, InvoiceAddress, Order,
-    OrderPayment, OrderPosition, Organizer, QuestionAnswer,
+    CachedCombinedTicket, CachedFile, CachedTicket, Event, InvoiceAddress,
+    Order, OrderPayment, OrderPosition, Organizer, QuestionAnswer,
 )
 from pretix.base.services.invoices import generate_invoice, invoice_pdf_task
+from pretix.base.services.shredder import export, shred
 from pretix.base.services.tickets import generate
 from pretix.base.shredder import (
     AttendeeInfoShredder, CachedTicketShredder, EmailAddressShredder,
     InvoiceAddressShredder, InvoiceShredder, PaymentInfoShredder,
-    QuestionAnswerShredder, WaitingListShredder, shred_constraints,
-    shred_log_fields,
+    PhoneNumberShredder, QuestionAnswerShredder, WaitingListShredder,
+    chunked_iterator, shred_constraints, shred_log_fields,
 )
 
 
@@ -494,3 +497,47 @@ def test_shred_log_fields_whitelist(event):
         "bool": "█",
         "int": 0,
     }
+
+
+@pytest.mark.django_db
+def test_chunked_iterator_with_modified_rows(event, order):
+    for i in range(4):
+        Order.objects.create(
+            code='FOO{}'.format(i), event=event, email='dummy@dummy.test',
+            status=Order.STATUS_PENDING,
+            datetime=now(), expires=now() + timedelta(days=10),
+            sales_channel=event.organizer.sales_channels.get(identifier="web"),
+            total=14, locale='en'
+        )
+    seen = []
+    for chunk in chunked_iterator(event.orders.filter(email__isnull=False), chunk_size=2):
+        assert len(chunk) <= 2
+        seen += [o.pk for o in chunk]
+        Order.objects.filter(pk__in=[o.pk for o in chunk]).update(email=None)
+    assert seen == sorted(event.orders.values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+def test_shred_resumes_after_interruption(event, order):
+    order.phone = '+4930123456'
+    order.save()
+    cfid = export.apply(args=(event.pk, ['order_emails', 'phone_numbers'])).get()
+    with ZipFile(CachedFile.objects.get(pk=cfid).file.file, 'r') as zipfile:
+        indexdata = json.loads(zipfile.read('index.json').decode())
+
+    with mock.patch.object(PhoneNumberShredder, 'shred_data', side_effect=OSError('Worker lost')):
+        with pytest.raises(OSError):
+            shred.apply(args=(event.pk, cfid, indexdata['confirm_code']), throw=True).get()
+    order.refresh_from_db()
+    assert order.email is None
+    assert order.phone == '+4930123456'
+    assert CachedFile.objects.filter(pk=cfid).exists()
+
+    with mock.patch.object(EmailAddressShredder, 'shred_data') as email_shred:
+        shred.apply(args=(event.pk, cfid, indexdata['confirm_code']), throw=True).get()
+    assert not email_shred.called
+    order.refresh_from_db()
+    assert order.phone is None
+    assert not CachedFile.objects.filter(pk=cfid).exists()
+    assert event.logentry_set.filter(action_type='pretix.event.shredder.step.completed').count() == 2
+    assert event.logentry_set.filter(action_type='pretix.event.shredder.completed').count() == 1
@@ -0,0 +1,234 @@
+#
+# This file is part of pretix (Community Edition).
+#
+# Copyright (C) 2014-2020 Raphael Michel and contributors
+# Copyright (C) 2020-2021 rami.io GmbH and contributors
+#
+# This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation in version 3 of the License.
+#
+# ADDITIONAL TERMS APPLY: Pursuant to Section 7 of the GNU Affero General Public License, additional terms are
+# applicable granting you additional permissions and placing additional restrictions on your usage of this software.
+# Please refer to the pretix LICENSE file to obtain the full terms applicable to this work. If you did not receive
+# this file, see <https://pretix.eu/about/en/license>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
+# <https://www.gnu.org/licenses/>.
+#
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.utils.timezone import make_aware, now
+from django_scopes import scope
+
+from pretix.base.models import (
+    Event, Item, Order, OrderPayment, OrderPosition, Organizer, SalesRollup,
+    TransactionRollup,
+)
+from pretix.base.services import stats
+from pretix.base.services.orders import cancel_order, extend_order
+from pretix.base.services.stats import (
+    order_overview, rebuild_sales_rollups, reconcile_sales_rollups,
+    rollup_transactions,
+)
+from pretix.plugins.reports.accountingreport import ReportExporter
+
+
+@pytest.fixture(scope='function')
+def event():
+    o = Organizer.objects.create(name='Dummy', slug='dummy')
+    event = Event.objects.create(
+        organizer=o, name='Dummy', slug='dummy',
+        date_from=now(),
+    )
+    with scope(organizer=o):
+        yield event
+
+
+@pytest.fixture
+def orders(event):
+    ticket = Item.objects.create(event=event, name='Ticket', default_price=Decimal('23.00'), admission=True)
+    shirt = Item.objects.create(event=event, name='Shirt', default_price=Decimal('12.00'))
+    size = shirt.variations.create(value='M')
+    result = []
+    for i, (status, dt) in enumerate([
+        (Order.STATUS_PAID, make_aware(datetime(2024, 3, 1, 12, 0))),
+        (Order.STATUS_PAID, make_aware(datetime(2024, 3, 2, 12, 0))),
+        (Order.STATUS_PENDING, make_aware(datetime(2024, 3, 2, 13, 0))),
+        (Order.STATUS_EXPIRED, make_aware(datetime(2024, 3, 3, 12, 0))),
+    ]):
+        o = Order.objects.create(
+            code='FOO{}'.format(i), event=event, email='dummy@dummy.test',
+            status=status, locale='en', datetime=dt, expires=dt + timedelta(days=10),
+            total=Decimal('35.00'),
+            sales_channel=event.organizer.sales_channels.get(identifier="web"),
+        )
+        OrderPosition.objects.create(
+            order=o, item=ticket, price=Decimal('23.00'), tax_value=Decimal('3.00'), positionid=1,
+        )
+        OrderPosition.objects.create(
+            order=o, item=shirt, variation=size, price=Decimal('12.00'), positionid=2,
+        )
+        if status == Order.STATUS_PAID:
+            o.payments.create(
+                amount=o.total, provider='manual', state=OrderPayment.PAYMENT_STATE_CONFIRMED,
+                payment_date=dt + timedelta(days=1),
+            )
+        result.append(o)
+    return result
+
+
+def _flatten(overview):
+    items_by_category, total = overview
+    return (
+        [(str(i), i.num) for c, items in items_by_category for i in items],
+        total
+    )
+
+
+@pytest.mark.django_db
+def test_rollups_match_scan(event, orders):
+    rebuild_sales_rollups(event)
+    assert SalesRollup.objects.filter(event=event).count() == 8
+
+    for kwargs in (
+        {},
+        {'admission_only': True},
+        {'date_filter': 'order_date', 'date_from': datetime(2024, 3, 2).date(),
+         'date_until': datetime(2024, 3, 2).date()},
+        {'date_filter': 'last_payment_date', 'date_from': datetime(2024, 3, 3).date()},
+    ):
+        assert _flatten(order_overview(event, use_rollups=True, **kwargs)) == _flatten(order_overview(event, **kwargs))
+
+
+@pytest.mark.django_db
+def test_rollups_updated_on_state_change(event, orders, django_capture_on_commit_callbacks):
+    rebuild_sales_rollups(event)
+    with django_capture_on_commit_callbacks(execute=True):
+        cancel_order(orders[2].pk)
+
+    assert _flatten(order_overview(event, use_rollups=True)) == _flatten(order_overview(event))
+    assert SalesRollup.objects.filter(
+        event=event, order_status=Order.STATUS_CANCELED
+    ).count() == 2
+
+
+@pytest.mark.django_db
+def test_rollups_updated_on_extend(event, orders, django_capture_on_commit_callbacks):
+    rebuild_sales_rollups(event)
+    # Extending an expired order makes it pending again without sending any order signal
+    with django_capture_on_commit_callbacks(execute=True):
+        extend_order(orders[3], new_date=now() + timedelta(days=3), force=True)
+
+    assert _flatten(order_overview(event, use_rollups=True)) == _flatten(order_overview(event))
+    assert not SalesRollup.objects.filter(event=event, order_status=Order.STATUS_EXPIRED).exists()
+
+
+@pytest.mark.django_db
+def test_rollups_not_refreshed_without_state_change(event, orders, django_capture_on_commit_callbacks):
+    rebuild_sales_rollups(event)
+    with mock.patch('pretix.base.services.stats.refresh_sales_rollups.apply_async') as apply_async:
+        with django_capture_on_commit_callbacks(execute=True):
+            orders[0].email = 'other@dummy.test'
+            orders[0].save()
+        assert not apply_async.called
+
+
+@pytest.mark.django_db
+def test_rollups_reconciled_periodically(event, orders, django_capture_on_commit_callbacks):
+    rebuild_sales_rollups(event)
+    # Bulk updates bypass Order.save() and all signals
+    Order.objects.filter(pk=orders[2].pk).update(status=Order.STATUS_EXPIRED, last_modified=now())
+    reconcile_sales_rollups(None)
+
+    assert _flatten(order_overview(event, use_rollups=True)) == _flatten(order_overview(event))
+    assert SalesRollup.objects.filter(event=event, order_status=Order.STATUS_EXPIRED).count() == 4
+
+
+@pytest.mark.django_db
+def test_rollups_concurrent_refresh(event, orders):
+    rebuild_sales_rollups(event)
+    lock = stats._lock_event_rollups
+
+    def lock_after_other_refresh(ev):
+        # Another refresh for the same day commits a newer state while we are waiting for the lock
+        with mock.patch('pretix.base.services.stats._lock_event_rollups', lock):
+            Order.objects.filter(pk=orders[2].pk).update(status=Order.STATUS_EXPIRED)
+            rebuild_sales_rollups(event, orders[2].datetime.date())
+        lock(ev)
+
+    with mock.patch('pretix.base.services.stats._lock_event_rollups', side_effect=lock_after_other_refresh):
+        rebuild_sales_rollups(event, orders[2].datetime.date())
+
+    assert SalesRollup.objects.filter(event=event).count() == 8
+    assert _flatten(order_overview(event, use_rollups=True)) == _flatten(order_overview(event))
+
+
+@pytest.mark.django_db
+def test_rollups_not_used_before_rebuild(event, orders):
+    assert not SalesRollup.objects.filter(event=event).exists()
+    # The overview triggers a rebuild in the background and falls back to scanning order positions
+    items_by_category, total = order_overview(event, use_rollups=True)
+    assert total['num']['paid'] == (4, Decimal('70.00'), Decimal('70.00'))
+
+
+def _report_rows(event, form_data):
+    exporter = ReportExporter(event, event.organizer)
+    return (
+        [
+            (r['item_id'], r['variation_id'], r['price'], r['sum_cont'], r['sum_price'], r['sum_tax'])
+            for r in exporter._transaction_rows(form_data, 'EUR')
+        ],
+        exporter._transaction_total(form_data, 'EUR', None, None),
+    )
+
+
+@pytest.mark.django_db
+def test_accounting_report_transaction_rollups(event, orders):
+    for o in orders:
+        o.create_transactions(is_new=True, dt_now=o.datetime)
+    # A change that happens today is not rolled up yet
+    p = orders[0].positions.first()
+    p.canceled = True
+    p.save()
+    orders[0].create_transactions()
+
+    form_data = {'date_range': '2024-03-02/', 'no_testmode': True, 'split_subevents': False}
+    live = _report_rows(event, form_data)
+    live_all = _report_rows(event, dict(form_data, date_range=None))
+
+    rollup_transactions(event)
+    assert TransactionRollup.objects.filter(event=event).count() == 4
+    exporter = ReportExporter(event, event.organizer)
+    assert exporter._transaction_sources(form_data, 'EUR', None, None)[1] is not None
+    assert _report_rows(event, form_data) == live
+    assert _report_rows(event, dict(form_data, date_range=None)) == live_all
+    assert exporter.render(form_data)[1] == 'application/pdf'
+
+    # Test mode orders are not rolled up
+    exporter = ReportExporter(event, event.organizer)
+    assert exporter._transaction_sources(dict(form_data, no_testmode=False), 'EUR', None, None)[1] is None
+
+
+@pytest.mark.django_db
+def test_transaction_rollups_concurrent_runs(event, orders):
+    for o in orders:
+        o.create_transactions(is_new=True, dt_now=o.datetime)
+    lock = stats._lock_event_rollups
+
+    def lock_after_other_run(ev):
+        # Another run commits its rollups while we are waiting for the lock
+        with mock.patch('pretix.base.services.stats._lock_event_rollups', lock):
+            rollup_transactions(event)
+        lock(ev)
+
+    with mock.patch('pretix.base.services.stats._lock_event_rollups', side_effect=lock_after_other_run):
+        rollup_transactions(event)
+
+    assert TransactionRollup.objects.filter(event=event).count() == 4
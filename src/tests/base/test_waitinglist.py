@@ -20,6 +20,7 @@
 # <https://www.gnu.org/licenses/>.
 #
 from datetime import timedelta
+from unittest import mock
 
 from django.core import mail as djmail
 from django.test import TestCase
@@ -31,6 +32,7 @@ from pretix.base.models import (
 )
 from pretix.base.models.waitinglist import WaitingListException
 from pretix.base.reldate import RelativeDate, RelativeDateWrapper
+from pretix.base.services.locking import lock_objects
 from pretix.base.services.waitinglist import (
     assign_automatically, process_waitinglist,
 )
@@ -153,6 +155,27 @@ class WaitingListTestCase(TestCase):
                 'foo7@bar.com', 'foo8@bar.com', 'foo9@bar.com'
             ]
 
+    def test_send_auto_logs_and_mails(self):
+        with scope(organizer=self.o):
+            self.quota.items.add(self.item1)
+            self.quota.size = 3
+            self.quota.save()
+            for i in range(5):
+                WaitingListEntry.objects.create(
+                    event=self.event, item=self.item1, email='bar{}@bar.com'.format(i)
+                )
+            djmail.outbox = []
+
+        assert assign_automatically.apply(args=(self.event.pk,)).get() == 3
+        with scope(organizer=self.o):
+            assert self.quota.availability(count_waitinglist=False) == (Quota.AVAILABILITY_ORDERED, 0)
+            for wle in WaitingListEntry.objects.filter(voucher__isnull=False):
+                assert wle.voucher.code.isupper()
+                assert wle.email in wle.voucher.comment
+                assert wle.all_logentries().filter(action_type='pretix.event.orders.waitinglist.voucher_assigned').exists()
+                assert wle.voucher.all_logentries().get().parsed_data['waitinglistentry'] == wle.pk
+            assert sorted(m.to[0] for m in djmail.outbox) == ['bar0@bar.com', 'bar1@bar.com', 'bar2@bar.com']
+
     def test_send_auto_respect_priority(self):
         with scope(organizer=self.o):
             self.quota.variations.add(self.var1)
@@ -214,6 +237,29 @@ class WaitingListTestCase(TestCase):
             assign_automatically.apply(args=(self.event.pk,))
             assert Voucher.objects.count() == 1
 
+    def test_send_auto_seat_taken_before_lock(self):
+        with scope(organizer=self.o):
+            self.quota.items.add(self.item1)
+            self.quota.size = 10
+            self.quota.save()
+            self.event.seat_category_mappings.create(
+                layout_category='Stalls', product=self.item1
+            )
+            seat = self.event.seats.create(seat_number="Foo", product=self.item1, seat_guid="Foo", blocked=False)
+            WaitingListEntry.objects.create(
+                event=self.event, item=self.item1, email='foo@bar.com'
+            )
+
+            def sell_seat_then_lock(*args, **kwargs):
+                # The last free seat is sold while the waiting list waits for the lock
+                seat.blocked = True
+                seat.save()
+                return lock_objects(*args, **kwargs)
+
+            with mock.patch('pretix.base.services.waitinglist.lock_objects', side_effect=sell_seat_then_lock):
+                assign_automatically.apply(args=(self.event.pk,))
+            assert Voucher.objects.count() == 0
+
     def test_send_periodic_event_over(self):
         self.event.settings.set('waiting_list_enabled', True)
         self.event.settings.set('waiting_list_auto', True)
@@ -39,6 +39,7 @@ from unittest import mock
 import pytest
 from bs4 import BeautifulSoup
 from django.core import mail
+from django.test import override_settings
 from django.utils.timezone import now
 from django_countries.fields import Country
 from django_scopes import scopes_disabled
@@ -2524,3 +2525,19 @@ def test_approve_cancellation_request(client, env):
     doc = BeautifulSoup(response.content.decode(), "lxml")
     assert doc.select('input[name=refund-new-giftcard]')[0]['value'] == '10.00'
     assert not env[2].cancellation_requests.exists()
+
+
+@pytest.mark.django_db
+def test_async_status_check_does_not_block(client, env):
+    client.login(email='dummy@dummy.dummy', password='dummy')
+    with mock.patch('pretix.base.views.tasks.AsyncResult') as async_result, override_settings(HAS_CELERY=True):
+        res = async_result.return_value
+        res.id = 'abc'
+        res.ready.return_value = False
+        res.state = 'PENDING'
+        res.info = None
+        response = client.get('/control/event/dummy/dummy/cancel/?async_id=abc&ajax=1')
+    assert response.status_code == 200
+    assert response.json()['ready'] is False
+    assert not res.get.called
+    assert not res.wait.called
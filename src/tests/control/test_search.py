@@ -22,13 +22,19 @@
 import datetime
 from decimal import Decimal
 
+from django.core.cache import cache
+from django.test import override_settings
 from django.utils.timezone import now
 from django_scopes import scopes_disabled
 from tests.base import SoupTest
 
 from pretix.base.models import (
-    Event, InvoiceAddress, Item, Order, OrderPayment, OrderPosition, Organizer,
-    Team, User,
+    Event, InvoiceAddress, Item, Order, OrderPayment, OrderPosition,
+    OrderSearchDocument, Organizer, Team, User,
+)
+from pretix.base.services.ordersearch import (
+    backfill_search_documents, search_documents_complete,
+    update_search_documents,
 )
 
 
@@ -173,6 +179,72 @@ class OrderSearchTest(SoupTest):
         assert '30C3-FO1' not in resp
 
 
+class OrderSearchDocumentTest(OrderSearchTest):
+    """
+    Runs the same tests as above, but with all orders indexed, i.e. without falling back to searching the
+    individual tables.
+    """
+    @scopes_disabled()
+    def setUp(self):
+        super().setUp()
+        update_search_documents(Order.objects.values_list('pk', flat=True))
+        assert not Order.objects.filter(search_document__isnull=True).exists()
+
+    def test_partially_indexed(self):
+        self.team.all_events = True
+        self.team.save()
+        with scopes_disabled():
+            OrderSearchDocument.objects.filter(order__code='FO2').delete()
+            # Indexed orders are only matched by their document, even if it is outdated
+            Order.objects.filter(code='FO1A').update(email='stale@dummy.test')
+        resp = self.client.get('/control/search/orders/?query=dummy2@dummy').content.decode()
+        assert 'FO2' in resp
+        resp = self.client.get('/control/search/orders/?query=dummy1@dummy').content.decode()
+        assert 'FO1' in resp
+        resp = self.client.get('/control/search/orders/?query=stale@dummy').content.decode()
+        assert 'FO1' not in resp
+
+    def test_filter_secret_prefix(self):
+        with scopes_disabled():
+            secret = OrderPosition.objects.get(order__code='FO1A').secret
+        resp = self.client.get('/control/search/orders/?query=' + secret[:5].upper()).content.decode()
+        assert 'FO1' in resp
+        # Secrets are not matched in the middle, short queries would otherwise hit random tickets
+        resp = self.client.get('/control/search/orders/?query=' + secret[5:9]).content.decode()
+        assert 'FO1' not in resp
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_no_fallback_after_backfill(self):
+        cache.clear()
+        backfill_search_documents(None)
+        assert search_documents_complete()
+        with scopes_disabled():
+            OrderSearchDocument.objects.filter(order__code='FO1A').delete()
+        resp = self.client.get('/control/search/orders/?query=dummy1@dummy').content.decode()
+        assert 'FO1' not in resp
+
+        # The next run of the backfill notices the missing document
+        cache.delete('pretix_periodic_pretix.base.services.ordersearch.backfill_search_documents_result')
+        backfill_search_documents(None)
+        assert not search_documents_complete()
+        resp = self.client.get('/control/search/orders/?query=dummy1@dummy').content.decode()
+        assert 'FO1' in resp
+
+    @scopes_disabled()
+    def test_document_updated_on_commit(self):
+        o = Order.objects.get(code='FO1A')
+        with self.captureOnCommitCallbacks(execute=True):
+            p = o.positions.first()
+            p.attendee_email = 'changed@example.org'
+            p.save(update_fields=['attendee_email'])
+            o.email = 'changed@example.com'
+            o.save()
+        text = OrderSearchDocument.objects.get(order=o).text
+        assert 'changed@example.org' in text
+        assert 'changed@example.com' in text
+        assert 'att@att.com' not in text
+
+
 class PaymentSearchTest(SoupTest):
     @scopes_disabled()
     def setUp(self):
@@ -39,16 +39,21 @@ import pytest
 from bs4 import BeautifulSoup
 from django.core import mail as djmail
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 from django_scopes import scopes_disabled
 
 from pretix.base.models import (
-    Event, Item, Order, OrderFee, OrderPayment, OrderPosition, OrderRefund,
-    Organizer, Quota, Team, User,
+    Event, Invoice, Item, Order, OrderFee, OrderPayment, OrderPosition,
+    OrderRefund, Organizer, Quota, Team, User,
 )
 from pretix.base.services.invoices import generate_invoice
 from pretix.plugins.banktransfer.models import BankImportJob, BankTransaction
-from pretix.plugins.banktransfer.tasks import process_banktransfers
+from pretix.plugins.banktransfer.tasks import (
+    OrderMatcher, _get_unknown_transactions, _invoice_no_candidates,
+    process_banktransfers,
+)
 
 
 @pytest.fixture
@@ -284,6 +289,58 @@ def test_invoice_id_missing_zeros(env, job):
     assert env[2].status == Order.STATUS_PAID
 
 
+@pytest.mark.django_db
+def test_invoice_lookup_only_loads_referenced_numbers(env, job):
+    with scopes_disabled():
+        matcher = OrderMatcher([('INV', '2')], event=env[0])
+        assert matcher.invoices == {('INV', '2'): env[3].pk}
+        assert matcher.find_orders([('INV', '2')]) == [env[3]]
+
+
+@pytest.mark.django_db
+def test_invoice_lookup_in_chunks(env, job, monkeypatch):
+    monkeypatch.setattr(OrderMatcher, 'chunk_size', 2)
+    matches = [('INV', '2'), ('INV', '002'), ('INV', '7'), ('INV', '8'), ('INV', '9')]
+    with scopes_disabled():
+        with CaptureQueriesContext(connection) as ctx:
+            matcher = OrderMatcher(matches, event=env[0])
+        # One query for the lengths of invoice numbers, then one per chunk
+        assert len([q for q in ctx.captured_queries if 'pretixbase_invoice' in q['sql']]) == 4
+        assert _invoice_no_candidates('2', sorted({len(i.invoice_no) for i in Invoice.objects.all()})) == ['002']
+        # Finding the same invoice in two chunks does not make it ambiguous
+        assert matcher.find_orders([('INV', '002')]) == [env[3]]
+        assert matcher.find_orders([('INV', '9')]) == []
+
+
+@pytest.mark.django_db
+def test_multiple_lines_matched_in_one_job(env, job):
+    process_banktransfers(job, [{
+        'payer': 'Karla Kundin',
+        'reference': 'Bestellung INV-002',
+        'amount': '23.00',
+        'date': '2016-01-26',
+    }, {
+        'payer': 'Karla Kundin',
+        'reference': 'Bestellung DUMMY12345',
+        'amount': '23.00',
+        'date': '2016-01-27',
+    }, {
+        'payer': 'Karla Kundin',
+        'reference': 'Bestellung INV-009',
+        'amount': '23.00',
+        'date': '2016-01-28',
+    }])
+    env[2].refresh_from_db()
+    assert env[2].status == Order.STATUS_PAID
+    with scopes_disabled():
+        states = list(BankTransaction.objects.order_by('date').values_list('state', 'order__code'))
+    assert states == [
+        (BankTransaction.STATE_ERROR, '6789Z'),
+        (BankTransaction.STATE_VALID, '1Z3AS'),
+        (BankTransaction.STATE_NOMATCH, None),
+    ]
+
+
 @pytest.mark.django_db
 def test_random_spaces(env, job):
     process_banktransfers(job, [{
@@ -792,6 +849,23 @@ def test_ignore_by_external_id(env, job):
         assert BankTransaction.objects.count() == 2
 
 
+@pytest.mark.django_db
+def test_unknown_transactions_chunked(env, job):
+    rows = [{
+        'payer': 'Karla Kundin',
+        'reference': 'Unrelated transfer %d' % i,
+        'date': '2016-01-26',
+        'amount': '%d.00' % i,
+    } for i in range(7)]
+    with scopes_disabled():
+        job = BankImportJob.objects.get(pk=job)
+        _get_unknown_transactions(job, rows[2:4], event=env[0], chunk_size=3)
+        transactions = _get_unknown_transactions(job, rows, event=env[0], chunk_size=3)
+        assert sorted(t.amount for t in transactions) == [0, 1, 4, 5, 6]
+        assert all(t.pk for t in transactions)
+        assert BankTransaction.objects.count() == 7
+
+
 @pytest.mark.django_db
 def test_ambigious_date_without_region(env, job):
     process_banktransfers(job, [{
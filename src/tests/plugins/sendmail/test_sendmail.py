@@ -34,6 +34,7 @@
 # License for the specific language governing permissions and limitations under the License.
 
 import datetime
+from unittest import mock
 
 import pytest
 from django.core import mail as djmail
@@ -41,6 +42,7 @@ from django.utils.timezone import now
 from django_scopes import scopes_disabled
 
 from pretix.base.models import Checkin, Item, Order, OrderPosition, Team, User
+from pretix.plugins.sendmail.tasks import send_mails_to_orders
 
 
 @pytest.fixture
@@ -208,6 +210,86 @@ def test_sendmail_multi_locales(logged_in_client, sendmail_url, event, item):
     assert 'Test nachricht' in response.rendered_content
 
 
+@pytest.mark.django_db
+def test_sendmail_in_chunks(logged_in_client, sendmail_url, event, item, monkeypatch):
+    monkeypatch.setattr('pretix.plugins.sendmail.tasks.SEND_MAILS_CHUNK_SIZE', 2)
+    djmail.outbox = []
+    event.settings.set('locales', ['en', 'de'])
+    event.settings.attendee_emails_asked = True
+
+    with scopes_disabled():
+        orders = []
+        for i in range(5):
+            o = Order.objects.create(event=event, status=Order.STATUS_PAID,
+                                     expires=now() + datetime.timedelta(hours=1),
+                                     total=13, code='DUMMY{}'.format(i), email='dummy{}@dummy.test'.format(i),
+                                     datetime=now(),
+                                     sales_channel=event.organizer.sales_channels.get(identifier="web"),
+                                     locale='de' if i % 2 else 'en')
+            OrderPosition.objects.create(order=o, item=item, price=13, attendee_email='attendee{}@dummy.test'.format(i))
+            orders.append(o)
+
+    response = logged_in_client.post(sendmail_url + 'orders/',
+                                     {'sendto': 'p',
+                                      'action': 'send',
+                                      'recipients': 'both',
+                                      'items': item.pk,
+                                      'subject_0': 'Test subject',
+                                      'message_0': 'Test message',
+                                      'subject_1': 'Benutzer',
+                                      'message_1': 'Test nachricht',
+                                      },
+                                     follow=True)
+    assert response.status_code == 200
+    assert len(djmail.outbox) == 10
+    assert sorted(m.to[0] for m in djmail.outbox if m.subject == 'Benutzer') == [
+        'attendee1@dummy.test', 'attendee3@dummy.test', 'dummy1@dummy.test', 'dummy3@dummy.test',
+    ]
+
+    with scopes_disabled():
+        for o in orders:
+            assert o.all_logentries().filter(action_type='pretix.plugins.sendmail.order.email.sent').count() == 1
+            assert o.all_logentries().filter(
+                action_type='pretix.plugins.sendmail.order.email.sent.attendee'
+            ).get().parsed_data['recipient'] == o.positions.get().attendee_email
+
+
+@pytest.mark.django_db
+def test_sendmail_logged_if_chunk_fails(event, item):
+    with scopes_disabled():
+        orders = []
+        for i in range(3):
+            o = Order.objects.create(event=event, status=Order.STATUS_PAID,
+                                     expires=now() + datetime.timedelta(hours=1),
+                                     total=13, code='DUMMY{}'.format(i), email='dummy{}@dummy.test'.format(i),
+                                     datetime=now(), locale='en',
+                                     sales_channel=event.organizer.sales_channels.get(identifier="web"))
+            OrderPosition.objects.create(order=o, item=item, price=13)
+            orders.append(o)
+
+        calls = []
+
+        def fail_on_third_mail(*args, **kwargs):
+            calls.append(args[0])
+            if len(calls) == 3:
+                raise RuntimeError('Worker lost')
+
+        with mock.patch('pretix.plugins.sendmail.tasks.mail', side_effect=fail_on_third_mail):
+            with pytest.raises(RuntimeError):
+                send_mails_to_orders.apply(kwargs=dict(
+                    event=event.pk, user=None, subject={'en': 'Test subject'}, message={'en': 'Test message'},
+                    objects=[o.pk for o in orders], items=[item.pk], subevent=None, subevents_from=None,
+                    subevents_to=None, recipients='orders', filter_checkins=False, not_checked_in=False,
+                    checkin_lists=[],
+                ), throw=True)
+
+        # The emails queued before the failure are part of the order history
+        assert [
+            o.all_logentries().filter(action_type='pretix.plugins.sendmail.order.email.sent').count()
+            for o in orders
+        ] == [1, 1, 0]
+
+
 @pytest.mark.django_db
 def test_sendmail_subevents(logged_in_client, sendmail_url, event, order, pos):
     event.has_subevents = True
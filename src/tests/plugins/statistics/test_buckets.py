@@ -0,0 +1,126 @@
+#
+# This file is part of pretix (Community Edition).
+#
+# Copyright (C) 2014-2020 Raphael Michel and contributors
+# Copyright (C) 2020-2021 rami.io GmbH and contributors
+#
+# This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation in version 3 of the License.
+#
+# ADDITIONAL TERMS APPLY: Pursuant to Section 7 of the GNU Affero General Public License, additional terms are
+# applicable granting you additional permissions and placing additional restrictions on your usage of this software.
+# Please refer to the pretix LICENSE file to obtain the full terms applicable to this work. If you did not receive
+# this file, see <https://pretix.eu/about/en/license>.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with this program.  If not, see
+# <https://www.gnu.org/licenses/>.
+#
+import datetime
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.db.models import Count
+from django.utils.timezone import now
+from django_scopes import scope
+from freezegun import freeze_time
+
+from pretix.base.models import Event, Order, Organizer
+from pretix.plugins.statistics.views import _bucket_range, _bucketed
+
+TZ = ZoneInfo('Europe/Berlin')
+
+
+@pytest.fixture
+def event():
+    o = Organizer.objects.create(name='Dummy', slug='dummy')
+    event = Event.objects.create(
+        organizer=o, name='Dummy', slug='dummy', date_from=now(),
+    )
+    with scope(organizer=o):
+        yield event
+
+
+def _order(event, dt):
+    return Order.objects.create(
+        event=event, email='dummy@dummy.test', status=Order.STATUS_PAID, locale='en',
+        datetime=dt, expires=dt + datetime.timedelta(days=10), total=Decimal('10.00'),
+        sales_channel=event.organizer.sales_channels.get(identifier="web"),
+    )
+
+
+def _series(event, granularity):
+    ordered = _bucketed(event.orders.all(), 'datetime', granularity, TZ, cnt=Count('id'))
+    return [
+        (d, ordered[d]['cnt'] if d in ordered else 0)
+        for d in _bucket_range(granularity, TZ, ordered)
+    ]
+
+
+@pytest.mark.django_db
+def test_hour_buckets_spring_forward(event):
+    # Clocks in Berlin jump from 02:00 to 03:00 on March 31, 2024
+    _order(event, datetime.datetime(2024, 3, 31, 0, 30, tzinfo=TZ))
+    _order(event, datetime.datetime(2024, 3, 31, 1, 59, tzinfo=TZ))
+    _order(event, datetime.datetime(2024, 3, 31, 3, 1, tzinfo=TZ))
+    assert _series(event, 'hour') == [
+        (datetime.datetime(2024, 3, 31, 0, 0), 1),
+        (datetime.datetime(2024, 3, 31, 1, 0), 1),
+        (datetime.datetime(2024, 3, 31, 3, 0), 1),
+    ]
+
+
+@pytest.mark.django_db
+def test_hour_buckets_fall_back(event):
+    # Clocks in Berlin go back from 03:00 to 02:00 on October 27, 2024, so both 02:xx hours share a bucket
+    _order(event, datetime.datetime(2024, 10, 27, 0, 0, tzinfo=datetime.timezone.utc))
+    _order(event, datetime.datetime(2024, 10, 27, 1, 0, tzinfo=datetime.timezone.utc))
+    _order(event, datetime.datetime(2024, 10, 27, 3, 0, tzinfo=datetime.timezone.utc))
+    assert _series(event, 'hour') == [
+        (datetime.datetime(2024, 10, 27, 2, 0), 2),
+        (datetime.datetime(2024, 10, 27, 3, 0), 0),
+        (datetime.datetime(2024, 10, 27, 4, 0), 1),
+    ]
+
+
+@pytest.mark.django_db
+def test_day_buckets_across_dst(event):
+    # 23:30 local time is still March 30 in Berlin, although it is already March 31 in UTC after the change
+    _order(event, datetime.datetime(2024, 3, 30, 23, 30, tzinfo=TZ))
+    _order(event, datetime.datetime(2024, 3, 31, 23, 30, tzinfo=TZ))
+    _order(event, datetime.datetime(2024, 4, 2, 0, 30, tzinfo=TZ))
+    assert _series(event, 'day') == [
+        (datetime.datetime(2024, 3, 30), 1),
+        (datetime.datetime(2024, 3, 31), 1),
+        (datetime.datetime(2024, 4, 1), 0),
+        (datetime.datetime(2024, 4, 2), 1),
+    ]
+
+
+@pytest.mark.django_db
+def test_week_buckets_across_dst(event):
+    # Weeks start on Monday 00:00 local time, which is 23:00 UTC before and 22:00 UTC after the change
+    _order(event, datetime.datetime(2024, 3, 24, 23, 30, tzinfo=TZ))
+    _order(event, datetime.datetime(2024, 3, 25, 0, 30, tzinfo=TZ))
+    _order(event, datetime.datetime(2024, 4, 8, 0, 30, tzinfo=TZ))
+    assert _series(event, 'week') == [
+        (datetime.datetime(2024, 3, 18), 1),
+        (datetime.datetime(2024, 3, 25), 1),
+        (datetime.datetime(2024, 4, 1), 0),
+        (datetime.datetime(2024, 4, 8), 1),
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('granularity,expected', [
+    ('hour', datetime.datetime(2024, 4, 3, 14, 0)),
+    ('day', datetime.datetime(2024, 4, 3, 0, 0)),
+    ('week', datetime.datetime(2024, 4, 1, 0, 0)),
+])
+def test_empty_buckets_default_to_current(event, granularity, expected):
+    with freeze_time('2024-04-03 12:15:00+00:00'):
+        assert _series(event, granularity) == [(expected, 0)]
@@ -22,14 +22,16 @@
 from datetime import timedelta
 from decimal import Decimal
 from io import BytesIO
+from unittest import mock
 
 import pytest
+from django.core.files.base import ContentFile
 from django.utils.timezone import now
 from django_scopes import scope
 from pypdf import PdfReader
 
 from pretix.base.models import (
-    Event, Item, ItemVariation, Order, OrderPosition, Organizer,
+    CachedTicket, Event, Item, ItemVariation, Order, OrderPosition, Organizer,
 )
 from pretix.plugins.ticketoutputpdf.ticketoutput import PdfTicketOutput
 
@@ -73,3 +75,26 @@ def test_generate_pdf(env0):
         assert ftype == 'application/pdf'
         pdf = PdfReader(BytesIO(buf))
         assert len(pdf.pages) == 1
+
+
+@pytest.mark.django_db
+def test_generate_order_uses_position_cache(env0):
+    event, order = env0
+    with scope(organizer=event.organizer):
+        o = PdfTicketOutput(event)
+        p1, p2 = order.positions.order_by('positionid')
+        ct = CachedTicket.objects.create(order_position=p1, provider='pdf', extension='.pdf',
+                                         type='application/pdf', file=None)
+        ct.file.save('cached.pdf', ContentFile(o.generate(p1)[2]))
+
+        with mock.patch.object(PdfTicketOutput, '_draw_page', wraps=o._draw_page) as draw_page:
+            fname, ftype, buf = o.generate_order(order)
+        assert ftype == 'application/pdf'
+        assert len(PdfReader(BytesIO(buf)).pages) == 2
+        assert draw_page.call_count == 1
+        assert draw_page.call_args[0][1] == p2
+        assert CachedTicket.objects.filter(order_position=p2, provider='pdf').exists()
+
+        with mock.patch.object(PdfTicketOutput, '_draw_page', wraps=o._draw_page) as draw_page:
+            o.generate_order(order)
+        assert draw_page.call_count == 0
@@ -43,7 +43,7 @@ from bs4 import BeautifulSoup
 from django.conf import settings
 from django.core import mail
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils.timezone import now
 from django_scopes import scopes_disabled
 from tests.base import SoupTest
@@ -55,6 +55,9 @@ from pretix.base.models import (
 )
 from pretix.base.models.items import SubEventItem, SubEventItemVariation
 from pretix.base.reldate import RelativeDate, RelativeDateWrapper
+from pretix.presale.views.event import (
+    CATALOG_SNAPSHOT_TIMEOUT, _catalog_snapshot_timeout,
+)
 from pretix.testutils.sessions import get_cart_session_key
 
 
@@ -1643,3 +1646,57 @@ class EventLocaleTest(EventTestMixin, SoupTest):
         self.assertEqual(response.status_code, 200)
         self.assertIn('Do, 26. Dezember', response.rendered_content)
         self.assertIn('14:00', response.rendered_content)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog-snapshot',
+    }
+})
+class CatalogSnapshotTest(EventTestMixin, SoupTest):
+    def setUp(self):
+        super().setUp()
+        with scopes_disabled():
+            self.quota = Quota.objects.create(event=self.event, name='Quota', size=2)
+            self.item = Item.objects.create(event=self.event, name='Early-bird ticket', default_price=0, active=True)
+            self.quota.items.add(self.item)
+
+    def test_snapshot_reused_until_invalidated(self):
+        html = self.client.get('/%s/%s/' % (self.orga.slug, self.event.slug)).rendered_content
+        self.assertIn("Early-bird", html)
+
+        # Bypasses cache invalidation, so the snapshot is still served
+        with scopes_disabled():
+            Item.objects.filter(pk=self.item.pk).update(name='Regular ticket')
+        html = self.client.get('/%s/%s/' % (self.orga.slug, self.event.slug)).rendered_content
+        self.assertIn("Early-bird", html)
+
+        with scopes_disabled():
+            self.item.refresh_from_db()
+            self.item.save()
+        html = self.client.get('/%s/%s/' % (self.orga.slug, self.event.slug)).rendered_content
+        self.assertIn("Regular ticket", html)
+
+    @override_settings(CACHE_LARGE_VALUES_ALLOWED=True)
+    def test_product_list_shared_between_anonymous_visitors(self):
+        html = self.client.get('/%s/%s/' % (self.orga.slug, self.event.slug)).rendered_content
+        self.assertIn("Early-bird", html)
+        self.assertIn("btn-add-to-cart", html)
+
+        with scopes_disabled():
+            self.item.name = 'Regular ticket'
+            self.item.save()
+        html = self.client.get('/%s/%s/' % (self.orga.slug, self.event.slug)).rendered_content
+        self.assertIn("Early-bird", html)
+        self.assertIn("btn-add-to-cart", html)
+
+        html = self.client.get('/%s/%s/?foo=bar' % (self.orga.slug, self.event.slug)).rendered_content
+        self.assertIn("Regular ticket", html)
+
+    def test_timeout_bounded_by_availability_dates(self):
+        with scopes_disabled():
+            assert _catalog_snapshot_timeout(self.event, None) == CATALOG_SNAPSHOT_TIMEOUT
+            self.item.available_from = now() + datetime.timedelta(seconds=30)
+            self.item.save()
+            assert 1 <= _catalog_snapshot_timeout(self.event, None) <= 30
@@ -266,6 +266,22 @@ class WidgetCartTest(CartTestMixin, TestCase):
             "voucher_explanation_text": "",
         }
 
+    def test_product_list_view_conditional(self):
+        response = self.client.get('/%s/%s/widget/product_list' % (self.orga.slug, self.event.slug))
+        assert 'public' in response['Cache-Control']
+        assert 'max-age=10' in response['Cache-Control']
+        etag = response['ETag']
+
+        response = self.client.get('/%s/%s/widget/product_list' % (self.orga.slug, self.event.slug),
+                                   HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['Access-Control-Allow-Origin'] == '*'
+
+        response = self.client.get('/%s/%s/widget/product_list?cart_id=foo' % (self.orga.slug, self.event.slug),
+                                   HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert 'ETag' not in response
+
     def test_product_list_view_filter(self):
         response = self.client.get('/%s/%s/widget/product_list?items=%s' % (self.orga.slug, self.event.slug,
                                                                             self.ticket.pk))